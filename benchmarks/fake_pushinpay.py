@@ -0,0 +1,126 @@
+"""
+Servidor local que simula a API da PushinPay para benchmarks
+
+Atende POST /pix/cashIn e GET /transactions/{id} com latência e taxa de
+erros configuráveis. Pode ser usado dentro do harness ou isoladamente:
+
+    python -m benchmarks.fake_pushinpay --port 8099 --latency 0.05 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import uuid
+from typing import Dict, Optional
+
+from aiohttp import web
+
+
+class FakePushinPay:
+    """
+    API PushinPay falsa
+
+    Args:
+        latency: Latência média das respostas em segundos
+        jitter: Variação máxima (para mais ou para menos) da latência
+        error_rate: Fração das requisições respondidas com HTTP 500
+        paid_after: Consultas de status até a cobrança constar como paga (0 = nunca)
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.01,
+        error_rate: float = 0.0,
+        paid_after: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.paid_after = paid_after
+        self.charges: Dict[str, Dict] = {}
+        self.status_checks: Dict[str, int] = {}
+        self.requests = itertools.count()
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/pix/cashIn", self.cash_in)
+        app.router.add_get("/transactions/{id}", self.transaction_status)
+        return app
+
+    async def _delay(self) -> Optional[web.Response]:
+        """Aplica a latência e decide se a requisição deve falhar"""
+        next(self.requests)
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        await asyncio.sleep(max(0.0, delay))
+        if random.random() < self.error_rate:
+            return web.json_response({"error": "fake failure"}, status=500)
+        return None
+
+    async def cash_in(self, request: web.Request) -> web.Response:
+        if error := await self._delay():
+            return error
+
+        body = await request.json()
+        charge = {
+            "id": str(uuid.uuid4()),
+            "value": body["value"],
+            "qr_code": f"00020101021226770014BR.GOV.BCB.PIX{uuid.uuid4().hex}",
+            "status": "created",
+            "webhook_url": body.get("webhook_url"),
+        }
+        self.charges[charge["id"]] = charge
+        return web.json_response(charge)
+
+    async def transaction_status(self, request: web.Request) -> web.Response:
+        if error := await self._delay():
+            return error
+
+        transaction_id = request.match_info["id"]
+        charge = self.charges.get(transaction_id)
+        if charge is None:
+            return web.json_response({"error": "not found"}, status=404)
+
+        checks = self.status_checks[transaction_id] = (
+            self.status_checks.get(transaction_id, 0) + 1
+        )
+        if self.paid_after and checks >= self.paid_after:
+            charge["status"] = "paid"
+        return web.json_response(charge)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Inicia o servidor e retorna a URL base (ex.: http://127.0.0.1:8099)"""
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        sockets = site._server.sockets
+        self.base_url = f"http://{host}:{sockets[0].getsockname()[1]}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API PushinPay falsa")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--paid-after", type=int, default=0)
+    args = parser.parse_args()
+
+    fake = FakePushinPay(args.latency, args.jitter, args.error_rate, args.paid_after)
+    print(f"PushinPay falsa em http://{args.host}:{args.port}")
+    web.run_app(fake.create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Harness para executar os handlers de pixbot/plugins/ sem o Telegram
+
+Os handlers recebem um cliente falso (StubClient) e atualizações sintéticas
+de Message/CallbackQuery, com latência configurável nas chamadas que iriam
+para a API do Telegram.
+"""
+
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List
+
+from pixbot.utils.callback_router import CB, encode
+
+_message_ids = itertools.count(1)
+_file_ids = itertools.count(1)
+
+
+class StubMessage:
+    """Mensagem sintética com os métodos usados pelos handlers"""
+
+    def __init__(self, client: "StubClient", chat_id: int, text: str = ""):
+        self._client = client
+        self.id = next(_message_ids)
+        self.chat = SimpleNamespace(id=chat_id)
+        self.from_user = SimpleNamespace(id=chat_id, first_name="bench")
+        self.text = text
+
+    async def edit_text(self, text: str, reply_markup: Any = None, **kwargs):
+        await self._client.telegram_call("edit_message_text")
+        self.text = text
+        return self
+
+    async def reply(self, text: str, reply_markup: Any = None, **kwargs):
+        await self._client.telegram_call("send_message")
+        return StubMessage(self._client, self.chat.id, text)
+
+
+class StubCallbackQuery:
+    """CallbackQuery sintética"""
+
+    def __init__(self, client: "StubClient", user_id: int, data: str):
+        self._client = client
+        self.id = str(next(_message_ids))
+        self.data = data
+        self.from_user = SimpleNamespace(id=user_id, first_name="bench")
+        self.message = StubMessage(client, user_id)
+
+    async def answer(self, text: str = "", show_alert: bool = False, **kwargs):
+        await self._client.telegram_call("answer_callback_query")
+        self._client.answers.append(text)
+
+
+class StubClient:
+    """
+    Cliente do Pyrogram falso
+
+    Args:
+        latency: Latência simulada de cada chamada à API do Telegram (segundos)
+        custom_amount_text: Texto enviado pelo "usuário" no valor personalizado
+        user_think_time: Tempo até o "usuário" responder (segundos)
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        custom_amount_text: str = "12.50",
+        user_think_time: float = 0.0,
+    ):
+        self.latency = latency
+        self.custom_amount_text = custom_amount_text
+        self.user_think_time = user_think_time
+        self.calls: Counter = Counter()
+        self.answers: List[str] = []
+
+    async def telegram_call(self, method: str) -> None:
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        await self.telegram_call("send_message")
+        return StubMessage(self, chat_id, text)
+
+    async def edit_message_text(
+        self, chat_id: int, message_id: int, text: str, **kwargs
+    ):
+        await self.telegram_call("edit_message_text")
+        return StubMessage(self, chat_id, text)
+
+    async def send_photo(self, chat_id: int, photo: Any, caption: str = "", **kwargs):
+        await self.telegram_call("send_photo")
+        file_id = photo if isinstance(photo, str) else f"file-{next(_file_ids)}"
+        message = StubMessage(self, chat_id, caption)
+        message.photo = SimpleNamespace(file_id=file_id)
+        return message
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentil por interpolação linear de uma lista já ordenada"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+async def run_load(
+    operation: Callable[[int], Awaitable[Any]], ops: int, concurrency: int
+) -> Dict[str, float]:
+    """
+    Executa uma operação várias vezes com concorrência fixa
+
+    Args:
+        operation: Função que recebe o índice da execução
+        ops: Total de execuções
+        concurrency: Execuções simultâneas
+
+    Returns:
+        Vazão (operações/s), latências p50/p95/p99/máx em ms e erros
+    """
+    latencies: List[float] = []
+    errors = 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while (index := next(counter)) < ops:
+            start = time.perf_counter()
+            try:
+                await operation(index)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "ops": ops,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "throughput": round(ops / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+class Scenarios:
+    """
+    Cenários de benchmark, um por handler
+
+    Cada cenário devolve uma função que recebe o índice da execução e
+    processa uma atualização sintética pelo roteador de callbacks. Os handlers são importados aqui
+    para que o ambiente (variáveis de configuração) já esteja pronto.
+    """
+
+    def __init__(self, client: StubClient, payment_values: List[float]):
+        from pixbot.plugins import callbacks, payment
+
+        self.client = client
+        self.payment_values = payment_values
+        self.callbacks = callbacks
+        self.payment = payment
+        self.transaction_ids: List[str] = []
+        self._users = itertools.count(1_000_000)
+
+    async def dispatch(self, query: StubCallbackQuery) -> None:
+        """Entrega o callback ao mesmo ponto de entrada usado pelo Pyrogram"""
+        await self.wait(await self.callbacks.dispatch_callback(self.client, query))
+
+    @staticmethod
+    async def wait(result: Any) -> None:
+        """Aguarda o processamento de uma atualização colocada na fila do usuário"""
+        if isinstance(result, asyncio.Future):
+            await result
+
+    def user(self) -> int:
+        """Usuário novo para cada atualização (sem interferência de limites)"""
+        return next(self._users)
+
+    async def prepare_transactions(self, count: int) -> None:
+        """Cria cobranças na API falsa para os cenários de consulta"""
+        from pixbot.models.transaction import Transaction, TransactionManager
+        from pixbot.utils.payment_api import PaymentAPI
+
+        for _ in range(count):
+            pix_data = await PaymentAPI.generate_pix(random.choice(self.payment_values))
+            transaction = Transaction.from_api_response(pix_data, self.user())
+            await TransactionManager.add_transaction(transaction)
+            self.transaction_ids.append(transaction.id)
+
+    def process_payment(self) -> Callable[[int], Awaitable[Any]]:
+        async def run(index: int):
+            value = self.payment_values[index % len(self.payment_values)]
+            query = StubCallbackQuery(
+                self.client, self.user(), encode(CB.PAYMENT, f"{value:g}")
+            )
+            await self.dispatch(query)
+
+        return run
+
+    def double_tap_payment(self) -> Callable[[int], Awaitable[Any]]:
+        """Dois toques simultâneos no mesmo botão de valor da mesma mensagem"""
+
+        async def run(index: int):
+            value = self.payment_values[index % len(self.payment_values)]
+            user_id = self.user()
+            first = StubCallbackQuery(
+                self.client, user_id, encode(CB.PAYMENT, f"{value:g}")
+            )
+            second = StubCallbackQuery(self.client, user_id, first.data)
+            second.message = first.message
+            await asyncio.gather(self.dispatch(first), self.dispatch(second))
+
+        return run
+
+    def request_custom_amount(self) -> Callable[[int], Awaitable[Any]]:
+        async def run(index: int):
+            user_id = self.user()
+            query = StubCallbackQuery(self.client, user_id, CB.CUSTOM_AMOUNT)
+            await self.dispatch(query)
+
+            # O "usuário" responde com o valor depois de pensar
+            await asyncio.sleep(self.client.user_think_time)
+            message = StubMessage(self.client, user_id, self.client.custom_amount_text)
+            await self.wait(
+                await self.payment.handle_custom_amount(self.client, message)
+            )
+
+        return run
+
+    def check_payment(self) -> Callable[[int], Awaitable[Any]]:
+        async def run(index: int):
+            transaction_id = random.choice(self.transaction_ids)
+            query = StubCallbackQuery(
+                self.client, self.user(), encode(CB.CHECK_PAYMENT, transaction_id)
+            )
+            await self.dispatch(query)
+
+        return run
+
+    def show_qr(self) -> Callable[[int], Awaitable[Any]]:
+        async def run(index: int):
+            transaction_id = random.choice(self.transaction_ids)
+            query = StubCallbackQuery(
+                self.client, self.user(), encode(CB.SHOW_QR, transaction_id)
+            )
+            await self.dispatch(query)
+
+        return run
@@ -0,0 +1,150 @@
+"""
+Benchmark da fila de envio: atualização em massa de status contra um Telegram com limites
+
+Simula a confirmação simultânea de muitas cobranças: cada chat recebe
+algumas edições da mesma mensagem (verificação automática, webhook e o
+botão "verificar"). O Telegram falso aplica limites global e por chat e
+responde FloodWait quando eles são excedidos. Compara o envio direto de
+cada edição com a fila de envio (pixbot/services/outbound.py).
+
+Exemplo:
+    python -m benchmarks.outbound --chats 300 --edits 3
+"""
+
+import argparse
+import asyncio
+import math
+import time
+from typing import Any, Callable, Dict
+
+from benchmarks.run import configure_environment
+
+
+class FakeTelegram:
+    """
+    Telegram falso que limita os envios como o real
+
+    Args:
+        global_rate: Envios por segundo somando todos os chats
+        chat_rate: Envios por segundo em cada chat (após a rajada)
+        chat_burst: Envios seguidos permitidos em cada chat
+        latency: Latência de cada chamada em segundos
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3.0,
+        latency: float = 0.02,
+    ):
+        from pixbot.utils.rate_limiter import TokenBucket
+
+        now = time.monotonic()
+        self.global_bucket = TokenBucket(global_rate, global_rate, now)
+        self.chat_limit = (chat_burst, chat_rate)
+        self.chats: Dict[int, Any] = {}
+        self.latency = latency
+        self.calls = 0
+        self.flood_waits = 0
+        self._bucket_cls = TokenBucket
+
+    async def invoke(self, query: Any, **kwargs) -> Any:
+        from pyrogram.errors import FloodWait
+
+        self.calls += 1
+        now = time.monotonic()
+        chat = query.peer.user_id
+        bucket = self.chats.get(chat)
+        if bucket is None:
+            bucket = self.chats[chat] = self._bucket_cls(*self.chat_limit, now)
+        bucket.refill(now)
+        self.global_bucket.refill(now)
+
+        wait = max(bucket.wait_time(), self.global_bucket.wait_time())
+        if wait > 0:
+            self.flood_waits += 1
+            raise FloodWait(value=math.ceil(wait))
+
+        bucket.tokens -= 1
+        self.global_bucket.tokens -= 1
+        await asyncio.sleep(self.latency)
+        return query.message
+
+
+def make_edits(chats: int, edits: int) -> list:
+    """Edições de status da mensagem de pagamento de cada chat"""
+    from pyrogram import raw
+
+    return [
+        raw.functions.messages.EditMessage(
+            peer=raw.types.InputPeerUser(user_id=chat, access_hash=0),
+            id=1,
+            message=f"status {step}",
+        )
+        for step in range(edits)
+        for chat in range(chats)
+    ]
+
+
+async def run_direct(telegram: FakeTelegram, queries: list) -> int:
+    """Cada edição é enviada na hora; FloodWait vira falha do handler"""
+    results = await asyncio.gather(
+        *(telegram.invoke(query) for query in queries), return_exceptions=True
+    )
+    return sum(isinstance(result, Exception) for result in results)
+
+
+async def run_queued(telegram: FakeTelegram, queries: list) -> int:
+    """Todas as edições passam pela fila de envio"""
+    from pixbot.services.outbound import OutboundQueue
+
+    results = await asyncio.gather(
+        *(OutboundQueue.submit(query, telegram.invoke) for query in queries),
+        return_exceptions=True,
+    )
+    await OutboundQueue.stop()
+    return sum(isinstance(result, Exception) for result in results)
+
+
+async def measure(
+    name: str, runner: Callable, args: argparse.Namespace
+) -> Dict[str, Any]:
+    telegram = FakeTelegram(latency=args.telegram_latency)
+    queries = make_edits(args.chats, args.edits)
+    start = time.perf_counter()
+    errors = await runner(telegram, queries)
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": name,
+        "seconds": elapsed,
+        "edits": len(queries),
+        "calls": telegram.calls,
+        "flood_waits": telegram.flood_waits,
+        "errors": errors,
+    }
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    for name, runner in (("direto", run_direct), ("fila", run_queued)):
+        row = await measure(name, runner, args)
+        print(
+            f"{row['mode']:<8} {row['seconds']:7.2f}s  edições {row['edits']:<6} "
+            f"chamadas {row['calls']:<6} FloodWait {row['flood_waits']:<6} "
+            f"falhas {row['errors']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da fila de envio")
+    parser.add_argument("--chats", type=int, default=300)
+    parser.add_argument("--edits", type=int, default=3, help="Edições por chat")
+    parser.add_argument("--telegram-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    configure_environment("http://127.0.0.1:9")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
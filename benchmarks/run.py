@@ -0,0 +1,223 @@
+"""
+Executa os benchmarks dos handlers contra a PushinPay falsa
+
+Exemplos:
+    python -m benchmarks.run
+    python -m benchmarks.run --scenarios check_payment show_qr --concurrency 1 10 100
+    python -m benchmarks.run --compare benchmarks/results/antes.json benchmarks/results/depois.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+SCENARIOS = (
+    "process_payment",
+    "double_tap_payment",
+    "request_custom_amount",
+    "check_payment",
+    "show_qr",
+)
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def free_port() -> int:
+    """Reserva uma porta TCP livre"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_revision() -> str:
+    """Revisão atual do repositório (ou "unknown")"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def configure_environment(api_base: str) -> None:
+    """
+    Prepara as configurações do bot para o benchmark
+
+    Deve ser chamado antes de importar qualquer módulo do pixbot. Usa
+    armazenamento em memória, desliga os serviços em segundo plano e
+    afrouxa os limites de requisições para medir apenas os handlers.
+    """
+    defaults = {
+        "BOT_NAME": "benchmark",
+        "BOT_TOKEN": "0:benchmark",
+        "API_ID": "1",
+        "API_HASH": "benchmark",
+        "ADMIN_IDS": "1",
+        "PIX_API_TOKEN": "benchmark",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+    os.environ.update(
+        {
+            "PIX_API_URL": f"{api_base}/pix/cashIn",
+            "PIX_STATUS_URL": f"{api_base}/transactions/",
+            "STORAGE_BACKEND": "memory",
+            "POLLER_ENABLED": "false",
+            "WEBHOOK_SERVER_ENABLED": "false",
+            "WARM_POOL_ENABLED": "false",
+            "RATE_LIMIT_USER": "1000000/1",
+            "RATE_LIMIT_PROCESS_PAYMENT": "1000000/1",
+            "RATE_LIMIT_REQUEST_CUSTOM_AMOUNT": "1000000/1",
+            "RATE_LIMIT_SHOW_QR": "1000000/1",
+            "RATE_LIMIT_CHECK_PAYMENT": "1000000/1",
+            "RATE_LIMIT_GLOBAL": "1000000/1",
+        }
+    )
+
+
+def quiet_logs(log_file: str) -> None:
+    """Troca as saídas de log por um único arquivo, mantendo o custo de gravação"""
+    from pixbot.logger import configure_logging
+
+    configure_logging(console=False, log_file=log_file)
+
+
+async def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    from benchmarks.fake_pushinpay import FakePushinPay
+
+    port = free_port()
+    log_file = os.path.join(tempfile.gettempdir(), "pixbot-benchmark.log")
+    configure_environment(f"http://127.0.0.1:{port}")
+
+    fake = FakePushinPay(
+        latency=args.api_latency, jitter=args.api_jitter, error_rate=args.error_rate
+    )
+    await fake.start(port=port)
+
+    from benchmarks.harness import Scenarios, StubClient, run_load
+
+    quiet_logs(log_file)
+
+    from pixbot.utils.payment_api import PaymentAPI
+
+    client = StubClient(latency=args.telegram_latency)
+    scenarios = Scenarios(client, args.payment_values)
+    await scenarios.prepare_transactions(args.transactions)
+
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    try:
+        for name in args.scenarios:
+            factory = getattr(scenarios, name)
+            results[name] = []
+            for concurrency in args.concurrency:
+                # Aquecimento para não medir a criação de conexões e caches
+                await run_load(factory(), min(args.ops, concurrency), concurrency)
+                result = await run_load(factory(), args.ops, concurrency)
+                results[name].append(result)
+                print(
+                    f"{name:<22} c={concurrency:<4} {result['throughput']:>9.1f} ops/s  "
+                    f"p50={result['p50_ms']:>8.2f}ms  p95={result['p95_ms']:>8.2f}ms  "
+                    f"p99={result['p99_ms']:>8.2f}ms  erros={result['errors']}",
+                    flush=True,
+                )
+    finally:
+        await PaymentAPI.close()
+        await fake.stop()
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {
+                "ops": args.ops,
+                "concurrency": args.concurrency,
+                "api_latency": args.api_latency,
+                "api_jitter": args.api_jitter,
+                "error_rate": args.error_rate,
+                "telegram_latency": args.telegram_latency,
+                "transactions": args.transactions,
+            },
+            "upstream_requests": next(fake.requests),
+            "telegram_calls": dict(client.calls),
+        },
+        "results": results,
+    }
+
+
+def compare(old_path: str, new_path: str) -> None:
+    """Mostra a variação entre dois arquivos de resultados"""
+    old = json.loads(Path(old_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+    print(f"{old['meta']['revision']} -> {new['meta']['revision']}")
+
+    for name, new_rows in new["results"].items():
+        old_rows = {row["concurrency"]: row for row in old["results"].get(name, [])}
+        for row in new_rows:
+            base = old_rows.get(row["concurrency"])
+            if not base:
+                continue
+
+            def delta(key: str) -> str:
+                if not base[key]:
+                    return "    n/a"
+                return f"{(row[key] - base[key]) / base[key] * 100:+7.1f}%"
+
+            print(
+                f"{name:<22} c={row['concurrency']:<4} "
+                f"vazão {delta('throughput')}  p50 {delta('p50_ms')}  "
+                f"p95 {delta('p95_ms')}  p99 {delta('p99_ms')}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks dos handlers do bot")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 10, 50, 100])
+    parser.add_argument("--ops", type=int, default=500, help="Execuções por nível")
+    parser.add_argument("--api-latency", type=float, default=0.05)
+    parser.add_argument("--api-jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--telegram-latency", type=float, default=0.01)
+    parser.add_argument(
+        "--transactions", type=int, default=200, help="Cobranças para check/show_qr"
+    )
+    parser.add_argument(
+        "--payment-values", nargs="+", type=float, default=[5, 10, 20, 50, 100]
+    )
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DEPOIS"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = asyncio.run(run_benchmarks(args))
+
+    output = (
+        Path(args.output)
+        if args.output
+        else RESULTS_DIR
+        / (f"{datetime.now():%Y%m%d-%H%M%S}-{report['meta']['revision']}.json")
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Resultados salvos em {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Microbenchmark da camada de telas: renderização a cada atualização x telas pré-montadas
+
+Cada "atualização" exibe o menu de valores, os detalhes de uma cobrança e o
+status dela, como acontece no fluxo de pagamento. Mede o tempo por atualização
+e a memória alocada por atualização (objetos que sobrevivem ao handler).
+
+Exemplo:
+    python -m benchmarks.screens --ops 20000 --transactions 1000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from benchmarks.run import configure_environment
+
+
+def make_transactions(count: int) -> List[Any]:
+    """Transações sintéticas com status variados"""
+    from pixbot.models.transaction import Transaction
+
+    statuses = ("created", "pending", "paid", "expired")
+    now = datetime.now()
+    return [
+        Transaction(
+            id=str(uuid.uuid4()),
+            user_id=1,
+            amount=10.0 + i % 90,
+            qr_code="00020101021226" + "7" * 120,
+            created_at=now,
+            status=statuses[i % len(statuses)],
+        )
+        for i in range(count)
+    ]
+
+
+def build_updates() -> Dict[str, Callable[[Any], tuple]]:
+    """
+    Funções de atualização a comparar
+
+    Os imports ficam aqui para acontecer depois de configure_environment().
+    """
+    from pixbot.utils.helpers import settings
+    from pixbot.utils.messages import (
+        PAYMENT_DETAILS_MESSAGE,
+        PAYMENT_OPTIONS_MESSAGE,
+        format_payment_message,
+        get_completed_payment_keyboard,
+        get_failed_payment_keyboard,
+        get_pending_payment_keyboard,
+        payment_details_keyboard,
+        payment_status_message,
+    )
+    from pixbot.utils.screens import Screens, build_payment_options_keyboard
+
+    def legacy_update(transaction: Any) -> tuple:
+        """Renderização como era feita antes: tudo montado de novo a cada toque"""
+        options = (
+            PAYMENT_OPTIONS_MESSAGE,
+            build_payment_options_keyboard(settings.payment_values),
+        )
+        details = (
+            format_payment_message(
+                transaction.amount, transaction.qr_code, transaction.id
+            ),
+            payment_details_keyboard(transaction.id),
+        )
+        if transaction.is_paid():
+            keyboard = get_completed_payment_keyboard(transaction.id)
+        elif transaction.is_pending():
+            keyboard = get_pending_payment_keyboard(transaction.id)
+        else:
+            keyboard = get_failed_payment_keyboard(transaction.id)
+        status = (
+            PAYMENT_DETAILS_MESSAGE.format(
+                amount=transaction.amount,
+                status_msg=payment_status_message(transaction.status),
+                transaction_id=transaction.id,
+            ),
+            keyboard,
+        )
+        return options, details, status
+
+    def screens_update(transaction: Any) -> tuple:
+        """Renderização pela camada de telas"""
+        return (
+            Screens.payment_options,
+            Screens.payment_details(transaction),
+            Screens.payment_status(transaction),
+        )
+
+    return {"antes": legacy_update, "telas": screens_update}
+
+
+def measure(
+    name: str, update: Callable[[Any], tuple], transactions: List[Any], ops: int
+) -> None:
+    """Executa as atualizações e imprime tempo e memória por atualização"""
+    count = len(transactions)
+
+    # Aquece caches e imports antes de medir
+    for transaction in transactions:
+        update(transaction)
+
+    gc.collect()
+    started = time.perf_counter()
+    for i in range(ops):
+        update(transactions[i % count])
+    elapsed = time.perf_counter() - started
+
+    # Mantém os resultados vivos para medir o que cada atualização aloca
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    results = [update(transactions[i % count]) for i in range(ops)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(
+        stat.size_diff
+        for stat in after.compare_to(before, "filename")
+        if stat.size_diff > 0
+    )
+    # Descontado o próprio list com as referências
+    allocated -= results.__sizeof__()
+
+    print(
+        f"{name:<10} {elapsed / ops * 1e6:>9.2f} µs/atualização"
+        f"  {max(allocated, 0) / ops:>9.1f} bytes/atualização"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark das telas")
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--transactions", type=int, default=1000)
+    args = parser.parse_args()
+
+    configure_environment("http://127.0.0.1:9")
+
+    from pixbot.logger import logger
+
+    logger.remove()
+
+    transactions = make_transactions(args.transactions)
+    for name, update in build_updates().items():
+        measure(name, update, transactions, args.ops)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Exporta as transações armazenadas para conciliação, sem iniciar o bot
+
+Exemplos:
+    python export.py --from 2025-01-01 --to 2025-03-31 --status paid
+    python export.py --format columns --output transacoes.jsonl.gz
+"""
+
+import argparse
+import sys
+
+from pixbot.models.transaction import TransactionManager
+from pixbot.services.export import FORMATS, export_to_file, parse_export_args
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta as transações do bot")
+    parser.add_argument("--from", dest="start", help="Data inicial (AAAA-MM-DD)")
+    parser.add_argument("--to", dest="end", help="Data final, incluída (AAAA-MM-DD)")
+    parser.add_argument("--status", nargs="+", default=[], help="Status desejados")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--output", help="Arquivo de saída (nome padrão se omitido)")
+    args = parser.parse_args()
+
+    if args.end and not args.start:
+        parser.error("--to exige --from")
+
+    try:
+        request = parse_export_args(
+            [args.format, *filter(None, (args.start, args.end)), *args.status]
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    output = args.output or request.file_name
+    try:
+        count = export_to_file(request, output)
+    finally:
+        TransactionManager.get_store().close()
+    print(f"{count} transações exportadas para {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,26 @@
 import asyncio
+import signal
+import time
 import traceback
 
 import uvloop
-from convopyro import Conversation
 from pyrogram import Client, enums, idle
 from pyrogram.types import BotCommand
 
 from pixbot.logger import logger
-from pixbot.settings import Settings
+from pixbot.models.transaction import TransactionManager
+from pixbot.services.expiry import ExpiryScheduler
+from pixbot.services.metrics import MetricsServer
+from pixbot.services.outbound import OutboundQueue
+from pixbot.services.reconciler import Reconciler
+from pixbot.services.status_poller import StatusPoller
+from pixbot.services.update_queue import UpdateQueue
+from pixbot.services.warm_pool import WarmPool
+from pixbot.services.webhook import WebhookServer
+from pixbot.settings import get_settings, reload_settings
+from pixbot.utils.conversations import conversations
+from pixbot.utils.metrics import TELEGRAM_LATENCY
+from pixbot.utils.payment_api import PaymentAPI
 
 # Instala uvloop para melhorar a performance dos loops assíncronos
 uvloop.install()
@@ -20,7 +33,7 @@ class PixBot(Client):
     """
 
     def __init__(self):
-        self.settings = Settings()
+        self.settings = get_settings()
         super().__init__(
             name=self.settings.bot_name,
             api_id=self.settings.api_id,
@@ -37,6 +50,13 @@ class PixBot(Client):
         # Configura o parser para usar o modo DEFAULT (combina Markdown e HTML)
         self.set_parse_mode(enums.ParseMode.DEFAULT)
 
+        # Abre o armazenamento das transações antes de receber atualizações
+        await TransactionManager.start()
+
+        # Expõe as métricas desde o início da execução
+        if self.settings.metrics_enabled:
+            await MetricsServer.start()
+
         await super().start()
         self.me = await self.get_me()
         logger.info(f"Bot iniciado: @{self.me.username} ({self.me.id})")
@@ -50,12 +70,98 @@ class PixBot(Client):
         await self.set_bot_commands(commands)
         logger.info("Comandos do bot configurados")
 
+        # Inicia o receptor de notificações da PushinPay, se habilitado
+        if self.settings.webhook_server_enabled:
+            await WebhookServer.start(self)
+
+        # Inicia a verificação automática dos pagamentos pendentes
+        if self.settings.poller_enabled:
+            await StatusPoller.start(self)
+
+        # Finaliza as cobranças que passarem da validade
+        if self.settings.expiry_enabled:
+            await ExpiryScheduler.start(self)
+
+        # Confere com a PushinPay as cobranças que ficaram em aberto
+        if self.settings.reconcile_enabled:
+            await Reconciler.start(self)
+
+        # Mantém cobranças prontas para os valores pré-definidos
+        if self.settings.warm_pool_enabled:
+            await WarmPool.start()
+
+        # Recarrega as configurações ao receber SIGHUP (indisponível no Windows)
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGHUP, self.reload_settings
+            )
+        except (AttributeError, NotImplementedError):
+            pass
+
+    def reload_settings(self) -> None:
+        """Recarrega as configurações sem reiniciar o processo"""
+        try:
+            reload_settings()
+        except Exception as e:
+            logger.error(f"Erro ao recarregar configurações: {str(e)}")
+
+    async def stop(self, *args, **kwargs):
+        """Encerra o bot e libera as conexões HTTP abertas"""
+        try:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+        except (AttributeError, NotImplementedError):
+            pass
+
+        await WarmPool.stop()
+        await Reconciler.stop()
+        await ExpiryScheduler.stop()
+        await StatusPoller.stop()
+        # Termina as atualizações já recebidas enquanto a API ainda está aberta
+        await UpdateQueue.stop()
+        await conversations.wheel.stop()
+        # Envia o que os handlers deixaram na fila antes de desconectar
+        await OutboundQueue.stop()
+        await WebhookServer.stop()
+        await PaymentAPI.close()
+        result = await super().stop(*args, **kwargs)
+        await MetricsServer.stop()
+        await TransactionManager.stop()
+
+        # Aguarda a gravação das mensagens de log ainda na fila
+        await logger.complete()
+        return result
+
+    async def invoke(self, query, *args, **kwargs):
+        """Executa uma chamada à API do Telegram medindo sua duração"""
+        if OutboundQueue.accepts(query):
+            # Envios e edições seguem os limites da fila, que também trata o
+            # FloodWait adiando apenas o chat afetado
+            kwargs.setdefault("sleep_threshold", 0)
+            return await OutboundQueue.submit(
+                query, lambda q: self._timed_invoke(q, *args, **kwargs)
+            )
+        return await self._timed_invoke(query, *args, **kwargs)
+
+    async def _timed_invoke(self, query, *args, **kwargs):
+        """Executa a chamada diretamente, registrando a latência"""
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await super().invoke(query, *args, **kwargs)
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            TELEGRAM_LATENCY.observe(
+                time.perf_counter() - start,
+                method=type(query).__name__,
+                outcome=outcome,
+            )
+
 
 async def main():
     try:
         bot = PixBot()
-        # Inicializa a biblioteca de conversas
-        Conversation(bot)
 
         # Inicia o bot
         await bot.start()
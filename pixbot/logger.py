@@ -1,17 +1,53 @@
 import logging
+import os
+import random
 import sys
-from logging.handlers import RotatingFileHandler
+import threading
+import zipfile
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 
 from loguru import logger as loguru_logger
 
+from pixbot.settings import get_settings, on_settings_reload
+
+if TYPE_CHECKING:
+    from loguru import Logger
+
+settings = get_settings()
+
+CONSOLE_FORMAT = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan> - <level>{message}</level>"
+FILE_FORMAT = (
+    "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+)
+
+# Mensagens INFO do Pyrogram que continuam sendo registradas
+PYROGRAM_ALLOWED_MESSAGES = (
+    "Bot iniciado:",
+    "Bot está em execução",
+    "Bot parou",
+    "Comandos do bot configurados",
+)
+
 
 class InterceptHandler(logging.Handler):
+    # Cache do nível do loguru correspondente a cada nível do logging
+    _levels: Dict[str, Union[str, int]] = {}
+
     def emit(self, record):
+        # Filtra logs indesejados do Pyrogram antes de qualquer outro trabalho
+        if record.levelno == logging.INFO and record.name.startswith("pyrogram"):
+            message = record.getMessage()
+            if not any(allowed in message for allowed in PYROGRAM_ALLOWED_MESSAGES):
+                return  # Ignora mensagens que não são necessárias
+
         # Get corresponding Loguru level if it exists
-        try:
-            level = loguru_logger.level(record.levelname).name
-        except ValueError:
-            level = record.levelno
+        level = self._levels.get(record.levelname)
+        if level is None:
+            try:
+                level = loguru_logger.level(record.levelname).name
+            except ValueError:
+                level = record.levelno
+            self._levels[record.levelname] = level
 
         # Find caller from where originated the logged message
         frame, depth = logging.currentframe(), 2
@@ -19,50 +55,162 @@ class InterceptHandler(logging.Handler):
             frame = frame.f_back
             depth += 1
 
-        # Filtra logs indesejados do Pyrogram
-        if "pyrogram" in record.name.lower() and record.levelname == "INFO":
-            # Apenas permite logs específicos do Pyrogram
-            allowed_messages = [
-                "Bot iniciado:",
-                "Bot está em execução",
-                "Bot parou",
-                "Comandos do bot configurados",
-            ]
-
-            # Verifica se a mensagem contém algum texto permitido
-            should_log = any(
-                allowed in record.getMessage() for allowed in allowed_messages
-            )
-            if not should_log:
-                return  # Ignora mensagens que não são necessárias
-
         loguru_logger.opt(depth=depth, exception=record.exc_info).log(
             level, record.getMessage()
         )
 
 
-# Remove manipuladores padrão do loguru
-loguru_logger.remove()
+class _NullLogger:
+    """Logger que descarta as chamadas dos eventos fora da amostragem"""
 
-# Adiciona saída para o console
-loguru_logger.add(
-    sys.stdout,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan> - <level>{message}</level>",
-    level="INFO",
-    colorize=True,
-    filter=lambda record: "pyrogram.session"
-    not in record["name"],  # Filtra logs de sessão
-)
+    def __getattr__(self, name: str):
+        return self._discard
 
-# Adiciona saída para arquivo com rotação
-loguru_logger.add(
-    "logs/pixbot.log",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-    level="DEBUG",
-    rotation="10 MB",
-    compression="zip",
-    retention="1 week",
-)
+    def _discard(self, *args, **kwargs) -> "_NullLogger":
+        return self
+
+
+_null_logger = _NullLogger()
+_event_loggers: Dict[str, "Logger"] = {}
+_sample_rates: Dict[str, float] = {}
+_handler_ids: List[int] = []
+# Saídas escolhidas na última configuração, mantidas nas recargas
+_outputs: Dict[str, Any] = {"console": True, "log_file": None}
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """
+    Converte "evento=fração,..." em um dicionário
+
+    Args:
+        spec: Taxas no formato "check_payment=0.1,show_qr=0.5"
+
+    Returns:
+        Dict[str, float]: Fração registrada de cada evento
+
+    Raises:
+        ValueError: Se alguma taxa estiver mal formatada
+    """
+    rates = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        event, sep, rate = item.partition("=")
+        if not sep:
+            raise ValueError(f"Taxa de amostragem inválida: {item!r}")
+        rates[event.strip()] = float(rate)
+    return rates
+
+
+def sampled(event: str):
+    """
+    Logger para eventos de alto volume, registrados só em uma fração das vezes
+
+    A fração vem de LOG_SAMPLE_RATES (ex.: "check_payment=0.1"); eventos sem
+    taxa configurada são sempre registrados. Quando o evento fica de fora, a
+    mensagem nem chega a ser formatada.
+
+    Args:
+        event: Nome do evento, incluído em "extra" na saída estruturada
+
+    Returns:
+        O logger com o evento associado, ou um logger que descarta tudo
+    """
+    rate = _sample_rates.get(event)
+    if rate is not None and random.random() >= rate:
+        return _null_logger
+
+    event_logger = _event_loggers.get(event)
+    if event_logger is None:
+        event_logger = _event_loggers[event] = loguru_logger.bind(event=event)
+    return event_logger
+
+
+def compress_in_background(path: str) -> None:
+    """
+    Compacta um arquivo de log rotacionado em outra thread
+
+    Args:
+        path: Caminho do arquivo já rotacionado
+    """
+
+    def compress():
+        try:
+            with zipfile.ZipFile(
+                f"{path}.zip", "w", compression=zipfile.ZIP_DEFLATED
+            ) as archive:
+                archive.write(path, os.path.basename(path))
+            os.remove(path)
+        except OSError as e:
+            sys.stderr.write(f"Erro ao compactar o log {path}: {e}\n")
+
+    # Não é daemon para que a compactação do último arquivo termine no encerramento
+    threading.Thread(target=compress, name="log-compression").start()
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    console: bool = True,
+    log_file: Optional[str] = None,
+) -> None:
+    """
+    (Re)configura as saídas de log
+
+    As mensagens são colocadas em uma fila e gravadas por uma thread do
+    loguru, fora do event loop.
+
+    Args:
+        level: Nível do console; usa LOG_LEVEL se omitido
+        console: Se False, registra apenas no arquivo
+        log_file: Arquivo de log; usa LOG_FILE se omitido
+    """
+    _outputs.update(console=console, log_file=log_file)
+
+    for handler_id in _handler_ids:
+        loguru_logger.remove(handler_id)
+    _handler_ids.clear()
+
+    _sample_rates.clear()
+    _sample_rates.update(parse_sample_rates(settings.log_sample_rates))
+
+    if console:
+        _handler_ids.append(
+            loguru_logger.add(
+                sys.stdout,
+                format="{message}" if settings.log_json else CONSOLE_FORMAT,
+                level=(level or settings.log_level).upper(),
+                colorize=not settings.log_json,
+                serialize=settings.log_json,
+                enqueue=True,
+                filter=lambda record: "pyrogram.session"
+                not in record["name"],  # Filtra logs de sessão
+            )
+        )
+
+    # Adiciona saída para arquivo com rotação
+    _handler_ids.append(
+        loguru_logger.add(
+            log_file or settings.log_file,
+            format=FILE_FORMAT,
+            level=settings.log_file_level.upper(),
+            rotation="10 MB",
+            compression=compress_in_background,
+            retention="1 week",
+            enqueue=True,
+        )
+    )
+
+
+@on_settings_reload
+def _apply_reloaded_settings(changed: Dict[str, Any]) -> None:
+    """Reinstala as saídas quando o nível ou a amostragem mudam"""
+    if "log_level" in changed or "log_sample_rates" in changed:
+        configure_logging(**_outputs)
+
+
+# Remove manipuladores padrão do loguru
+loguru_logger.remove()
+configure_logging()
 
 # Configura pyrogram para usar níveis de log mais adequados
 logging.getLogger("pyrogram").setLevel(logging.WARNING)
@@ -0,0 +1,173 @@
+"""
+Estatísticas agregadas das transações, mantidas incrementalmente
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from pixbot.models.transaction import Transaction
+    from pixbot.storage.base import TransactionStore
+
+# Status exibidos no relatório, na ordem do fluxo de pagamento
+STATUSES = ("created", "pending", "paid", "expired", "canceled", "failed")
+
+# Janelas do valor pago por hora e por dia
+HOURS = 24
+DAYS = 7
+
+HOUR_FORMAT = "%Y-%m-%dT%H"
+DAY_FORMAT = "%Y-%m-%d"
+
+
+def hour_key(moment: datetime) -> str:
+    """Contador do valor pago na hora de um instante"""
+    return f"paid_hour:{moment.strftime(HOUR_FORMAT)}"
+
+
+def day_key(moment: datetime) -> str:
+    """Contador do valor pago no dia de um instante"""
+    return f"paid_day:{moment.strftime(DAY_FORMAT)}"
+
+
+@dataclass(slots=True)
+class StatsReport:
+    """Números exibidos pelo comando /stats"""
+
+    created: int  # Cobranças criadas
+    by_status: Dict[str, Tuple[int, float]]  # status -> (quantidade, valor)
+    paid_by_hour: List[Tuple[datetime, float]]  # Últimas HOURS horas
+    paid_by_day: List[Tuple[datetime, float]]  # Últimos DAYS dias
+    conversion: float  # Fração das cobranças criadas que foram pagas
+    avg_time_to_pay: Optional[float]  # Segundos da criação ao pagamento
+
+
+class TransactionStats:
+    """
+    Contadores das transações atualizados a cada criação e mudança de status
+
+    Os contadores ficam no armazenamento das transações (veja
+    TransactionStore.add_stats), e aqui apenas os incrementos ainda não
+    gravados, enviados em lote junto com as transações, fora do event loop.
+    Com um armazenamento compartilhado, os contadores somam os incrementos
+    de todos os processos, e cada mudança de status é contabilizada apenas
+    pelo processo cuja gravação a aplicou (veja TransactionStore.update_status). O relatório lê uma quantidade fixa de contadores,
+    sem percorrer as transações.
+
+    Contadores: "created", "count:<status>", "amount:<status>",
+    "paid_hour:<hora>", "paid_day:<dia>", "pay_seconds" e "pay_count".
+    """
+
+    _pending: Dict[str, float] = defaultdict(float)
+
+    @classmethod
+    def _add(cls, deltas: Dict[str, float]) -> None:
+        """Acumula os incrementos até a próxima gravação em lote"""
+        for key, delta in deltas.items():
+            cls._pending[key] += delta
+
+    @classmethod
+    def record_created(cls, transaction: "Transaction") -> None:
+        """
+        Contabiliza uma nova transação
+
+        Args:
+            transaction: Transação criada
+        """
+        deltas = {
+            "created": 1,
+            f"count:{transaction.status}": 1,
+            f"amount:{transaction.status}": transaction.amount,
+        }
+        deltas.update(cls._paid_deltas(transaction))
+        cls._add(deltas)
+
+    @classmethod
+    def record_status(cls, transaction: "Transaction", old_status: str) -> None:
+        """
+        Move a transação do status anterior para o atual
+
+        Args:
+            transaction: Transação com o novo status
+            old_status: Status anterior
+        """
+        deltas = {
+            f"count:{old_status}": -1,
+            f"amount:{old_status}": -transaction.amount,
+            f"count:{transaction.status}": 1,
+            f"amount:{transaction.status}": transaction.amount,
+        }
+        deltas.update(cls._paid_deltas(transaction))
+        cls._add(deltas)
+
+    @staticmethod
+    def _paid_deltas(transaction: "Transaction") -> Dict[str, float]:
+        """Valor pago na hora e no dia atuais e tempo até o pagamento"""
+        if not transaction.is_paid():
+            return {}
+        now = datetime.now()
+        elapsed = max(0.0, (now - transaction.created_at).total_seconds())
+        return {
+            hour_key(now): transaction.amount,
+            day_key(now): transaction.amount,
+            "pay_seconds": elapsed,
+            "pay_count": 1,
+        }
+
+    @classmethod
+    def take_pending(cls) -> Dict[str, float]:
+        """Retira os incrementos ainda não gravados"""
+        batch = dict(cls._pending)
+        cls._pending.clear()
+        return batch
+
+    @classmethod
+    def restore_pending(cls, batch: Dict[str, float]) -> None:
+        """Devolve incrementos cuja gravação falhou"""
+        for key, delta in batch.items():
+            cls._pending[key] += delta
+
+    @classmethod
+    def report(
+        cls, store: "TransactionStore", now: Optional[datetime] = None
+    ) -> StatsReport:
+        """
+        Monta o relatório a partir dos contadores
+
+        Args:
+            store: Armazenamento das transações
+            now: Instante de referência das janelas (agora, se omitido)
+
+        Returns:
+            Instância de StatsReport
+        """
+        now = now or datetime.now()
+        hours = [now - timedelta(hours=i) for i in range(HOURS - 1, -1, -1)]
+        days = [now - timedelta(days=i) for i in range(DAYS - 1, -1, -1)]
+
+        keys = ["created", "pay_seconds", "pay_count"]
+        for status in STATUSES:
+            keys.extend((f"count:{status}", f"amount:{status}"))
+        keys.extend(hour_key(moment) for moment in hours)
+        keys.extend(day_key(moment) for moment in days)
+
+        values = store.load_stats(keys)
+        for key in keys:
+            values[key] = values.get(key, 0.0) + cls._pending.get(key, 0.0)
+
+        created = int(values["created"])
+        paid = int(values["count:paid"])
+        pay_count = int(values["pay_count"])
+        return StatsReport(
+            created=created,
+            by_status={
+                status: (int(values[f"count:{status}"]), values[f"amount:{status}"])
+                for status in STATUSES
+            },
+            paid_by_hour=[(moment, values[hour_key(moment)]) for moment in hours],
+            paid_by_day=[(moment, values[day_key(moment)]) for moment in days],
+            conversion=paid / created if created else 0.0,
+            avg_time_to_pay=values["pay_seconds"] / pay_count if pay_count else None,
+        )
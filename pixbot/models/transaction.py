@@ -2,14 +2,37 @@
 Modelo para representar transações de pagamento
 """
 
+import asyncio
+import sys
+import time
+from collections import OrderedDict, deque
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+)
 
 from pixbot.logger import logger
+from pixbot.models.stats import StatsReport, TransactionStats
+from pixbot.settings import get_settings
 
+if TYPE_CHECKING:
+    from pixbot.storage.base import TransactionStore
 
-@dataclass
+settings = get_settings()
+
+# Status finais: a transação não muda mais depois de atingi-los
+TERMINAL_STATUSES = frozenset({"paid", "expired", "canceled", "failed"})
+
+
+@dataclass(slots=True)
 class Transaction:
     """Classe para armazenar informações de uma transação de pagamento"""
 
@@ -21,10 +44,16 @@ class Transaction:
     status: str = "pending"  # pending, paid, expired, canceled, failed
     description: Optional[str] = None
     message_id: Optional[int] = None  # ID da mensagem no Telegram
+    chat_id: Optional[int] = None  # ID do chat onde a mensagem foi enviada
+    qr_file_id: Optional[str] = None  # file_id do QR Code já enviado ao Telegram
 
     @classmethod
     def from_api_response(
-        cls, api_data: Dict[str, Any], user_id: int, message_id: Optional[int] = None
+        cls,
+        api_data: Dict[str, Any],
+        user_id: int,
+        message_id: Optional[int] = None,
+        created_at: Optional[datetime] = None,
     ) -> "Transaction":
         """
         Cria uma instância de Transaction a partir da resposta da API
@@ -33,6 +62,7 @@ class Transaction:
             api_data: Resposta da API de pagamentos
             user_id: ID do usuário no Telegram
             message_id: ID da mensagem no Telegram (opcional)
+            created_at: Data de criação da cobrança (agora, se omitida)
 
         Returns:
             Nova instância de Transaction
@@ -42,7 +72,7 @@ class Transaction:
             user_id=user_id,
             amount=api_data.get("value", 0) / 100,  # Converte de centavos para reais
             qr_code=api_data.get("qr_code", ""),
-            created_at=datetime.now(),
+            created_at=created_at or datetime.now(),
             status=api_data.get("status", "pending"),
             description=api_data.get("description"),
             message_id=message_id,
@@ -52,10 +82,33 @@ class Transaction:
         """
         Atualiza os dados da transação a partir da resposta da API
 
+        Um status final só é substituído pela confirmação de pagamento de uma
+        cobrança expirada (veja accepts_status).
+
         Args:
             api_data: Resposta da API de pagamentos
         """
-        self.status = api_data.get("status", self.status)
+        status = api_data.get("status", self.status)
+        if self.accepts_status(status):
+            self.status = status
+
+    def accepts_status(self, status: str) -> bool:
+        """
+        Verifica se a transação pode passar para um status
+
+        Uma resposta atrasada da API (consulta iniciada antes do webhook, por
+        exemplo) não pode desfazer um status final. A única exceção é o
+        pagamento confirmado depois da expiração local.
+
+        Args:
+            status: Novo status
+
+        Returns:
+            True se a mudança pode ser aplicada
+        """
+        if not self.is_terminal():
+            return True
+        return self.is_expired() and status == "paid"
 
     def is_paid(self) -> bool:
         """Verifica se o pagamento foi confirmado"""
@@ -69,31 +122,128 @@ class Transaction:
         """Verifica se o pagamento expirou"""
         return self.status == "expired"
 
+    def is_terminal(self) -> bool:
+        """Verifica se a transação atingiu um status final"""
+        return self.status in TERMINAL_STATUSES
 
-# Gerenciador global de transações em memória
+    def get_chat_id(self) -> int:
+        """Retorna o chat da mensagem do pagamento (o privado do usuário por padrão)"""
+        return self.chat_id if self.chat_id is not None else self.user_id
+
+
+# Gerenciador global de transações
 class TransactionManager:
-    """Gerencia as transações do bot em memória"""
+    """
+    Gerencia as transações do bot
+
+    As transações ficam persistidas no backend configurado (SQLite por
+    padrão). As mais usadas são mantidas em memória (hot set), e as
+    alterações de status são gravadas em lote, fora do event loop.
+
+    Com um armazenamento compartilhado entre processos (Redis), as alterações
+    são gravadas na hora e as transações ainda pendentes são relidas a cada
+    acesso, já que outro processo pode tê-las atualizado. Todo acesso ao
+    armazenamento roda em uma thread auxiliar, fora do event loop.
+    """
 
-    _transactions = {}  # Dict[transaction_id, Transaction]
+    _transactions: "OrderedDict[str, Transaction]" = OrderedDict()  # hot set (LRU)
+    _accessed: Dict[str, float] = {}  # Último acesso de cada transação em memória
+    _terminal: Deque[Tuple[float, str]] = deque()  # (finalizada em, transaction_id)
+    _dirty: Dict[str, Transaction] = {}  # Alterações pendentes de gravação
+    _store: Optional["TransactionStore"] = None
+    _flush_task: Optional[asyncio.Task] = None
+    _flush_event: Optional[asyncio.Event] = None
+    _sweep_task: Optional[asyncio.Task] = None
 
     @classmethod
-    def add_transaction(cls, transaction: Transaction) -> None:
+    def get_store(cls) -> "TransactionStore":
+        """
+        Retorna o backend de armazenamento, criando-o na primeira chamada
+
+        Returns:
+            Instância de TransactionStore conforme settings.storage_backend
+        """
+        if cls._store is None:
+            backend = settings.storage_backend.lower()
+            if backend == "sqlite":
+                from pixbot.storage.sqlite import SQLiteTransactionStore
+
+                cls._store = SQLiteTransactionStore(settings.storage_path)
+            elif backend == "memory":
+                from pixbot.storage.memory import MemoryTransactionStore
+
+                cls._store = MemoryTransactionStore()
+            elif backend == "redis":
+                from pixbot.storage.redis import RedisTransactionStore, connect
+
+                cls._store = RedisTransactionStore(
+                    connect(), prefix=settings.redis_prefix
+                )
+            else:
+                raise ValueError(f"Backend de armazenamento desconhecido: {backend}")
+        return cls._store
+
+    @classmethod
+    def _remember(cls, transaction: Transaction) -> None:
+        """Mantém a transação no hot set, descartando as menos usadas"""
+        cls._transactions[transaction.id] = transaction
+        cls._transactions.move_to_end(transaction.id)
+        cls._accessed[transaction.id] = time.monotonic()
+        while len(cls._transactions) > settings.storage_hot_set_size:
+            transaction_id, _ = cls._transactions.popitem(last=False)
+            cls._accessed.pop(transaction_id, None)
+
+    @classmethod
+    def _forget(cls, transaction_id: str) -> None:
+        """Remove a transação da memória (continua no armazenamento)"""
+        cls._transactions.pop(transaction_id, None)
+        cls._accessed.pop(transaction_id, None)
+
+    @classmethod
+    async def _mark_dirty(cls, transaction: Transaction) -> None:
+        """Agenda a gravação da transação no próximo lote"""
+        store = cls.get_store()
+        if store.shared:
+            # Os outros processos precisam ver a alteração imediatamente
+            await asyncio.to_thread(store.upsert_many, (transaction,))
+            return
+
+        cls._dirty[transaction.id] = transaction
+        if (
+            cls._flush_event is not None
+            and len(cls._dirty) >= settings.storage_flush_batch_size
+        ):
+            cls._flush_event.set()
+
+    @classmethod
+    async def add_transaction(cls, transaction: Transaction) -> None:
         """
         Adiciona uma nova transação
 
+        A gravação roda em uma thread auxiliar, já que pode aguardar um lote
+        em gravação no armazenamento.
+
         Args:
             transaction: Instância de Transaction
         """
-        cls._transactions[transaction.id] = transaction
+        store = cls.get_store()
+        await asyncio.to_thread(store.insert, transaction)
+        TransactionStats.record_created(transaction)
+        cls._remember(transaction)
         logger.debug(
-            f"Nova transação adicionada: {transaction.id} para usuário {transaction.user_id}"
+            "Nova transação adicionada: {} para usuário {}",
+            transaction.id,
+            transaction.user_id,
         )
 
     @classmethod
-    def get_transaction(cls, transaction_id: str) -> Optional[Transaction]:
+    async def get_transaction(cls, transaction_id: str) -> Optional[Transaction]:
         """
         Obtém uma transação pelo ID
 
+        As que não estão em memória são lidas do armazenamento em uma thread
+        auxiliar.
+
         Args:
             transaction_id: ID da transação
 
@@ -101,12 +251,56 @@ class TransactionManager:
             Instância de Transaction ou None se não encontrada
         """
         transaction = cls._transactions.get(transaction_id)
+        if transaction:
+            cls._transactions.move_to_end(transaction_id)
+            cls._accessed[transaction_id] = time.monotonic()
+            if not transaction.is_terminal() and cls.get_store().shared:
+                await cls._refresh(transaction)
+            return transaction
+
+        # Não está no hot set: procura nas alterações pendentes e no armazenamento
+        transaction = cls._dirty.get(transaction_id)
+        if transaction is None:
+            stored = await asyncio.to_thread(cls.get_store().get, transaction_id)
+            # Outra chamada pode ter carregado a transação durante a leitura
+            transaction = (
+                cls._transactions.get(transaction_id)
+                or cls._dirty.get(transaction_id)
+                or stored
+            )
         if not transaction:
             logger.warning(f"Transação não encontrada: {transaction_id}")
+            return None
+
+        cls._remember(transaction)
         return transaction
 
     @classmethod
-    def update_transaction(
+    async def _refresh(cls, transaction: Transaction) -> None:
+        """Copia para a instância em memória as alterações de outros processos"""
+        stored = await asyncio.to_thread(cls.get_store().get, transaction.id)
+        if stored is None:
+            return
+        if stored.status != transaction.status and stored.is_terminal():
+            cls._terminal.append((time.monotonic(), transaction.id))
+        transaction.status = stored.status
+        for field in ("message_id", "chat_id", "qr_file_id"):
+            value = getattr(stored, field)
+            if value is not None:
+                setattr(transaction, field, value)
+
+    @classmethod
+    async def save_transaction(cls, transaction: Transaction) -> None:
+        """
+        Registra alterações feitas diretamente na transação (ex.: message_id)
+
+        Args:
+            transaction: Instância de Transaction alterada
+        """
+        await cls._mark_dirty(transaction)
+
+    @classmethod
+    async def update_transaction(
         cls, transaction_id: str, api_data: Dict[str, Any]
     ) -> Optional[Transaction]:
         """
@@ -119,12 +313,272 @@ class TransactionManager:
         Returns:
             Instância atualizada de Transaction ou None se não encontrada
         """
-        transaction = cls.get_transaction(transaction_id)
+        transaction = await cls.get_transaction(transaction_id)
         if transaction:
             old_status = transaction.status
+            status = api_data.get("status", old_status)
+            if not transaction.accepts_status(status):
+                # Resposta iniciada antes de a transação ser finalizada
+                logger.info(
+                    "Transação {} já está {}: status {} ignorado",
+                    transaction_id,
+                    old_status,
+                    status,
+                )
+                return transaction
+
             transaction.update_from_api(api_data)
+            store = cls.get_store()
+            if transaction.status != old_status and store.shared:
+                # Outro processo pode já ter gravado a mesma mudança: vale a
+                # transição aplicada pelo armazenamento, contabilizada uma vez
+                previous, transaction.status = await asyncio.to_thread(
+                    store.update_status, transaction
+                )
+                old_status = previous or old_status
+            elif transaction.status != old_status:
+                await cls._mark_dirty(transaction)
+            if transaction.status != old_status:
+                TransactionStats.record_status(transaction, old_status)
+                if transaction.is_terminal():
+                    cls._terminal.append((time.monotonic(), transaction_id))
             logger.info(
-                f"Transação {transaction_id} atualizada: status {old_status} -> {transaction.status}"
+                "Transação {} atualizada: status {} -> {}",
+                transaction_id,
+                old_status,
+                transaction.status,
             )
             return transaction
         return None
+
+    @classmethod
+    async def stats(cls) -> StatsReport:
+        """
+        Retorna as estatísticas agregadas das transações (sem percorrê-las)
+
+        Returns:
+            Instância de StatsReport
+        """
+        return await asyncio.to_thread(TransactionStats.report, cls.get_store())
+
+    @classmethod
+    def iter_by_status(cls, statuses: Iterable[str]) -> Iterator[Transaction]:
+        """
+        Percorre as transações armazenadas com algum dos status informados
+
+        Args:
+            statuses: Status desejados
+
+        Returns:
+            Iterador de Transaction, usando a cópia em memória quando houver
+        """
+        for stored in cls.get_store().iter_by_status(statuses):
+            yield cls._transactions.get(stored.id) or cls._dirty.get(
+                stored.id
+            ) or stored
+
+    @classmethod
+    def iter_created_between(
+        cls, start: datetime, end: datetime, statuses: Optional[Iterable[str]] = None
+    ) -> Iterator[Transaction]:
+        """
+        Percorre as transações criadas em um intervalo, em ordem de criação
+
+        As transações são lidas do armazenamento aos poucos, então a memória
+        usada não depende do tamanho do intervalo. Alterações ainda não
+        gravadas ficam de fora (veja write_pending).
+
+        Args:
+            start: Início do intervalo (inclusivo)
+            end: Fim do intervalo (exclusivo)
+            statuses: Status desejados (todos, se omitido)
+
+        Returns:
+            Iterador de Transaction
+        """
+        return cls.get_store().iter_created_between(start, end, statuses)
+
+    @classmethod
+    async def sweep(cls) -> int:
+        """
+        Remove da memória as transações ociosas ou finalizadas há algum tempo
+
+        Transações sem acesso há mais de settings.transaction_memory_ttl saem
+        do hot set, e as que atingiram um status final saem após
+        settings.terminal_memory_ttl. Todas continuam no armazenamento. A
+        limpeza do armazenamento (prune) roda em uma thread auxiliar.
+
+        Returns:
+            Quantidade de transações removidas da memória
+        """
+        now = time.monotonic()
+        evicted = 0
+
+        # O hot set está em ordem de uso: as ociosas ficam no início
+        idle_cutoff = now - settings.transaction_memory_ttl
+        while cls._transactions:
+            transaction_id = next(iter(cls._transactions))
+            if cls._accessed.get(transaction_id, 0) > idle_cutoff:
+                break
+            cls._forget(transaction_id)
+            evicted += 1
+
+        terminal_cutoff = now - settings.terminal_memory_ttl
+        while cls._terminal and cls._terminal[0][0] <= terminal_cutoff:
+            _, transaction_id = cls._terminal.popleft()
+            transaction = cls._transactions.get(transaction_id)
+            if (
+                transaction
+                and transaction.is_terminal()
+                and cls._accessed.get(transaction_id, 0) <= terminal_cutoff
+            ):
+                cls._forget(transaction_id)
+                evicted += 1
+
+        # Backends em memória também descartam as finalizadas há muito tempo
+        await asyncio.to_thread(
+            cls.get_store().prune,
+            datetime.now() - timedelta(seconds=settings.transaction_memory_ttl),
+        )
+
+        if evicted:
+            logger.debug(f"{evicted} transações removidas da memória")
+        return evicted
+
+    @staticmethod
+    def _sizeof(transaction: Transaction) -> int:
+        """Estima os bytes ocupados por uma transação e seus campos"""
+        return sys.getsizeof(transaction) + sum(
+            sys.getsizeof(getattr(transaction, field))
+            for field in ("id", "qr_code", "created_at", "description", "qr_file_id")
+        )
+
+    @classmethod
+    def memory_stats(cls) -> Dict[str, int]:
+        """
+        Retorna contadores de uso de memória do gerenciador
+
+        Returns:
+            Dicionário com transações em memória ("live"), alterações ainda
+            não gravadas ("dirty") e bytes estimados ("bytes")
+        """
+        return {
+            "live": len(cls._transactions),
+            "dirty": len(cls._dirty),
+            "bytes": sum(cls._sizeof(t) for t in cls._transactions.values()),
+        }
+
+    @classmethod
+    async def _sweep_loop(cls) -> None:
+        """Executa a limpeza da memória periodicamente"""
+        while True:
+            await asyncio.sleep(settings.memory_sweep_interval)
+            try:
+                await cls.sweep()
+            except Exception as e:
+                logger.error(f"Erro ao limpar transações da memória: {str(e)}")
+
+    @classmethod
+    def flush(cls) -> int:
+        """
+        Grava imediatamente as alterações pendentes
+
+        Returns:
+            Quantidade de transações gravadas
+        """
+        cls._flush_stats()
+        if not cls._dirty:
+            return 0
+
+        batch, cls._dirty = cls._dirty, {}
+        try:
+            return cls.get_store().upsert_many(batch.values())
+        except Exception:
+            # Devolve o lote para a próxima tentativa sem sobrescrever alterações novas
+            cls._dirty = {**batch, **cls._dirty}
+            raise
+
+    @classmethod
+    def _flush_stats(cls) -> None:
+        """Grava os incrementos pendentes das estatísticas"""
+        deltas = TransactionStats.take_pending()
+        if not deltas:
+            return
+        try:
+            cls.get_store().add_stats(deltas)
+        except Exception:
+            TransactionStats.restore_pending(deltas)
+            raise
+
+    @classmethod
+    async def _flush_loop(cls) -> None:
+        """Grava as alterações pendentes periodicamente ou quando o lote enche"""
+        while True:
+            try:
+                await asyncio.wait_for(
+                    cls._flush_event.wait(), timeout=settings.storage_flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            cls._flush_event.clear()
+            await cls.write_pending()
+
+    @classmethod
+    async def write_pending(cls) -> int:
+        """
+        Grava as alterações pendentes em uma thread auxiliar
+
+        Returns:
+            Quantidade de transações gravadas
+        """
+        deltas = TransactionStats.take_pending()
+        if deltas:
+            try:
+                await asyncio.to_thread(cls.get_store().add_stats, deltas)
+            except Exception as e:
+                logger.error(f"Erro ao gravar estatísticas: {str(e)}")
+                TransactionStats.restore_pending(deltas)
+
+        if not cls._dirty:
+            return 0
+
+        batch, cls._dirty = cls._dirty, {}
+        try:
+            count = await asyncio.to_thread(
+                cls.get_store().upsert_many, list(batch.values())
+            )
+        except Exception as e:
+            logger.error(f"Erro ao gravar transações: {str(e)}")
+            cls._dirty = {**batch, **cls._dirty}
+            return 0
+        logger.debug(f"{count} transações gravadas no armazenamento")
+        return count
+
+    @classmethod
+    async def start(cls) -> None:
+        """Abre o armazenamento e inicia a gravação em segundo plano"""
+        cls.get_store()
+        if cls._flush_task is None:
+            cls._flush_event = asyncio.Event()
+            cls._flush_task = asyncio.create_task(cls._flush_loop())
+        if cls._sweep_task is None:
+            cls._sweep_task = asyncio.create_task(cls._sweep_loop())
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Grava as alterações pendentes e fecha o armazenamento"""
+        if cls._sweep_task is not None:
+            cls._sweep_task.cancel()
+            await asyncio.gather(cls._sweep_task, return_exceptions=True)
+            cls._sweep_task = None
+
+        if cls._flush_task is not None:
+            cls._flush_task.cancel()
+            await asyncio.gather(cls._flush_task, return_exceptions=True)
+            cls._flush_task = None
+            cls._flush_event = None
+
+        if cls._store is not None:
+            await asyncio.to_thread(cls.flush)
+            cls._store.close()
+            cls._store = None
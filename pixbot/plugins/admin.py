@@ -0,0 +1,107 @@
+"""
+Comandos restritos aos administradores (ADMIN_IDS)
+"""
+
+import os
+
+from pyrogram import Client, filters
+from pyrogram.types import Message
+
+from pixbot.bot import PixBot
+from pixbot.logger import logger
+from pixbot.models.transaction import TransactionManager
+from pixbot.services.export import FORMATS, export_to_temp_file, parse_export_args
+from pixbot.services.update_queue import UpdateQueue
+from pixbot.settings import get_settings, reload_settings
+from pixbot.utils.messages import format_stats_message
+from pixbot.utils.metrics import track_handler
+
+settings = get_settings()
+
+# Aceita apenas mensagens privadas dos administradores
+admin_filter = filters.private & filters.user(settings.admin_ids)
+
+
+@PixBot.on_message(filters.command("reload") & admin_filter)
+@UpdateQueue.ordered
+@track_handler("reload_command")
+async def reload_command(client: Client, message: Message):
+    """
+    Recarrega as configurações do .env sem reiniciar o bot
+    """
+    logger.info(f"Administrador {message.from_user.id} solicitou recarga")
+
+    try:
+        changed = reload_settings()
+    except Exception as e:
+        logger.error(f"Erro ao recarregar configurações: {str(e)}")
+        await message.reply(f"❌ Configurações inválidas, nada foi alterado:\n`{e}`")
+        return
+
+    if changed:
+        # Apenas os nomes: os valores podem conter segredos (token)
+        fields = "\n".join(f"• `{name}`" for name in changed)
+        await message.reply(f"✅ **Configurações recarregadas:**\n{fields}")
+    else:
+        await message.reply("ℹ️ Nenhuma configuração recarregável foi alterada.")
+
+
+@PixBot.on_message(filters.command("stats") & admin_filter)
+@UpdateQueue.ordered
+@track_handler("stats_command")
+async def stats_command(client: Client, message: Message):
+    """
+    Mostra volume, valores por status, conversão e tempo até o pagamento
+    """
+    logger.info(f"Administrador {message.from_user.id} solicitou estatísticas")
+
+    try:
+        report = await TransactionManager.stats()
+    except Exception as e:
+        logger.error(f"Erro ao calcular estatísticas: {str(e)}")
+        await message.reply("❌ Não foi possível obter as estatísticas agora.")
+        return
+
+    await message.reply(format_stats_message(report))
+
+
+@PixBot.on_message(filters.command("export") & admin_filter)
+@UpdateQueue.ordered
+@track_handler("export_command")
+async def export_command(client: Client, message: Message):
+    """
+    Envia as transações como documento, para conciliação
+
+    Uso: /export [csv|columns] [AAAA-MM-DD] [AAAA-MM-DD] [status...]
+    """
+    try:
+        request = parse_export_args(message.command[1:])
+    except ValueError as e:
+        await message.reply(
+            f"❌ {e}\n\nUso: `/export [{'|'.join(FORMATS)}] [AAAA-MM-DD] "
+            "[AAAA-MM-DD] [status...]`"
+        )
+        return
+
+    logger.info(
+        f"Administrador {message.from_user.id} exportou transações de "
+        f"{request.start:%Y-%m-%d} a {request.end:%Y-%m-%d} ({request.fmt})"
+    )
+
+    try:
+        path, count = await export_to_temp_file(request)
+    except Exception as e:
+        logger.error(f"Erro ao exportar transações: {str(e)}")
+        await message.reply("❌ Não foi possível exportar as transações agora.")
+        return
+
+    try:
+        statuses = ", ".join(request.statuses) if request.statuses else "todos"
+        await client.send_document(
+            message.chat.id,
+            path,
+            file_name=request.file_name,
+            caption=f"📄 {count} transações (status: {statuses})",
+        )
+    finally:
+        os.remove(path)
@@ -1,8 +1,7 @@
-import asyncio
+import math
 import re
 
-from convopyro import listen_message
-from pyrogram import Client, enums, filters
+from pyrogram import Client, filters
 from pyrogram.errors import MessageNotModified
 from pyrogram.types import (
     CallbackQuery,
@@ -12,35 +11,27 @@ from pyrogram.types import (
 )
 
 from pixbot.bot import PixBot
-from pixbot.logger import logger
-from pixbot.models.transaction import Transaction, TransactionManager
-from pixbot.utils.helpers import create_payment_keyboard, create_qr_code
-from pixbot.utils.messages import LIMIT_EXCEEDED_MESSAGE  # Nova mensagem importada
-from pixbot.utils.messages import limit_exceeded_keyboard  # Novo teclado importado
-from pixbot.utils.messages import (
-    CUSTOM_AMOUNT_MESSAGE,
-    ERROR_MESSAGE,
-    INVALID_FORMAT_MESSAGE,
-    INVALID_VALUE_MESSAGE,
-    PAYMENT_CANCELED_MESSAGE,
-    PAYMENT_OPTIONS_MESSAGE,
-    PROCESSING_MESSAGE,
-    TIMEOUT_MESSAGE,
-    custom_amount_keyboard,
-    error_keyboard,
-    format_payment_message,
-    payment_canceled_keyboard,
-    payment_details_keyboard,
-    retry_custom_amount_keyboard,
-)
-from pixbot.utils.payment_api import PaymentAPI  # Nova exceção importada
+from pixbot.logger import logger, sampled
+from pixbot.models.transaction import TransactionManager
+from pixbot.services.charges import ChargeService
+from pixbot.services.expiry import ExpiryScheduler
+from pixbot.services.status_poller import StatusPoller
+from pixbot.services.update_queue import UpdateQueue
+from pixbot.settings import get_settings
+from pixbot.utils.callback_router import CB, router
+from pixbot.utils.conversations import Conversation, State, conversations
+from pixbot.utils.helpers import check_rate_limit
+from pixbot.utils.messages import ERROR_MESSAGE
+from pixbot.utils.metrics import track_handler
 from pixbot.utils.payment_api import PIXValueExceededError
+from pixbot.utils.screens import Screens
 
-# Estado para capturar valores personalizados
-custom_amount_users = set()
+settings = get_settings()
 
 
 @PixBot.on_message(filters.command("payment") & filters.private)
+@UpdateQueue.ordered
+@track_handler("payment_command")
 async def payment_command(client: Client, message: Message):
     """
     Manipulador para o comando /payment
@@ -50,71 +41,115 @@ async def payment_command(client: Client, message: Message):
     await show_payment_options_from_message(client, message)
 
 
-@PixBot.on_callback_query(filters.regex(r"^payment:(\d+\.\d+|\d+)$"))
-async def process_payment(client: Client, callback_query: CallbackQuery):
+@router.route(CB.PAYMENT, "payment")
+@track_handler("process_payment")
+async def process_payment(client: Client, callback_query: CallbackQuery, value: str):
     """
     Processa um pagamento com valor pré-definido
     """
     user = callback_query.from_user
-    value_match = re.match(r"payment:(\d+\.\d+|\d+)", callback_query.data)
-
-    if value_match:
-        value = float(value_match.group(1))
-        logger.info(f"Usuário {user.id} solicitou pagamento de R$ {value:.2f}")
-
-        # Notifica o usuário que o pagamento está sendo processado
-        await callback_query.answer("Gerando pagamento, aguarde...")
-
-        # Atualiza a mensagem para informar que está processando
-        await callback_query.message.edit_text(PROCESSING_MESSAGE)
-
-        try:
-            # Gera o pagamento PIX
-            pix_data = await PaymentAPI.generate_pix(value)
-
-            # Cria uma nova transação
-            transaction = Transaction.from_api_response(pix_data, user.id)
-            TransactionManager.add_transaction(transaction)
-
-            # Formata a mensagem com os detalhes do pagamento
-            message_text = format_payment_message(
-                value=transaction.amount,
-                qr_code=transaction.qr_code,
-                transaction_id=transaction.id,
-            )
-
-            # Cria teclado com opções para o pagamento
-            keyboard = payment_details_keyboard(transaction.id)
-
-            # Atualiza a mensagem com os detalhes do pagamento
-            sent_message = await callback_query.message.edit_text(
-                message_text,
-                reply_markup=keyboard,
-            )
-
-            # Atualiza o ID da mensagem na transação
-            transaction.message_id = sent_message.id
-
-        except PIXValueExceededError as e:
-            logger.warning(
-                f"Valor excedido para pagamento: R$ {value:.2f}, limite: R$ {e.limit:.2f}"
-            )
-
-            # Notifica o usuário sobre o limite
-            await callback_query.message.edit_text(
-                LIMIT_EXCEEDED_MESSAGE.format(limit=e.limit),
-                reply_markup=limit_exceeded_keyboard(),
-            )
-
-        except Exception as e:
-            logger.error(f"Erro ao gerar pagamento: {str(e)}")
-
-            # Notifica o usuário sobre o erro
-            await callback_query.message.edit_text(
-                ERROR_MESSAGE.format(details=str(e)), reply_markup=error_keyboard()
-            )
-    else:
+
+    try:
+        value = float(value)
+    except ValueError:
+        value = 0.0
+
+    if not (0 < value < math.inf):
         await callback_query.answer("Valor inválido")
+        return
+
+    sampled("process_payment").info(
+        "Usuário {} solicitou pagamento de R$ {:.2f}", user.id, value
+    )
+
+    # Toque repetido ou retorno às opções: exibe de novo a cobrança recente
+    key = (user.id, callback_query.message.id, value)
+    recent = ChargeService.recent(key)
+    if recent:
+        await callback_query.answer("Este pagamento já foi gerado")
+        screen = (
+            Screens.payment_status(recent)
+            if recent.is_terminal()
+            else Screens.payment_details(recent)
+        )
+        await _edit_message(callback_query.message, screen.text, screen.reply_markup)
+        return
+
+    # Verifica o limite de pagamentos gerados pelo usuário
+    if not await check_rate_limit(callback_query, "process_payment"):
+        return
+
+    # Notifica o usuário que o pagamento está sendo processado
+    await callback_query.answer("Gerando pagamento, aguarde...")
+
+    # Atualiza a mensagem para informar que está processando
+    await callback_query.message.edit_text(Screens.processing.text)
+
+    try:
+        # Gera a cobrança, ou aguarda a de um pedido igual em andamento
+        transaction, created = await ChargeService.create(key)
+
+        # Tela com os detalhes do pagamento
+        screen = Screens.payment_details(transaction)
+
+        # Atualiza a mensagem com os detalhes do pagamento; o pedido igual
+        # também exibe a cobrança, para a mensagem não parar em "processando"
+        await _edit_message(callback_query.message, screen.text, screen.reply_markup)
+        if not created:
+            return
+
+        # Atualiza o ID da mensagem na transação
+        transaction.message_id = callback_query.message.id
+        transaction.chat_id = callback_query.message.chat.id
+        await TransactionManager.save_transaction(transaction)
+
+        # Passa a verificar o pagamento automaticamente até a validade
+        StatusPoller.track(transaction)
+        ExpiryScheduler.track(transaction)
+
+    except PIXValueExceededError as e:
+        logger.warning(
+            f"Valor excedido para pagamento: R$ {value:.2f}, limite: R$ {e.limit:.2f}"
+        )
+
+        # Notifica o usuário sobre o limite
+        screen = Screens.limit_exceeded
+        await _edit_message(
+            callback_query.message,
+            screen.text.format(limit=e.limit),
+            screen.reply_markup,
+        )
+
+    except Exception as e:
+        logger.error(f"Erro ao gerar pagamento: {str(e)}")
+
+        # Notifica o usuário sobre o erro
+        screen = Screens.error
+        await _edit_message(
+            callback_query.message,
+            screen.text.format(details=str(e)),
+            screen.reply_markup,
+        )
+
+
+async def _edit_message(
+    message: Message, text: str, reply_markup: InlineKeyboardMarkup
+) -> None:
+    """
+    Edita a mensagem, ignorando quando ela já exibe o mesmo conteúdo
+
+    Dois pedidos iguais compartilham a mesma cobrança e editam a mesma
+    mensagem; o segundo a chegar não tem o que mudar.
+
+    Args:
+        message: Mensagem a ser editada
+        text: Novo texto
+        reply_markup: Novo teclado
+    """
+    try:
+        await message.edit_text(text, reply_markup=reply_markup)
+    except MessageNotModified:
+        pass
 
 
 async def show_payment_options_from_message(client: Client, message: Message):
@@ -124,159 +159,174 @@ async def show_payment_options_from_message(client: Client, message: Message):
     user = message.from_user
     logger.info(f"Usuário {user.id} solicitou opções de pagamento via comando")
 
-    # Criar teclado com valores pré-definidos
-    payment_keyboard = create_payment_keyboard()
+    # Tela com os valores pré-definidos
+    screen = Screens.payment_options
 
-    await message.reply(PAYMENT_OPTIONS_MESSAGE, reply_markup=payment_keyboard)
+    await message.reply(screen.text, reply_markup=screen.reply_markup)
 
 
-@PixBot.on_callback_query(filters.regex("^payment:custom$"))
+@router.route(CB.CUSTOM_AMOUNT)
+@track_handler("request_custom_amount")
 async def request_custom_amount(client: Client, callback_query: CallbackQuery):
     """
-    Solicita um valor personalizado para o pagamento usando convopyro
+    Solicita um valor personalizado para o pagamento
+
+    A resposta do usuário é entregue a process_custom_amount pelo motor de
+    conversas, em qualquer processo do bot.
     """
     user_id = callback_query.from_user.id
     chat_id = callback_query.message.chat.id
 
+    # Verifica o limite de pagamentos personalizados do usuário
+    if not await check_rate_limit(callback_query, "request_custom_amount"):
+        return
+
     # Informa ao usuário que estamos esperando o valor
+    screen = Screens.custom_amount
     await callback_query.message.edit_text(
-        CUSTOM_AMOUNT_MESSAGE, reply_markup=custom_amount_keyboard()
+        screen.text, reply_markup=screen.reply_markup
     )
 
     # Responde ao callback query
     await callback_query.answer()
 
+    # Aguarda o valor sem manter o handler suspenso
+    await conversations.begin(
+        client,
+        user_id,
+        chat_id,
+        State.AWAITING_AMOUNT,
+        timeout=settings.custom_amount_timeout,
+    )
+
+
+@conversations.on_timeout(State.AWAITING_AMOUNT)
+async def custom_amount_timeout(client: Client, conversation: Conversation):
+    """
+    Avisa o usuário que o valor personalizado não chegou a tempo
+    """
+    screen = Screens.timeout
+    await client.send_message(
+        conversation.chat_id, screen.text, reply_markup=screen.reply_markup
+    )
+
+
+@conversations.on_text(State.AWAITING_AMOUNT)
+async def process_custom_amount(
+    client: Client, response: Message, conversation: Conversation
+):
+    """
+    Gera o pagamento com o valor personalizado enviado pelo usuário
+    """
+    user_id = response.from_user.id
+
+    # Tenta converter o texto enviado para um valor numérico
+    try:
+        # Remove qualquer caractere que não seja número ou ponto
+        value_text = re.sub(r"[^\d.]", "", response.text)
+        value = float(value_text)
+    except ValueError:
+        # Valor não pôde ser convertido para float
+        screen = Screens.invalid_format
+        await response.reply(screen.text, reply_markup=screen.reply_markup)
+        return
+
+    # Verifica se o valor é válido (maior que zero)
+    if value <= 0:
+        screen = Screens.invalid_value
+        await response.reply(screen.text, reply_markup=screen.reply_markup)
+        return
+
+    # Mensagem reentregue: a cobrança já foi gerada para ela
+    key = (user_id, response.id, value)
+    if ChargeService.recent(key):
+        return
+
+    # Notifica que está processando o pagamento
+    processing_msg = await response.reply(Screens.processing.text)
+
     try:
-        # Espera a resposta do usuário com o valor personalizado
-        response = await client.listen.Message(
-            filters.text & filters.user(user_id), timeout=60
+        # Gera a cobrança, ou aguarda a de um pedido igual em andamento
+        transaction, created = await ChargeService.create(key)
+        if not created:
+            await processing_msg.delete()
+            return
+
+        # Tela com os detalhes do pagamento
+        screen = Screens.payment_details(transaction)
+
+        # Atualiza a mensagem com os detalhes do pagamento
+        sent_message = await processing_msg.edit_text(
+            screen.text, reply_markup=screen.reply_markup
         )
 
-        if response:
-            # Remove o estado de captura, já que agora usamos listen
-            if user_id in custom_amount_users:
-                custom_amount_users.remove(user_id)
-
-            # Tenta converter o texto enviado para um valor numérico
-            try:
-                # Remove qualquer caractere que não seja número ou ponto
-                value_text = re.sub(r"[^\d.]", "", response.text)
-                value = float(value_text)
-
-                # Verifica se o valor é válido (maior que zero)
-                if value <= 0:
-                    await response.reply(
-                        INVALID_VALUE_MESSAGE,
-                        reply_markup=retry_custom_amount_keyboard(),
-                    )
-                    return
-
-                # Notifica que está processando o pagamento
-                processing_msg = await response.reply(PROCESSING_MESSAGE)
-
-                try:
-                    # Gera o pagamento PIX
-                    pix_data = await PaymentAPI.generate_pix(value)
-
-                    # Cria uma nova transação
-                    transaction = Transaction.from_api_response(pix_data, user_id)
-                    TransactionManager.add_transaction(transaction)
-
-                    # Formata a mensagem com os detalhes do pagamento
-                    message_text = format_payment_message(
-                        value=transaction.amount,
-                        qr_code=transaction.qr_code,
-                        transaction_id=transaction.id,
-                    )
-
-                    # Cria teclado com opções para o pagamento
-                    keyboard = payment_details_keyboard(transaction.id)
-
-                    # Atualiza a mensagem com os detalhes do pagamento
-                    sent_message = await processing_msg.edit_text(
-                        message_text, reply_markup=keyboard
-                    )
-
-                    # Atualiza o ID da mensagem na transação
-                    transaction.message_id = sent_message.id
-
-                except PIXValueExceededError as e:
-                    logger.warning(
-                        f"Valor excedido para pagamento: R$ {value:.2f}, limite: R$ {e.limit:.2f}"
-                    )
-
-                    # Teclado para tentar novamente com valor menor
-                    keyboard = limit_exceeded_keyboard()
-
-                    # Notifica o usuário sobre o limite
-                    await processing_msg.edit_text(
-                        LIMIT_EXCEEDED_MESSAGE.format(limit=e.limit),
-                        reply_markup=keyboard,
-                    )
-
-                except Exception as e:
-                    logger.error(f"Erro ao gerar pagamento: {str(e)}")
-
-                    # Notifica o usuário sobre o erro
-                    await processing_msg.edit_text(
-                        ERROR_MESSAGE.format(details=str(e)),
-                        reply_markup=error_keyboard(),
-                    )
-
-            except ValueError:
-                # Valor não pôde ser convertido para float
-                await response.reply(
-                    INVALID_FORMAT_MESSAGE, reply_markup=retry_custom_amount_keyboard()
-                )
-    except asyncio.TimeoutError:
-        # Se o tempo expirar, notifica o usuário
-        await client.send_message(
-            chat_id, TIMEOUT_MESSAGE, reply_markup=retry_custom_amount_keyboard()
+        # Atualiza o ID da mensagem na transação
+        transaction.message_id = sent_message.id
+        transaction.chat_id = sent_message.chat.id
+        await TransactionManager.save_transaction(transaction)
+
+        # Passa a verificar o pagamento automaticamente até a validade
+        StatusPoller.track(transaction)
+        ExpiryScheduler.track(transaction)
+
+    except PIXValueExceededError as e:
+        logger.warning(
+            f"Valor excedido para pagamento: R$ {value:.2f}, limite: R$ {e.limit:.2f}"
+        )
+
+        # Notifica o usuário sobre o limite, com opção de valor menor
+        screen = Screens.limit_exceeded
+        await processing_msg.edit_text(
+            screen.text.format(limit=e.limit),
+            reply_markup=screen.reply_markup,
         )
+
     except Exception as e:
-        logger.error(f"Erro ao processar valor personalizado: {str(e)}")
-        await client.send_message(
-            chat_id,
-            ERROR_MESSAGE.format(details="Não foi possível processar sua solicitação."),
-            reply_markup=InlineKeyboardMarkup(
-                [
-                    [
-                        InlineKeyboardButton(
-                            "◀️ Voltar", callback_data="show_payment_options"
-                        )
-                    ]
-                ]
-            ),
+        logger.error(f"Erro ao gerar pagamento: {str(e)}")
+
+        # Notifica o usuário sobre o erro
+        screen = Screens.error
+        await processing_msg.edit_text(
+            screen.text.format(details=str(e)),
+            reply_markup=screen.reply_markup,
         )
 
 
-@PixBot.on_callback_query(filters.regex("^cancel_payment$"))
+@router.route(CB.CANCEL_PAYMENT, "cancel_payment")
+@track_handler("cancel_payment_request")
 async def cancel_payment_request(client: Client, callback_query: CallbackQuery):
     """
     Cancela o pedido de valor personalizado
     """
-    user_id = callback_query.from_user.id
-
-    # Cancela a escuta de mensagens para este usuário
-    await client.listen.Cancel(filters.user(user_id))
-
-    # Remove do set de usuários esperando valor personalizado (caso esteja usando o método antigo)
-    if user_id in custom_amount_users:
-        custom_amount_users.remove(user_id)
+    await conversations.end(callback_query.from_user.id)
 
+    screen = Screens.payment_canceled
     await callback_query.message.edit_text(
-        PAYMENT_CANCELED_MESSAGE, reply_markup=payment_canceled_keyboard()
+        screen.text, reply_markup=screen.reply_markup
     )
 
     await callback_query.answer("Solicitação de pagamento cancelada")
 
 
-@PixBot.on_message((filters.private) & (filters.text) & (~filters.regex("^/")))
+@PixBot.on_message(
+    filters.private & filters.text & ~filters.regex("^/") & conversations.filter()
+)
+@UpdateQueue.ordered
+@track_handler("handle_custom_amount")
 async def handle_custom_amount(client: Client, message: Message):
     """
-    Manipulador genérico para mensagens de texto que não são comandos
-    Mantido apenas para compatibilidade, mas não faz nada específico
-    já que estamos usando o convopyro para conversas
+    Entrega o texto ao estado da conversa em andamento do usuário
+
+    Mensagens de quem não tem conversa aberta nem chegam a este handler.
     """
-    # Este handler está vazio, usamos convopyro.listen para gerenciar as entradas do usuário
-    pass
+    try:
+        await conversations.dispatch_text(client, message)
+    except Exception as e:
+        logger.error(f"Erro ao processar valor personalizado: {str(e)}")
+        await client.send_message(
+            message.chat.id,
+            ERROR_MESSAGE.format(details="Não foi possível processar sua solicitação."),
+            reply_markup=InlineKeyboardMarkup(
+                [[InlineKeyboardButton("◀️ Voltar", callback_data=CB.PAYMENT_OPTIONS)]]
+            ),
+        )
@@ -1,29 +1,19 @@
-import asyncio
-
-from convopyro import listen_message
-from pyrogram import Client, enums, filters
-from pyrogram.types import (
-    CallbackQuery,
-    InlineKeyboardButton,
-    InlineKeyboardMarkup,
-    Message,
-)
+from pyrogram import Client, filters
+from pyrogram.types import CallbackQuery, Message
 
 from pixbot.bot import PixBot
-from pixbot.logger import logger
-from pixbot.utils.helpers import create_payment_keyboard
-from pixbot.utils.messages import (
-    ABOUT_MESSAGE,
-    HELP_MESSAGE,
-    PAYMENT_OPTIONS_MESSAGE,
-    WELCOME_MESSAGE,
-    main_menu_keyboard,
-)
+from pixbot.logger import logger, sampled
+from pixbot.services.update_queue import UpdateQueue
+from pixbot.utils.callback_router import CB, router
+from pixbot.utils.metrics import track_handler
+from pixbot.utils.screens import Screens
 
 # Removida a definição de WELCOME_MESSAGE, agora importada de messages.py
 
 
 @PixBot.on_message(filters.command("start") & filters.private)
+@UpdateQueue.ordered
+@track_handler("start_command")
 async def start_command(client: Client, message: Message):
     """
     Manipulador para o comando /start
@@ -32,67 +22,73 @@ async def start_command(client: Client, message: Message):
     user = message.from_user
     logger.info(f"Usuário {user.id} ({user.first_name}) iniciou o bot")
 
-    # Obtém o teclado do menu principal
-    keyboard = main_menu_keyboard()
-
-    # Envia a mensagem de boas-vindas
-    await message.reply(WELCOME_MESSAGE, reply_markup=keyboard)
+    # Envia a mensagem de boas-vindas com o menu principal
+    screen = Screens.main_menu
+    await message.reply(screen.text, reply_markup=screen.reply_markup)
 
 
-@PixBot.on_callback_query(filters.regex("^show_payment_options$"))
+@router.route(CB.PAYMENT_OPTIONS, "show_payment_options")
+@track_handler("show_payment_options")
 async def show_payment_options(client: Client, callback_query: CallbackQuery):
     """
     Exibe as opções de pagamento disponíveis
     """
     user = callback_query.from_user
-    logger.info(f"Usuário {user.id} solicitou opções de pagamento")
+    sampled("show_payment_options").info(
+        "Usuário {} solicitou opções de pagamento", user.id
+    )
 
-    # Obtém o teclado com valores de pagamento
-    payment_keyboard = create_payment_keyboard()
+    # Tela com os valores de pagamento
+    screen = Screens.payment_options
 
     await callback_query.message.edit_text(
-        PAYMENT_OPTIONS_MESSAGE, reply_markup=payment_keyboard
+        screen.text, reply_markup=screen.reply_markup
     )
 
     # Responde ao callback query
     await callback_query.answer()
 
 
-@PixBot.on_callback_query(filters.regex("^help$"))
+@router.route(CB.HELP, "help")
+@track_handler("show_help")
 async def show_help(client: Client, callback_query: CallbackQuery):
     """
     Exibe a mensagem de ajuda
     """
-    keyboard = InlineKeyboardMarkup(
-        [[InlineKeyboardButton("◀️ Voltar", callback_data="back_to_start")]]
-    )
+    screen = Screens.help
 
-    await callback_query.message.edit_text(HELP_MESSAGE, reply_markup=keyboard)
+    await callback_query.message.edit_text(
+        screen.text, reply_markup=screen.reply_markup
+    )
 
     await callback_query.answer()
 
 
-@PixBot.on_callback_query(filters.regex("^about$"))
+@router.route(CB.ABOUT, "about")
+@track_handler("show_about")
 async def show_about(client: Client, callback_query: CallbackQuery):
     """
     Exibe informações sobre o bot
     """
-    keyboard = InlineKeyboardMarkup(
-        [[InlineKeyboardButton("◀️ Voltar", callback_data="back_to_start")]]
-    )
+    screen = Screens.about
 
-    await callback_query.message.edit_text(ABOUT_MESSAGE, reply_markup=keyboard)
+    await callback_query.message.edit_text(
+        screen.text, reply_markup=screen.reply_markup
+    )
 
     await callback_query.answer()
 
 
-@PixBot.on_callback_query(filters.regex("^back_to_start$"))
+@router.route(CB.BACK_TO_START, "back_to_start")
+@track_handler("back_to_start")
 async def back_to_start(client: Client, callback_query: CallbackQuery):
     """
     Retorna ao menu inicial
     """
-    keyboard = main_menu_keyboard()
+    screen = Screens.main_menu
 
-    await callback_query.message.edit_text(WELCOME_MESSAGE, reply_markup=keyboard)
+    await callback_query.message.edit_text(
+        screen.text, reply_markup=screen.reply_markup
+    )
 
     await callback_query.answer()
@@ -0,0 +1,107 @@
+"""
+Criação idempotente de cobranças: toques repetidos reaproveitam a mesma cobrança
+"""
+
+from typing import Optional, Tuple
+
+from pixbot.logger import sampled
+from pixbot.models.transaction import Transaction, TransactionManager
+from pixbot.services.warm_pool import WarmPool
+from pixbot.settings import get_settings
+from pixbot.utils.cache import SingleFlight, TTLCache
+from pixbot.utils.metrics import CHARGES_DEDUPLICATED
+from pixbot.utils.payment_api import PaymentAPI
+
+settings = get_settings()
+
+# (usuário, mensagem de origem, valor)
+ChargeKey = Tuple[int, int, float]
+
+
+class ChargeService:
+    """
+    Cria as cobranças PIX sem duplicá-las
+
+    Cada pedido é identificado pelo usuário, pela mensagem em que foi feito e
+    pelo valor. Pedidos iguais enquanto a cobrança está sendo gerada
+    aguardam e recebem a mesma transação, e a transação criada continua
+    disponível por settings.charge_dedupe_ttl segundos para reenvios do
+    mesmo callback. Falhas não ficam em cache: um novo toque tenta de novo.
+    """
+
+    _flight = SingleFlight()
+    _recent: TTLCache[Transaction] = TTLCache(
+        maxsize=settings.charge_dedupe_size, ttl=settings.charge_dedupe_ttl
+    )
+
+    @classmethod
+    def recent(cls, key: ChargeKey) -> Optional[Transaction]:
+        """
+        Retorna a transação criada recentemente para o pedido, se houver
+
+        Args:
+            key: Chave (usuário, mensagem, valor) do pedido
+
+        Returns:
+            Instância de Transaction ou None
+        """
+        transaction = cls._recent.get(key)
+        if transaction is not None:
+            CHARGES_DEDUPLICATED.inc(source="cache")
+        return transaction
+
+    @classmethod
+    async def create(cls, key: ChargeKey) -> Tuple[Transaction, bool]:
+        """
+        Gera a cobrança do pedido ou reaproveita a que já foi gerada
+
+        Usa uma cobrança pronta do estoque (WarmPool) quando houver.
+
+        Args:
+            key: Chave (usuário, mensagem, valor) do pedido
+
+        Returns:
+            Tupla (transação, True se foi criada nesta chamada)
+
+        Raises:
+            PIXApiError: Erros da API, repassados a todos os pedidos iguais
+        """
+        transaction = cls.recent(key)
+        if transaction is not None:
+            return transaction, False
+
+        created = False
+
+        async def generate() -> Transaction:
+            nonlocal created
+            user_id, _, value = key
+
+            claimed = WarmPool.claim(value)
+            if claimed:
+                pix_data, created_at = claimed
+            else:
+                pix_data = await PaymentAPI.generate_pix(value)
+                created_at = None
+
+            transaction = Transaction.from_api_response(
+                pix_data, user_id, created_at=created_at
+            )
+            await TransactionManager.add_transaction(transaction)
+            cls._recent.set(key, transaction)
+            created = True
+            return transaction
+
+        transaction = await cls._flight.do(key, generate)
+        if not created:
+            CHARGES_DEDUPLICATED.inc(source="inflight")
+            sampled("process_payment").info(
+                "Pedido repetido do usuário {} reaproveitou a transação {}",
+                key[0],
+                transaction.id,
+            )
+        return transaction, created
+
+    @classmethod
+    def inflight(cls) -> int:
+        """Retorna a quantidade de cobranças sendo geradas"""
+        return cls._flight.inflight()
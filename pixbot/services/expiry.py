@@ -0,0 +1,203 @@
+"""
+Expiração local das cobranças PIX que passaram da validade
+"""
+
+import asyncio
+import heapq
+import time
+from typing import List, Optional, Set, Tuple
+
+from pyrogram import Client
+
+from pixbot.logger import logger
+from pixbot.models.transaction import Transaction, TransactionManager
+from pixbot.services.status_poller import StatusPoller
+from pixbot.settings import get_settings
+from pixbot.utils.helpers import notify_payment_status
+from pixbot.utils.metrics import TRANSACTIONS_EXPIRED
+
+settings = get_settings()
+
+# Status em que uma cobrança ainda pode ser paga
+PENDING_STATUSES = ("created", "pending")
+
+
+class ExpiryScheduler:
+    """
+    Marca como expiradas as cobranças pendentes após settings.pix_validity
+
+    As cobranças ficam em um heap ordenado pelo vencimento (criação +
+    validade), e uma única tarefa dorme até o próximo. As vencidas são
+    finalizadas em lotes: status "expired" (gravado pelo TransactionManager),
+    fim da verificação automática e mensagem editada para o teclado de
+    pagamento não concluído, que não consulta mais a API. Um pagamento
+    confirmado depois pelo webhook continua prevalecendo.
+    """
+
+    _heap: List[Tuple[float, str]] = []  # (vencimento em timestamp, transaction_id)
+    _scheduled: Set[str] = set()
+    _client: Optional[Client] = None
+    _task: Optional[asyncio.Task] = None
+    _wakeup: Optional[asyncio.Event] = None
+
+    @staticmethod
+    def deadline(transaction: Transaction) -> float:
+        """
+        Calcula o vencimento de uma cobrança
+
+        Args:
+            transaction: Instância de Transaction
+
+        Returns:
+            Timestamp (segundos desde a época) em que a cobrança expira
+        """
+        return transaction.created_at.timestamp() + settings.pix_validity
+
+    @classmethod
+    def track(cls, transaction: Transaction) -> None:
+        """
+        Agenda a expiração de uma cobrança pendente
+
+        Args:
+            transaction: Instância de Transaction
+        """
+        if not transaction.is_pending() or transaction.id in cls._scheduled:
+            return
+
+        deadline = cls.deadline(transaction)
+        cls._scheduled.add(transaction.id)
+        heapq.heappush(cls._heap, (deadline, transaction.id))
+
+        # Acorda a tarefa apenas se o novo vencimento for o mais próximo
+        if cls._wakeup is not None and cls._heap[0][1] == transaction.id:
+            cls._wakeup.set()
+
+    @classmethod
+    def untrack(cls, transaction_id: str) -> None:
+        """
+        Cancela a expiração de uma cobrança que deixou de estar pendente
+
+        A entrada fica no heap até o vencimento e é descartada ao sair dele.
+
+        Args:
+            transaction_id: ID da transação
+        """
+        cls._scheduled.discard(transaction_id)
+
+    @classmethod
+    def scheduled_count(cls) -> int:
+        """Retorna a quantidade de cobranças com expiração agendada"""
+        return len(cls._scheduled)
+
+    @classmethod
+    async def start(cls, client: Client) -> None:
+        """
+        Agenda as cobranças pendentes já armazenadas e inicia a expiração
+
+        Args:
+            client: Cliente do Pyrogram usado para editar as mensagens
+        """
+        if cls._task is not None:
+            return
+
+        cls._client = client
+        cls._wakeup = asyncio.Event()
+        # A leitura do armazenamento roda fora do event loop
+        pending = await asyncio.to_thread(
+            lambda: list(TransactionManager.iter_by_status(PENDING_STATUSES))
+        )
+        for transaction in pending:
+            cls.track(transaction)
+
+        cls._task = asyncio.create_task(cls._run())
+        logger.info(
+            f"Expiração de cobranças iniciada ({len(cls._scheduled)} pendentes, "
+            f"validade de {settings.pix_validity:g}s)"
+        )
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Interrompe a expiração (o agendamento é refeito ao iniciar)"""
+        if cls._task is None:
+            return
+
+        cls._task.cancel()
+        await asyncio.gather(cls._task, return_exceptions=True)
+        cls._task = None
+        cls._client = None
+        cls._wakeup = None
+        cls._heap.clear()
+        cls._scheduled.clear()
+
+    @classmethod
+    async def _run(cls) -> None:
+        """Laço principal: dorme até o próximo vencimento e finaliza os vencidos"""
+        while True:
+            if not cls._heap:
+                cls._wakeup.clear()
+                await cls._wakeup.wait()
+                continue
+
+            delay = cls._heap[0][0] - time.time()
+            if delay > 0:
+                cls._wakeup.clear()
+                try:
+                    await asyncio.wait_for(cls._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await cls._expire_batch()
+            except Exception as e:
+                logger.error(f"Erro ao expirar cobranças: {str(e)}")
+
+    @classmethod
+    async def _expire_batch(cls) -> int:
+        """
+        Finaliza até settings.expiry_batch_size cobranças vencidas
+
+        Returns:
+            Quantidade de cobranças marcadas como expiradas
+        """
+        now = time.time()
+        expired: List[Transaction] = []
+        while (
+            cls._heap
+            and cls._heap[0][0] <= now
+            and len(expired) < settings.expiry_batch_size
+        ):
+            _, transaction_id = heapq.heappop(cls._heap)
+            if transaction_id not in cls._scheduled:
+                # Finalizada antes do vencimento (veja untrack)
+                continue
+            cls._scheduled.discard(transaction_id)
+
+            # Finalizadas sem passar por untrack saem do heap apenas agora
+            transaction = await TransactionManager.get_transaction(transaction_id)
+            if transaction is None or not transaction.is_pending():
+                continue
+
+            await TransactionManager.update_transaction(
+                transaction_id, {"status": "expired"}
+            )
+            if not transaction.is_expired():
+                # Paga durante a leitura: o status final não é desfeito
+                continue
+            StatusPoller.untrack(transaction_id)
+            expired.append(transaction)
+
+        if not expired:
+            return 0
+
+        TRANSACTIONS_EXPIRED.inc(len(expired))
+        logger.info(f"{len(expired)} cobranças marcadas como expiradas")
+
+        if cls._client is not None:
+            await asyncio.gather(
+                *(
+                    notify_payment_status(cls._client, transaction)
+                    for transaction in expired
+                )
+            )
+        return len(expired)
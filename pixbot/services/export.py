@@ -0,0 +1,245 @@
+"""
+Exportação das transações em fluxo (CSV ou colunar compactado) para conciliação
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import IO, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from pixbot.models.stats import STATUSES
+from pixbot.models.transaction import Transaction, TransactionManager
+
+# Colunas exportadas, na ordem dos arquivos
+COLUMNS = (
+    "id",
+    "created_at",
+    "status",
+    "amount",
+    "user_id",
+    "chat_id",
+    "message_id",
+    "description",
+)
+
+# Formato -> extensão do arquivo
+FORMATS = {"csv": "csv", "columns": "jsonl.gz"}
+
+# Linhas por bloco do formato colunar
+BLOCK_SIZE = 1000
+
+# Período exportado quando a data inicial é omitida
+DEFAULT_DAYS = 30
+
+DATE_FORMAT = "%Y-%m-%d"
+
+Row = Tuple[Any, ...]
+
+
+@dataclass(slots=True)
+class ExportRequest:
+    """Filtros e formato de uma exportação"""
+
+    fmt: str
+    start: datetime  # Inclusivo
+    end: datetime  # Exclusivo
+    statuses: Optional[List[str]] = None  # Todos, se None
+
+    @property
+    def file_name(self) -> str:
+        """Nome do arquivo exportado"""
+        last_day = self.end - timedelta(days=1)
+        return f"transacoes_{self.start:%Y%m%d}-{last_day:%Y%m%d}.{FORMATS[self.fmt]}"
+
+
+def parse_export_args(args: Sequence[str]) -> ExportRequest:
+    """
+    Interpreta os argumentos "[formato] [início] [fim] [status...]"
+
+    As datas estão no formato AAAA-MM-DD e o dia final é incluído. Sem datas,
+    exporta os últimos DEFAULT_DAYS dias; com apenas o início, até hoje.
+
+    Args:
+        args: Argumentos em qualquer ordem, exceto que o início vem antes do fim
+
+    Returns:
+        Instância de ExportRequest
+
+    Raises:
+        ValueError: Formato, data ou status inválidos
+    """
+    fmt = "csv"
+    dates: List[datetime] = []
+    statuses: List[str] = []
+    for arg in args:
+        value = arg.strip().lower()
+        if value in FORMATS:
+            fmt = value
+        elif value in STATUSES:
+            statuses.append(value)
+        else:
+            try:
+                dates.append(datetime.strptime(value, DATE_FORMAT))
+            except ValueError:
+                raise ValueError(f"Argumento inválido: {arg}") from None
+
+    if len(dates) > 2:
+        raise ValueError("Informe no máximo duas datas (início e fim)")
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = dates[0] if dates else today - timedelta(days=DEFAULT_DAYS - 1)
+    end = (dates[1] if len(dates) == 2 else today) + timedelta(days=1)
+    if end <= start:
+        raise ValueError("A data final deve ser igual ou posterior à inicial")
+
+    return ExportRequest(fmt, start, end, statuses or None)
+
+
+def to_row(transaction: Transaction) -> Row:
+    """Converte uma transação em uma linha com as colunas de COLUMNS"""
+    return (
+        transaction.id,
+        transaction.created_at.isoformat(timespec="seconds"),
+        transaction.status,
+        round(transaction.amount, 2),
+        transaction.user_id,
+        transaction.chat_id,
+        transaction.message_id,
+        transaction.description,
+    )
+
+
+def iter_rows(
+    start: datetime, end: datetime, statuses: Optional[Iterable[str]] = None
+) -> Iterator[Row]:
+    """
+    Gera as linhas das transações criadas no intervalo, em ordem de criação
+
+    Args:
+        start: Início do intervalo (inclusivo)
+        end: Fim do intervalo (exclusivo)
+        statuses: Status desejados (todos, se omitido)
+
+    Returns:
+        Iterador de linhas
+    """
+    for transaction in TransactionManager.iter_created_between(start, end, statuses):
+        yield to_row(transaction)
+
+
+def write_csv(rows: Iterable[Row], output: IO[str]) -> int:
+    """
+    Escreve as linhas em CSV, com cabeçalho
+
+    Args:
+        rows: Linhas com as colunas de COLUMNS
+        output: Arquivo de texto aberto com newline=""
+
+    Returns:
+        Quantidade de linhas escritas
+    """
+    writer = csv.writer(output)
+    writer.writerow(COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_columns(
+    rows: Iterable[Row], output: IO[bytes], block_size: int = BLOCK_SIZE
+) -> int:
+    """
+    Escreve as linhas no formato colunar: JSON Lines compactado com gzip
+
+    A primeira linha descreve o arquivo ({"format", "version", "columns"}),
+    e cada linha seguinte é um bloco de até block_size transações, com uma
+    lista de valores por coluna, na ordem de "columns". Valores repetidos
+    em uma coluna (status, usuário) compactam bem, e apenas um bloco fica em
+    memória ao escrever ou ler.
+
+    Args:
+        rows: Linhas com as colunas de COLUMNS
+        output: Arquivo binário
+        block_size: Linhas por bloco
+
+    Returns:
+        Quantidade de linhas escritas
+    """
+    count = 0
+    with gzip.GzipFile(fileobj=output, mode="wb") as compressed:
+        writer = io.TextIOWrapper(compressed, encoding="utf-8")
+        header = {"format": "pixbot-columns", "version": 1, "columns": COLUMNS}
+        writer.write(json.dumps(header) + "\n")
+
+        block: List[Row] = []
+        for row in rows:
+            block.append(row)
+            if len(block) >= block_size:
+                writer.write(
+                    json.dumps(list(zip(*block, strict=True)), ensure_ascii=False)
+                    + "\n"
+                )
+                count += len(block)
+                block.clear()
+        if block:
+            writer.write(
+                json.dumps(list(zip(*block, strict=True)), ensure_ascii=False) + "\n"
+            )
+            count += len(block)
+
+        writer.flush()
+        writer.detach()
+    return count
+
+
+def export_to_file(request: ExportRequest, path: str) -> int:
+    """
+    Exporta as transações para um arquivo (bloqueante)
+
+    Args:
+        request: Filtros e formato
+        path: Caminho do arquivo de saída
+
+    Returns:
+        Quantidade de transações exportadas
+    """
+    rows = iter_rows(request.start, request.end, request.statuses)
+    if request.fmt == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as output:
+            return write_csv(rows, output)
+    with open(path, "wb") as output:
+        return write_columns(rows, output)
+
+
+async def export_to_temp_file(request: ExportRequest) -> Tuple[str, int]:
+    """
+    Exporta as transações para um arquivo temporário, fora do event loop
+
+    Grava antes as alterações pendentes, para que o arquivo inclua as
+    mudanças de status mais recentes. O arquivo deve ser removido por quem
+    chamou.
+
+    Args:
+        request: Filtros e formato
+
+    Returns:
+        Tupla (caminho do arquivo, quantidade de transações)
+    """
+    await TransactionManager.write_pending()
+
+    fd, path = tempfile.mkstemp(suffix=f".{FORMATS[request.fmt]}")
+    os.close(fd)
+    try:
+        count = await asyncio.to_thread(export_to_file, request, path)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, count
@@ -0,0 +1,117 @@
+"""
+Endpoint HTTP de métricas (formato Prometheus) e monitor do event loop
+"""
+
+import asyncio
+from typing import Optional
+
+from aiohttp import web
+
+from pixbot.logger import logger
+from pixbot.models.transaction import TransactionManager
+from pixbot.services.expiry import ExpiryScheduler
+from pixbot.services.outbound import OutboundQueue
+from pixbot.services.status_poller import StatusPoller
+from pixbot.services.update_queue import UpdateQueue
+from pixbot.services.warm_pool import WarmPool
+from pixbot.settings import get_settings
+from pixbot.utils.circuit_breaker import CircuitBreaker
+from pixbot.utils.conversations import conversations
+from pixbot.utils.metrics import (
+    CIRCUIT_BREAKER_STATE,
+    EVENT_LOOP_LAG,
+    EVENT_LOOP_LAG_LAST,
+    EXPIRY_SCHEDULED,
+    OUTBOUND_QUEUE,
+    PENDING_CONVERSATIONS,
+    POLLER_TRACKED,
+    RATE_LIMITER_KEYS,
+    TRANSACTIONS_MEMORY,
+    UPDATE_QUEUE,
+    WARM_POOL_CHARGES,
+    render_metrics,
+)
+from pixbot.utils.payment_api import PaymentAPI
+from pixbot.utils.rate_limiter import rate_limiter
+
+settings = get_settings()
+
+
+class MetricsServer:
+    """Expõe as métricas em /metrics e mede o atraso do event loop"""
+
+    _runner: Optional[web.AppRunner] = None
+    _lag_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _register_gauges() -> None:
+        """Associa os gauges lidos na coleta aos componentes do bot"""
+        TRANSACTIONS_MEMORY.set_function(TransactionManager.memory_stats)
+        PENDING_CONVERSATIONS.set_function(lambda: len(conversations))
+        RATE_LIMITER_KEYS.set_function(lambda: len(rate_limiter))
+        POLLER_TRACKED.set_function(StatusPoller.pending_count)
+        EXPIRY_SCHEDULED.set_function(ExpiryScheduler.scheduled_count)
+        WARM_POOL_CHARGES.set_function(WarmPool.sizes)
+        UPDATE_QUEUE.set_function(UpdateQueue.stats)
+        OUTBOUND_QUEUE.set_function(OutboundQueue.stats)
+        CIRCUIT_BREAKER_STATE.set_function(
+            lambda: {
+                state: int(PaymentAPI.breaker.state == state)
+                for state in (
+                    CircuitBreaker.CLOSED,
+                    CircuitBreaker.HALF_OPEN,
+                    CircuitBreaker.OPEN,
+                )
+            }
+        )
+
+    @staticmethod
+    async def handle_metrics(request: web.Request) -> web.Response:
+        """Retorna as métricas no formato de exposição do Prometheus"""
+        return web.Response(
+            text=render_metrics(), content_type="text/plain", charset="utf-8"
+        )
+
+    @classmethod
+    async def _monitor_loop_lag(cls) -> None:
+        """Mede quanto o event loop atrasa para acordar uma tarefa agendada"""
+        loop = asyncio.get_running_loop()
+        interval = settings.metrics_loop_lag_interval
+        while True:
+            scheduled = loop.time() + interval
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - scheduled)
+            EVENT_LOOP_LAG.observe(lag)
+            EVENT_LOOP_LAG_LAST.set(lag)
+
+    @classmethod
+    async def start(cls) -> None:
+        """Inicia o endpoint de métricas e o monitor do event loop"""
+        if cls._runner is not None:
+            return
+
+        cls._register_gauges()
+
+        app = web.Application()
+        app.router.add_get("/metrics", cls.handle_metrics)
+        cls._runner = web.AppRunner(app, access_log=None)
+        await cls._runner.setup()
+        site = web.TCPSite(cls._runner, settings.metrics_host, settings.metrics_port)
+        await site.start()
+
+        cls._lag_task = asyncio.create_task(cls._monitor_loop_lag())
+        logger.info(
+            f"Métricas disponíveis em http://{settings.metrics_host}:{settings.metrics_port}/metrics"
+        )
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Encerra o endpoint de métricas"""
+        if cls._lag_task is not None:
+            cls._lag_task.cancel()
+            await asyncio.gather(cls._lag_task, return_exceptions=True)
+            cls._lag_task = None
+
+        if cls._runner is not None:
+            await cls._runner.cleanup()
+            cls._runner = None
@@ -0,0 +1,361 @@
+"""
+Fila de envio ao Telegram com limites de taxa, FloodWait e edições combinadas
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import OrderedDict, deque
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from pyrogram import raw
+from pyrogram.errors import FloodWait
+
+from pixbot.logger import logger, sampled
+from pixbot.settings import get_settings
+from pixbot.utils.metrics import (
+    OUTBOUND_COALESCED,
+    OUTBOUND_WAIT,
+    TELEGRAM_FLOOD_WAITS,
+)
+from pixbot.utils.rate_limiter import TokenBucket, parse_rate
+
+settings = get_settings()
+
+# Função que executa a chamada na API do Telegram
+Send = Callable[[Any], Awaitable[Any]]
+
+# Chamadas que enviam ou editam mensagens, sujeitas aos limites de envio
+QUEUED_QUERIES = (
+    raw.functions.messages.SendMessage,
+    raw.functions.messages.SendMedia,
+    raw.functions.messages.SendMultiMedia,
+    raw.functions.messages.ForwardMessages,
+    raw.functions.messages.EditMessage,
+)
+
+# Partes de uma edição: a mais nova só substitui a pendente se alterar as mesmas
+EDIT_FIELDS = ("message", "media", "reply_markup")
+
+
+class _Job:
+    """Chamada aguardando envio e os futuros de quem a solicitou"""
+
+    __slots__ = ("query", "send", "futures", "edit_key", "queued_at")
+
+    def __init__(self, query: Any, send: Send, edit_key: Optional[Tuple]):
+        self.query = query
+        self.send = send
+        self.futures: List[asyncio.Future] = []
+        self.edit_key = edit_key
+        self.queued_at = time.perf_counter()
+
+
+class _Lane:
+    """Fila de um chat: envia uma chamada de cada vez, na ordem de chegada"""
+
+    __slots__ = ("jobs", "bucket", "paused_until", "busy", "scheduled")
+
+    def __init__(self, bucket: TokenBucket):
+        self.jobs: Deque[_Job] = deque()
+        self.bucket = bucket
+        self.paused_until = 0.0  # O chat não envia antes disso (time.monotonic)
+        self.busy = False  # Há uma chamada do chat em andamento
+        self.scheduled = False  # O chat está no heap de prontos
+
+
+def _chat_key(query: Any) -> Hashable:
+    """Identifica o chat de destino de uma chamada"""
+    peer = getattr(query, "peer", None) or getattr(query, "to_peer", None)
+    for attr in ("user_id", "chat_id", "channel_id"):
+        value = getattr(peer, attr, None)
+        if value is not None:
+            return value
+    return type(peer).__name__
+
+
+def _supersedes(new: Any, old: Any) -> bool:
+    """Indica se a edição nova torna a pendente desnecessária"""
+    return all(
+        getattr(new, field) is not None
+        for field in EDIT_FIELDS
+        if getattr(old, field) is not None
+    )
+
+
+class OutboundQueue:
+    """
+    Envia as mensagens ao Telegram respeitando os limites de envio
+
+    Toda chamada que envia ou edita mensagens passa por aqui (veja
+    PixBot.invoke). Cada chat tem sua fila, atendida em ordem e uma chamada
+    de cada vez, com o limite settings.telegram_rate_chat; a soma dos chats
+    respeita settings.telegram_rate_global. Um FloodWait adia apenas o chat
+    afetado pelo tempo pedido pelo Telegram, e a chamada é repetida em vez de
+    falhar. Edições da mesma mensagem que ainda aguardam envio são
+    combinadas: só o conteúdo mais novo é enviado, e todos os solicitantes
+    recebem o resultado dele.
+    """
+
+    # Filas ociosas descartadas por envio, no máximo
+    CLEANUP_BATCH = 8
+
+    _lanes: "OrderedDict[Hashable, _Lane]" = OrderedDict()
+    _edits: Dict[Tuple[Hashable, int], _Job] = {}  # Edição pendente por mensagem
+    _ready: List[Tuple[float, int, Hashable]] = []  # (liberado em, ordem, chat)
+    _sequence = itertools.count()
+    _global: Optional[TokenBucket] = None
+    _task: Optional[asyncio.Task] = None
+    _wakeup: Optional[asyncio.Event] = None
+    _idle: Optional[asyncio.Event] = None  # Sem chamadas prontas nem em envio
+    _sending: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def accepts(query: Any) -> bool:
+        """Indica se a chamada deve passar pela fila de envio"""
+        return settings.outbound_enabled and isinstance(query, QUEUED_QUERIES)
+
+    @classmethod
+    async def submit(cls, query: Any, send: Send) -> Any:
+        """
+        Enfileira uma chamada e aguarda sua execução
+
+        Args:
+            query: Função da API do Telegram (raw.functions)
+            send: Executa a chamada; recebe a query a enviar, que pode ser uma
+                edição mais nova da mesma mensagem
+
+        Returns:
+            Resultado da chamada
+
+        Raises:
+            RPCError: Erros do Telegram, exceto FloodWait
+        """
+        now = time.monotonic()
+        if cls._task is None:
+            cls._global = TokenBucket(*parse_rate(settings.telegram_rate_global), now)
+            cls._wakeup = asyncio.Event()
+            cls._idle = asyncio.Event()
+            cls._idle.set()
+            cls._task = asyncio.create_task(cls._run())
+
+        future = asyncio.get_running_loop().create_future()
+        chat = _chat_key(query)
+        edit_key = None
+        if isinstance(query, raw.functions.messages.EditMessage):
+            edit_key = (chat, query.id)
+            pending = cls._edits.get(edit_key)
+            if pending is not None and _supersedes(query, pending.query):
+                pending.query = query
+                pending.send = send
+                pending.futures.append(future)
+                OUTBOUND_COALESCED.inc()
+                return await future
+
+        cls._cleanup(now)
+        lane = cls._lanes.get(chat)
+        if lane is None:
+            bucket = TokenBucket(*parse_rate(settings.telegram_rate_chat), now)
+            lane = cls._lanes[chat] = _Lane(bucket)
+        else:
+            cls._lanes.move_to_end(chat)
+
+        job = _Job(query, send, edit_key)
+        job.futures.append(future)
+        lane.jobs.append(job)
+        if edit_key is not None:
+            cls._edits[edit_key] = job
+        cls._schedule(chat, lane, now)
+        return await future
+
+    @classmethod
+    def _schedule(cls, chat: Hashable, lane: _Lane, now: float) -> None:
+        """Coloca o chat no heap de prontos, se tiver chamadas a enviar"""
+        if lane.scheduled or lane.busy or not lane.jobs:
+            return
+        lane.scheduled = True
+        cls._idle.clear()
+        ready_at = max(now, lane.paused_until)
+        heapq.heappush(cls._ready, (ready_at, next(cls._sequence), chat))
+        if cls._ready[0][2] == chat:
+            cls._wakeup.set()
+
+    @classmethod
+    def _cleanup(cls, now: float) -> None:
+        """Descarta algumas filas ociosas (as mais antigas ficam no início)"""
+        for _ in range(cls.CLEANUP_BATCH):
+            if not cls._lanes:
+                return
+            chat, lane = next(iter(cls._lanes.items()))
+            bucket = lane.bucket
+            # Só sai quem já teria o balde cheio, para não ganhar fichas extras
+            full_at = bucket.updated + (bucket.capacity - bucket.tokens) / bucket.rate
+            if lane.jobs or lane.busy or full_at > now or lane.paused_until > now:
+                return
+            del cls._lanes[chat]
+
+    @classmethod
+    async def _sleep(cls, delay: float) -> None:
+        """Dorme até o prazo ou até um chat ficar pronto antes dele"""
+        cls._wakeup.clear()
+        try:
+            await asyncio.wait_for(cls._wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    @classmethod
+    async def _run(cls) -> None:
+        """Laço principal: libera os chats prontos conforme os limites de envio"""
+        while True:
+            if not cls._ready:
+                cls._wakeup.clear()
+                await cls._wakeup.wait()
+                continue
+
+            ready_at, _, chat = cls._ready[0]
+            now = time.monotonic()
+            if ready_at > now:
+                await cls._sleep(ready_at - now)
+                continue
+
+            cls._global.refill(now)
+            wait = cls._global.wait_time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            heapq.heappop(cls._ready)
+            lane = cls._lanes[chat]
+            lane.scheduled = False
+            lane.bucket.refill(now)
+            wait = lane.bucket.wait_time()
+            if wait > 0:
+                lane.paused_until = max(lane.paused_until, now + wait)
+                cls._schedule(chat, lane, now)
+                continue
+
+            job = lane.jobs.popleft()
+            if job.edit_key is not None and cls._edits.get(job.edit_key) is job:
+                del cls._edits[job.edit_key]
+
+            cls._global.tokens -= 1
+            lane.bucket.tokens -= 1
+            lane.busy = True
+            task = asyncio.create_task(cls._send(chat, lane, job))
+            cls._sending.add(task)
+            task.add_done_callback(cls._sending.discard)
+            task.add_done_callback(cls._check_idle)
+
+    @classmethod
+    def _check_idle(cls, _task: asyncio.Task) -> None:
+        """Sinaliza o fim dos envios quando não há mais nada pronto nem em envio"""
+        if cls._idle is not None and not cls._ready and not cls._sending:
+            cls._idle.set()
+
+    @classmethod
+    async def _send(cls, chat: Hashable, lane: _Lane, job: _Job) -> None:
+        """Executa uma chamada e entrega o resultado a todos os solicitantes"""
+        OUTBOUND_WAIT.observe(time.perf_counter() - job.queued_at)
+        try:
+            result = await job.send(job.query)
+        except FloodWait as e:
+            TELEGRAM_FLOOD_WAITS.inc()
+            sampled("outbound").warning(
+                "FloodWait de {}s no chat {}, envio adiado", e.value, chat
+            )
+            lane.paused_until = time.monotonic() + (e.value or 1)
+            cls._requeue(lane, job)
+        except asyncio.CancelledError:
+            for future in job.futures:
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in job.futures:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for future in job.futures:
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            lane.busy = False
+            cls._schedule(chat, lane, time.monotonic())
+
+    @classmethod
+    def _requeue(cls, lane: _Lane, job: _Job) -> None:
+        """Devolve ao início da fila a chamada adiada por FloodWait"""
+        if job.edit_key is not None:
+            newer = cls._edits.get(job.edit_key)
+            if newer is not None and _supersedes(newer.query, job.query):
+                # Uma edição mais nova chegou durante a tentativa: fica só ela
+                newer.futures.extend(job.futures)
+                OUTBOUND_COALESCED.inc()
+                return
+            if newer is None:
+                cls._edits[job.edit_key] = job
+        lane.jobs.appendleft(job)
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """
+        Retorna o estado da fila de envio
+
+        Returns:
+            Dicionário com chamadas aguardando ("queued"), chats com chamadas
+            pendentes ("chats") e chamadas em andamento ("sending")
+        """
+        queued = chats = 0
+        for lane in cls._lanes.values():
+            if lane.jobs:
+                queued += len(lane.jobs)
+                chats += 1
+        return {"queued": queued, "chats": chats, "sending": len(cls._sending)}
+
+    @classmethod
+    async def stop(cls, timeout: float = 10.0) -> None:
+        """
+        Aguarda o envio das chamadas pendentes e interrompe a fila
+
+        Args:
+            timeout: Segundos de espera no máximo
+        """
+        if cls._task is None:
+            return
+
+        try:
+            await asyncio.wait_for(cls._idle.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        pending = cls.stats()["queued"]
+        if pending:
+            logger.warning(f"{pending} envios ao Telegram descartados no encerramento")
+
+        cls._task.cancel()
+        for task in cls._sending:
+            task.cancel()
+        await asyncio.gather(cls._task, *cls._sending, return_exceptions=True)
+        for lane in cls._lanes.values():
+            for job in lane.jobs:
+                for future in job.futures:
+                    future.cancel()
+
+        cls._task = None
+        cls._wakeup = None
+        cls._idle = None
+        cls._global = None
+        cls._lanes.clear()
+        cls._edits.clear()
+        cls._ready.clear()
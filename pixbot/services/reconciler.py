@@ -0,0 +1,252 @@
+"""
+Conciliação das cobranças em aberto com a PushinPay (ao iniciar e periodicamente)
+"""
+
+import asyncio
+import itertools
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Generator, List, Optional
+
+from pyrogram import Client
+
+from pixbot.logger import logger, sampled
+from pixbot.models.transaction import Transaction, TransactionManager
+from pixbot.services.expiry import PENDING_STATUSES, ExpiryScheduler
+from pixbot.services.status_poller import StatusPoller
+from pixbot.settings import get_settings
+from pixbot.utils.helpers import notify_payment_status
+from pixbot.utils.metrics import TRANSACTIONS_RECONCILED
+from pixbot.utils.payment_api import PaymentAPI, PIXApiUnavailableError
+from pixbot.utils.rate_limiter import TokenBucket
+
+settings = get_settings()
+
+# Transações lidas do armazenamento por vez (fora do event loop)
+READ_CHUNK = 500
+
+
+class Reconciler:
+    """
+    Confere com a PushinPay o status das cobranças em aberto
+
+    Roda ao iniciar o bot e a cada settings.reconcile_interval segundos.
+    Percorre todas as cobranças pendentes armazenadas, e também as expiradas
+    localmente nas últimas settings.reconcile_lookback segundos (pagas
+    enquanto o bot estava fora do ar, ou no limite da validade). As consultas
+    são feitas por um grupo fixo de workers, em ritmo limitado por
+    settings.reconcile_max_rps, e as mensagens das cobranças alteradas são
+    editadas em lotes. As que continuam pendentes voltam à verificação
+    automática e à expiração.
+    """
+
+    _client: Optional[Client] = None
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def start(cls, client: Client) -> None:
+        """
+        Inicia a conciliação em segundo plano
+
+        Args:
+            client: Cliente do Pyrogram usado para editar as mensagens
+        """
+        if cls._task is not None:
+            return
+
+        cls._client = client
+        cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Interrompe a conciliação em andamento"""
+        if cls._task is None:
+            return
+
+        cls._task.cancel()
+        await asyncio.gather(cls._task, return_exceptions=True)
+        cls._task = None
+        cls._client = None
+
+    @classmethod
+    async def _run(cls) -> None:
+        """Concilia ao iniciar e depois a cada intervalo"""
+        while True:
+            try:
+                await cls.reconcile()
+            except Exception as e:
+                logger.error(f"Erro na conciliação das cobranças: {str(e)}")
+
+            if settings.reconcile_interval <= 0:
+                return
+            await asyncio.sleep(settings.reconcile_interval)
+
+    @staticmethod
+    def _open_transactions() -> Generator[Transaction, None, None]:
+        """
+        Pendentes de qualquer idade e expiradas recentemente, das mais antigas
+
+        É um gerador para que close() também feche a leitura em andamento
+        no armazenamento.
+        """
+        now = datetime.now()
+        since = now - timedelta(seconds=settings.reconcile_lookback)
+        yield from TransactionManager.iter_by_status(PENDING_STATUSES)
+        yield from TransactionManager.iter_created_between(since, now, ("expired",))
+
+    @classmethod
+    async def reconcile(cls) -> Dict[str, int]:
+        """
+        Executa uma rodada de conciliação
+
+        Returns:
+            Quantidade de cobranças por resultado ("changed", "unchanged",
+            "error" e "skipped")
+        """
+        started = time.perf_counter()
+        await TransactionManager.write_pending()
+
+        transactions = cls._open_transactions()
+        workers = settings.reconcile_concurrency
+        queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+        bucket = TokenBucket(1, settings.reconcile_max_rps, time.monotonic())
+        outcomes: Counter = Counter()
+        changed: List[Transaction] = []
+        unavailable = asyncio.Event()
+
+        def read_chunk() -> List[Transaction]:
+            return list(itertools.islice(transactions, READ_CHUNK))
+
+        async def produce() -> None:
+            read: Optional[asyncio.Task] = None
+            try:
+                while not unavailable.is_set():
+                    # A leitura roda até o fim mesmo se a rodada for cancelada,
+                    # para o gerador poder ser fechado em seguida
+                    read = asyncio.create_task(asyncio.to_thread(read_chunk))
+                    chunk = await asyncio.shield(read)
+                    if not chunk:
+                        break
+                    for transaction in chunk:
+                        await queue.put(transaction.id)
+            finally:
+                if read is not None:
+                    await asyncio.wait([read])
+                await asyncio.to_thread(transactions.close)
+
+            for _ in range(workers):
+                await queue.put(None)
+
+        async def work() -> None:
+            while (transaction_id := await queue.get()) is not None:
+                if unavailable.is_set():
+                    outcome = "skipped"
+                else:
+                    await cls._throttle(bucket)
+                    try:
+                        outcome = await cls._check(transaction_id, changed)
+                    except PIXApiUnavailableError:
+                        # API fora do ar: encerra a rodada, a próxima tenta de novo
+                        unavailable.set()
+                        outcome = "skipped"
+                    except Exception as e:
+                        # Uma cobrança com problema não interrompe as demais
+                        sampled("reconcile").error(
+                            "Erro ao conciliar a transação {}: {}",
+                            transaction_id,
+                            str(e),
+                        )
+                        outcome = "error"
+                outcomes[outcome] += 1
+                TRANSACTIONS_RECONCILED.inc(outcome=outcome)
+
+                if len(changed) >= settings.reconcile_batch_size:
+                    batch = changed[:]
+                    changed.clear()
+                    await cls._notify(batch)
+
+        # Se uma tarefa falhar, o grupo cancela as demais, inclusive o produtor
+        # parado em queue.put, em vez de deixá-lo suspenso para sempre
+        async with asyncio.TaskGroup() as group:
+            group.create_task(produce())
+            for _ in range(workers):
+                group.create_task(work())
+        await cls._notify(changed)
+
+        if unavailable.is_set():
+            logger.warning("Conciliação interrompida: API de pagamentos indisponível")
+        logger.info(
+            f"Conciliação concluída em {time.perf_counter() - started:.1f}s: "
+            f"{outcomes['changed']} alteradas, {outcomes['unchanged']} sem "
+            f"alteração, {outcomes['error']} falhas, {outcomes['skipped']} adiadas"
+        )
+        return dict(outcomes)
+
+    @staticmethod
+    async def _throttle(bucket: TokenBucket) -> None:
+        """Aguarda uma ficha do ritmo máximo de consultas"""
+        while True:
+            bucket.refill(time.monotonic())
+            wait = bucket.wait_time()
+            if wait <= 0:
+                bucket.tokens -= 1
+                return
+            await asyncio.sleep(wait)
+
+    @classmethod
+    async def _check(cls, transaction_id: str, changed: List[Transaction]) -> str:
+        """Consulta uma cobrança e aplica o novo status, se houver"""
+        transaction = await TransactionManager.get_transaction(transaction_id)
+        if transaction is None or not (
+            transaction.is_pending() or transaction.is_expired()
+        ):
+            # Finalizada entre a leitura e a consulta (webhook, verificação)
+            return "unchanged"
+
+        try:
+            status_data = await PaymentAPI.check_payment_status(transaction_id)
+        except PIXApiUnavailableError:
+            raise
+        except Exception as e:
+            sampled("reconcile").warning(
+                "Falha ao conciliar a transação {}: {}", transaction_id, str(e)
+            )
+            return "error"
+
+        status = status_data.get("status", transaction.status)
+        # Uma cobrança expirada localmente só muda se tiver sido paga
+        if transaction.is_expired() and status != "paid":
+            return "unchanged"
+
+        # "created" e "pending" exibem a mesma tela: continua em aberto
+        if status == transaction.status or (
+            transaction.is_pending() and status in PENDING_STATUSES
+        ):
+            StatusPoller.track(transaction)
+            ExpiryScheduler.track(transaction)
+            return "unchanged"
+
+        await TransactionManager.update_transaction(transaction_id, status_data)
+        StatusPoller.untrack(transaction_id)
+        ExpiryScheduler.untrack(transaction_id)
+        changed.append(transaction)
+        return "changed"
+
+    @classmethod
+    async def _notify(cls, transactions: List[Transaction]) -> None:
+        """Edita as mensagens de um lote de cobranças alteradas"""
+        if not transactions or cls._client is None:
+            return
+        results = await asyncio.gather(
+            *(
+                notify_payment_status(cls._client, transaction)
+                for transaction in transactions
+            ),
+            return_exceptions=True,
+        )
+        for transaction, result in zip(transactions, results, strict=True):
+            if isinstance(result, Exception):
+                logger.error(
+                    f"Erro ao notificar a transação {transaction.id}: {str(result)}"
+                )
@@ -0,0 +1,231 @@
+"""
+Verificação automática e adaptativa do status das transações pendentes
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+
+from pyrogram import Client
+
+from pixbot.logger import logger, sampled
+from pixbot.models.transaction import Transaction, TransactionManager
+from pixbot.settings import get_settings
+from pixbot.utils.helpers import notify_payment_status
+from pixbot.utils.payment_api import PaymentAPI, PIXApiUnavailableError
+
+settings = get_settings()
+
+
+class StatusPoller:
+    """
+    Agenda consultas de status para cada transação pendente
+
+    Cada transação tem seu próprio intervalo, curto logo após a criação e
+    crescendo com a idade da cobrança. As consultas saem de uma fila por
+    horário com ritmo máximo global (poller_max_rps) e concorrência limitada,
+    então o volume de chamadas à API não cresce com o número de cobranças
+    abertas: com muitas cobranças, cada uma apenas é consultada com menos
+    frequência.
+    """
+
+    _heap: List[Tuple[float, int, str]] = []  # (horário, sequência, transaction_id)
+    _tracked: Set[str] = set()
+    _counter = itertools.count()
+    _client: Optional[Client] = None
+    _task: Optional[asyncio.Task] = None
+    _wakeup: Optional[asyncio.Event] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+    _running: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def next_interval(transaction: Transaction) -> float:
+        """
+        Calcula o intervalo até a próxima consulta de uma transação
+
+        Args:
+            transaction: Instância de Transaction
+
+        Returns:
+            Intervalo em segundos, proporcional à idade da cobrança
+        """
+        age = (datetime.now() - transaction.created_at).total_seconds()
+        interval = age * settings.poller_backoff_ratio
+        return min(
+            settings.poller_max_interval, max(settings.poller_min_interval, interval)
+        )
+
+    @classmethod
+    def _schedule(cls, transaction_id: str, delay: float) -> None:
+        """Agenda a próxima consulta com uma pequena variação aleatória"""
+        due = time.monotonic() + delay * random.uniform(0.9, 1.1)
+        heapq.heappush(cls._heap, (due, next(cls._counter), transaction_id))
+        if cls._wakeup is not None:
+            cls._wakeup.set()
+
+    @classmethod
+    def track(cls, transaction: Transaction) -> None:
+        """
+        Passa a acompanhar uma transação pendente
+
+        Args:
+            transaction: Instância de Transaction recém-criada
+        """
+        if not settings.poller_enabled or not transaction.is_pending():
+            return
+        if transaction.id in cls._tracked:
+            return
+
+        cls._tracked.add(transaction.id)
+        cls._schedule(transaction.id, cls.next_interval(transaction))
+        sampled("poller").debug(
+            "Transação {} adicionada ao verificador automático", transaction.id
+        )
+
+    @classmethod
+    def untrack(cls, transaction_id: str) -> None:
+        """
+        Deixa de acompanhar uma transação
+
+        A entrada na fila é descartada quando chegar sua vez.
+
+        Args:
+            transaction_id: ID da transação
+        """
+        cls._tracked.discard(transaction_id)
+
+    @classmethod
+    def pending_count(cls) -> int:
+        """Retorna a quantidade de transações acompanhadas"""
+        return len(cls._tracked)
+
+    @classmethod
+    async def start(cls, client: Client) -> None:
+        """
+        Inicia o verificador em segundo plano
+
+        Args:
+            client: Cliente do Pyrogram usado para editar as mensagens
+        """
+        if cls._task is not None:
+            return
+
+        cls._client = client
+        cls._wakeup = asyncio.Event()
+        cls._semaphore = asyncio.Semaphore(settings.poller_max_concurrency)
+        cls._task = asyncio.create_task(cls._run())
+        logger.info(
+            f"Verificador automático iniciado (máx. {settings.poller_max_rps} consultas/s, "
+            f"{settings.poller_max_concurrency} simultâneas)"
+        )
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Interrompe o verificador e as consultas em andamento"""
+        if cls._task is None:
+            return
+
+        cls._task.cancel()
+        for task in list(cls._running):
+            task.cancel()
+        await asyncio.gather(cls._task, *cls._running, return_exceptions=True)
+
+        cls._task = None
+        cls._client = None
+        logger.info("Verificador automático encerrado")
+
+    @classmethod
+    async def _run(cls) -> None:
+        """Laço principal: libera as consultas vencidas em ritmo constante"""
+        dispatch_interval = 1 / settings.poller_max_rps
+
+        while True:
+            if not cls._heap:
+                cls._wakeup.clear()
+                await cls._wakeup.wait()
+                continue
+
+            due, _, transaction_id = cls._heap[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                # Dorme até a próxima consulta ou até uma nova transação ser agendada
+                cls._wakeup.clear()
+                try:
+                    await asyncio.wait_for(cls._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(cls._heap)
+            if transaction_id not in cls._tracked:
+                continue
+
+            await cls._semaphore.acquire()
+            task = asyncio.create_task(cls._poll(transaction_id))
+            cls._running.add(task)
+            task.add_done_callback(cls._running.discard)
+
+            # Espaça as consultas para não gerar picos na API
+            await asyncio.sleep(dispatch_interval)
+
+    @classmethod
+    async def _poll(cls, transaction_id: str) -> None:
+        """Consulta o status de uma transação e reagenda se continuar pendente"""
+        # Importado aqui: o módulo de expiração depende deste
+        from pixbot.services.expiry import ExpiryScheduler
+
+        try:
+            transaction = await TransactionManager.get_transaction(transaction_id)
+            if not transaction or not transaction.is_pending():
+                cls.untrack(transaction_id)
+                return
+
+            age = (datetime.now() - transaction.created_at).total_seconds()
+            if age > settings.poller_max_age:
+                sampled("poller").debug(
+                    "Transação {} deixou de ser verificada automaticamente",
+                    transaction_id,
+                )
+                cls.untrack(transaction_id)
+                return
+
+            try:
+                status_data = await PaymentAPI.check_payment_status(transaction_id)
+            except PIXApiUnavailableError:
+                # API fora do ar: tenta de novo depois, sem poluir os logs
+                cls._schedule(transaction_id, cls.next_interval(transaction))
+                return
+            except Exception as e:
+                logger.warning(
+                    f"Falha na verificação automática de {transaction_id}: {str(e)}"
+                )
+                cls._schedule(transaction_id, cls.next_interval(transaction))
+                return
+
+            if not transaction.is_pending():
+                # Finalizada durante a consulta (webhook, verificação manual)
+                cls.untrack(transaction_id)
+                return
+
+            old_status = transaction.status
+            await TransactionManager.update_transaction(transaction_id, status_data)
+
+            # "created" e "pending" exibem a mesma tela, só edita ao sair da pendência
+            if (
+                transaction.status != old_status
+                and not transaction.is_pending()
+                and cls._client is not None
+            ):
+                await notify_payment_status(cls._client, transaction)
+
+            if transaction.is_pending():
+                cls._schedule(transaction_id, cls.next_interval(transaction))
+            else:
+                cls.untrack(transaction_id)
+                ExpiryScheduler.untrack(transaction_id)
+        finally:
+            cls._semaphore.release()
@@ -0,0 +1,178 @@
+"""
+Fila de atualizações por usuário com limite global de handlers simultâneos
+"""
+
+import asyncio
+import functools
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+
+from pixbot.logger import logger, sampled
+from pixbot.settings import get_settings
+from pixbot.utils.metrics import UPDATE_QUEUE_WAIT, UPDATES_DROPPED
+
+settings = get_settings()
+
+# (função que cria a corrotina do handler, futuro do resultado, enfileirado em)
+Job = Tuple[Callable[[], Awaitable[Any]], asyncio.Future, float]
+
+
+def _retrieve(future: asyncio.Future) -> None:
+    """Marca a exceção como lida: quem chama o handler não precisa aguardá-lo"""
+    if not future.cancelled():
+        future.exception()
+
+
+class UpdateQueue:
+    """
+    Processa as atualizações de cada usuário em ordem, uma de cada vez
+
+    Cada usuário tem sua fila, e usuários diferentes são atendidos em
+    paralelo até settings.update_max_concurrency handlers simultâneos. Um
+    toque duplo no mesmo botão, por exemplo, é processado depois do
+    primeiro, nunca junto com ele. As filas só existem enquanto houver
+    atualizações pendentes do usuário.
+    """
+
+    _queues: Dict[int, Deque[Job]] = {}
+    _tasks: Set[asyncio.Task] = set()  # Referências das tarefas de cada fila
+    _semaphore: Optional[asyncio.Semaphore] = None
+    _running = 0
+
+    @classmethod
+    def _get_semaphore(cls) -> asyncio.Semaphore:
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(settings.update_max_concurrency)
+        return cls._semaphore
+
+    @classmethod
+    def submit(
+        cls, user_id: int, handler: Callable[[], Awaitable[Any]]
+    ) -> asyncio.Future:
+        """
+        Coloca um handler na fila do usuário
+
+        Args:
+            user_id: ID do usuário no Telegram
+            handler: Função sem argumentos que cria a corrotina do handler
+
+        Returns:
+            Futuro concluído com o resultado do handler, ou com None se a
+            atualização foi descartada por excesso de atualizações do usuário
+        """
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_retrieve)
+
+        queue = cls._queues.get(user_id)
+        if queue is None:
+            queue = cls._queues[user_id] = deque()
+            task = asyncio.create_task(cls._drain(user_id, queue))
+            cls._tasks.add(task)
+            task.add_done_callback(cls._tasks.discard)
+        elif len(queue) >= settings.update_user_queue_size:
+            UPDATES_DROPPED.inc()
+            sampled("update_queue").warning(
+                "Fila do usuário {} cheia, atualização descartada", user_id
+            )
+            future.set_result(None)
+            return future
+
+        queue.append((handler, future, time.perf_counter()))
+        return future
+
+    @classmethod
+    async def _drain(cls, user_id: int, queue: Deque[Job]) -> None:
+        """Executa os handlers de um usuário em ordem até a fila esvaziar"""
+        semaphore = cls._get_semaphore()
+        try:
+            while queue:
+                handler, future, queued_at = queue[0]
+                async with semaphore:
+                    UPDATE_QUEUE_WAIT.observe(time.perf_counter() - queued_at)
+                    cls._running += 1
+                    try:
+                        result = await handler()
+                    except asyncio.CancelledError:
+                        future.cancel()
+                        raise
+                    except Exception as e:
+                        logger.error(f"Erro no handler do usuário {user_id}: {str(e)}")
+                        future.set_exception(e)
+                    else:
+                        future.set_result(result)
+                    finally:
+                        cls._running -= 1
+                queue.popleft()
+        finally:
+            for _, future, _ in queue:
+                future.cancel()
+            del cls._queues[user_id]
+
+    @classmethod
+    def ordered(cls, func: Callable[..., Awaitable[Any]]) -> Callable[..., Any]:
+        """
+        Decorador que encaminha o handler pela fila do usuário da atualização
+
+        Deve ficar entre o decorador de registro do Pyrogram e track_handler,
+        para que o tempo medido do handler não inclua a espera na fila. O
+        handler registrado retorna assim que a atualização é enfileirada,
+        liberando os workers do Pyrogram; o futuro retornado permite
+        aguardar o processamento.
+        """
+
+        @functools.wraps(func)
+        async def wrapper(client: Any, update: Any, *args, **kwargs) -> Any:
+            user = getattr(update, "from_user", None)
+            if user is None:
+                return await func(client, update, *args, **kwargs)
+            return cls.submit(
+                user.id, functools.partial(func, client, update, *args, **kwargs)
+            )
+
+        return wrapper
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """
+        Retorna o estado das filas
+
+        Returns:
+            Dicionário com atualizações aguardando ("queued"), usuários com
+            atualizações pendentes ("users") e handlers em execução ("running")
+        """
+        users = len(cls._queues)
+        pending = sum(len(queue) for queue in cls._queues.values())
+        return {
+            "queued": pending - cls._running,
+            "users": users,
+            "running": cls._running,
+        }
+
+    @classmethod
+    async def stop(cls, timeout: float = 10.0) -> None:
+        """
+        Aguarda as atualizações já enfileiradas antes do encerramento
+
+        As filas que não terminarem no prazo são canceladas, para que nenhum
+        handler continue rodando enquanto o restante do bot é encerrado.
+
+        Args:
+            timeout: Segundos de espera no máximo
+        """
+        deadline = time.monotonic() + timeout
+        # Novas filas podem surgir durante a espera: aguarda até não sobrar nenhuma
+        while cls._tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.wait(set(cls._tasks), timeout=remaining)
+
+        if cls._tasks:
+            logger.warning(
+                f"{len(cls._queues)} usuários com atualizações não processadas"
+            )
+            tasks = list(cls._tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,173 @@
+"""
+Estoque de cobranças PIX pré-geradas para os valores pré-definidos
+"""
+
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+from pixbot.logger import logger
+from pixbot.settings import get_settings, on_settings_reload
+from pixbot.utils.payment_api import PaymentAPI, PIXApiUnavailableError
+
+settings = get_settings()
+
+
+class WarmPool:
+    """
+    Mantém cobranças prontas para cada valor de settings.payment_values
+
+    O handler de pagamento retira uma cobrança pronta sem esperar a API, e o
+    estoque é reposto em segundo plano. Cobranças não usadas são descartadas
+    após settings.warm_pool_max_age segundos, antes de vencerem na PushinPay.
+    """
+
+    # valor -> fila de (criada em monotonic, criada em datetime, dados do PIX)
+    _pools: Dict[float, Deque[Tuple[float, datetime, Dict[str, Any]]]] = {}
+    _task: Optional[asyncio.Task] = None
+    _wakeup: Optional[asyncio.Event] = None
+
+    @classmethod
+    def claim(cls, value: float) -> Optional[Tuple[Dict[str, Any], datetime]]:
+        """
+        Retira uma cobrança pronta para o valor informado
+
+        Args:
+            value: Valor em reais
+
+        Returns:
+            Tupla (dados do PIX, data de criação) ou None se não houver estoque
+        """
+        pool = cls._pools.get(value)
+        if not pool:
+            return None
+
+        cutoff = time.monotonic() - settings.warm_pool_max_age
+        claimed = None
+        while pool:
+            created_monotonic, created_at, pix_data = pool.popleft()
+            if created_monotonic > cutoff:
+                claimed = (pix_data, created_at)
+                break
+
+        # Repõe o estoque em segundo plano
+        if cls._wakeup is not None:
+            cls._wakeup.set()
+
+        if claimed:
+            logger.debug(
+                f"Cobrança pronta usada para R$ {value:.2f} ({len(pool)} restantes)"
+            )
+        return claimed
+
+    @classmethod
+    def sizes(cls) -> Dict[float, int]:
+        """Retorna a quantidade de cobranças prontas por valor"""
+        return {value: len(pool) for value, pool in cls._pools.items()}
+
+    @classmethod
+    def set_values(cls, values: Iterable[float], discard: bool = False) -> None:
+        """
+        Define os valores mantidos em estoque
+
+        As cobranças dos valores que continuam são preservadas, a não ser
+        que discard seja True (ex.: após trocar o token da API).
+
+        Args:
+            values: Valores pré-definidos em reais
+            discard: Se True, descarta todas as cobranças prontas
+        """
+        old_pools = {} if discard else cls._pools
+        # Novo dicionário: a reposição em andamento continua no anterior
+        cls._pools = {
+            float(value): old_pools.get(float(value), deque()) for value in values
+        }
+
+        if cls._wakeup is not None:
+            cls._wakeup.set()
+
+    @classmethod
+    async def start(cls) -> None:
+        """Inicia a reposição do estoque em segundo plano"""
+        if cls._task is not None:
+            return
+
+        cls.set_values(settings.payment_values)
+        cls._wakeup = asyncio.Event()
+        cls._task = asyncio.create_task(cls._run())
+        logger.info(
+            f"Estoque de cobranças iniciado ({settings.warm_pool_size} por valor)"
+        )
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Interrompe a reposição do estoque"""
+        if cls._task is None:
+            return
+
+        cls._task.cancel()
+        await asyncio.gather(cls._task, return_exceptions=True)
+        cls._task = None
+        cls._wakeup = None
+        cls._pools = {}
+
+    @classmethod
+    def _discard_expired(cls) -> None:
+        """Descarta as cobranças que passaram da idade máxima"""
+        cutoff = time.monotonic() - settings.warm_pool_max_age
+        for value, pool in cls._pools.items():
+            discarded = 0
+            while pool and pool[0][0] <= cutoff:
+                pool.popleft()
+                discarded += 1
+            if discarded:
+                logger.debug(
+                    f"{discarded} cobranças prontas de R$ {value:.2f} descartadas por idade"
+                )
+
+    @classmethod
+    async def _refill(cls) -> None:
+        """Gera as cobranças que faltam para completar o estoque"""
+        for value, pool in cls._pools.items():
+            while len(pool) < settings.warm_pool_size:
+                pix_data = await PaymentAPI.generate_pix(value)
+                pool.append((time.monotonic(), datetime.now(), pix_data))
+
+    @classmethod
+    async def _run(cls) -> None:
+        """Laço de reposição: acorda ao consumir ou vencer uma cobrança"""
+        while True:
+            cls._discard_expired()
+            try:
+                await cls._refill()
+            except PIXApiUnavailableError:
+                logger.debug("API indisponível, reposição do estoque adiada")
+            except Exception as e:
+                logger.warning(f"Erro ao repor o estoque de cobranças: {str(e)}")
+
+            try:
+                await asyncio.wait_for(cls._wakeup.wait(), timeout=cls._next_wait())
+            except asyncio.TimeoutError:
+                pass
+            cls._wakeup.clear()
+
+    @classmethod
+    def _next_wait(cls) -> float:
+        """Espera até a próxima verificação ou até a cobrança mais antiga vencer"""
+        oldest = min((pool[0][0] for pool in cls._pools.values() if pool), default=None)
+        if oldest is None:
+            return settings.warm_pool_refill_interval
+
+        expires_in = oldest + settings.warm_pool_max_age - time.monotonic()
+        return max(0.0, min(settings.warm_pool_refill_interval, expires_in))
+
+
+@on_settings_reload
+def _apply_reloaded_settings(changed: Dict[str, Any]) -> None:
+    """Ajusta o estoque aos novos valores ou ao novo token"""
+    if WarmPool._task is None:
+        return
+    if "payment_values" in changed or "pix_api_token" in changed:
+        WarmPool.set_values(settings.payment_values, discard="pix_api_token" in changed)
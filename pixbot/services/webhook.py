@@ -0,0 +1,203 @@
+"""
+Servidor HTTP embutido para receber as notificações de pagamento da PushinPay
+"""
+
+import hmac
+import json
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+from pyrogram import Client
+
+from pixbot.logger import logger, sampled
+from pixbot.models.transaction import TERMINAL_STATUSES, TransactionManager
+from pixbot.services.expiry import ExpiryScheduler
+from pixbot.settings import get_settings
+from pixbot.utils.helpers import notify_payment_status
+from pixbot.utils.payment_api import PaymentAPI, PIXApiError
+
+settings = get_settings()
+
+
+class WebhookServer:
+    """
+    Recebe os webhooks da PushinPay e atualiza as transações em tempo real
+
+    Cada notificação de status final é confirmada na API da PushinPay, que
+    fornece o status aplicado ao TransactionManager; a mensagem do pagamento
+    é editada imediatamente, sem depender do botão "Verificar Pagamento".
+    """
+
+    _runner: Optional[web.AppRunner] = None
+    _client: Optional[Client] = None
+
+    @classmethod
+    def create_app(cls) -> web.Application:
+        """
+        Cria a aplicação aiohttp com a rota do webhook
+
+        Returns:
+            Instância de web.Application
+        """
+        app = web.Application()
+        app.router.add_post(settings.webhook_path, cls.handle_notification)
+        return app
+
+    @classmethod
+    async def start(cls, client: Client) -> None:
+        """
+        Inicia o servidor HTTP do webhook
+
+        Args:
+            client: Cliente do Pyrogram usado para editar as mensagens
+        """
+        if cls._runner is not None:
+            return
+
+        cls._client = client
+        cls._runner = web.AppRunner(cls.create_app(), access_log=None)
+        await cls._runner.setup()
+
+        site = web.TCPSite(cls._runner, settings.webhook_host, settings.webhook_port)
+        await site.start()
+
+        logger.info(
+            f"Webhook escutando em http://{settings.webhook_host}:{settings.webhook_port}{settings.webhook_path}"
+        )
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Encerra o servidor HTTP do webhook"""
+        if cls._runner is not None:
+            await cls._runner.cleanup()
+            cls._runner = None
+            logger.info("Webhook encerrado")
+        cls._client = None
+
+    @staticmethod
+    async def _read_payload(request: web.Request) -> Dict[str, Any]:
+        """
+        Lê o corpo da notificação, aceitando JSON ou formulário
+
+        Args:
+            request: Requisição recebida
+
+        Returns:
+            Dicionário com os dados da notificação
+        """
+        if request.content_type == "application/json":
+            data = await request.json()
+            return data if isinstance(data, dict) else {}
+
+        form = await request.post()
+        return dict(form)
+
+    @staticmethod
+    def _is_authorized(request: web.Request) -> bool:
+        """
+        Verifica o token secreto da notificação
+
+        O token pode vir no parâmetro "token" da URL ou no cabeçalho
+        X-Webhook-Token. Sem um token configurado, nenhuma notificação é
+        aceita (o Settings já impede iniciar o servidor assim).
+
+        Args:
+            request: Requisição recebida
+
+        Returns:
+            True se a requisição for autorizada
+        """
+        if not settings.webhook_secret:
+            return False
+
+        token = request.query.get("token") or request.headers.get("X-Webhook-Token", "")
+        return hmac.compare_digest(token, settings.webhook_secret)
+
+    @classmethod
+    async def handle_notification(cls, request: web.Request) -> web.Response:
+        """
+        Processa uma notificação de pagamento
+
+        Args:
+            request: Requisição recebida da PushinPay
+
+        Returns:
+            Resposta HTTP para a PushinPay
+        """
+        if not cls._is_authorized(request):
+            logger.warning(f"Webhook recusado: token inválido de {request.remote}")
+            return web.json_response({"error": "unauthorized"}, status=401)
+
+        try:
+            payload = await cls._read_payload(request)
+        except (json.JSONDecodeError, ValueError):
+            return web.json_response({"error": "invalid payload"}, status=400)
+
+        transaction_id = str(payload.get("id") or "")
+        status = payload.get("status")
+
+        if not transaction_id or not status:
+            return web.json_response({"error": "missing id or status"}, status=400)
+
+        sampled("webhook").info(
+            "Webhook recebido: transação {} -> {}", transaction_id, status
+        )
+
+        transaction = await TransactionManager.get_transaction(transaction_id)
+
+        # A PushinPay pode enviar o ID em caixa diferente da resposta do cashIn
+        if not transaction and transaction_id != transaction_id.lower():
+            transaction = await TransactionManager.get_transaction(
+                transaction_id.lower()
+            )
+
+        if not transaction:
+            # Responde 200 para que a PushinPay não reenvie a notificação
+            return web.json_response({"status": "ignored"})
+
+        # Só uma mudança para status final altera a tela, e ela é confirmada
+        # na API: o corpo da notificação sozinho não é confiável
+        if status not in TERMINAL_STATUSES or not (
+            transaction.is_pending() or transaction.is_expired()
+        ):
+            return web.json_response({"status": "ignored"})
+
+        try:
+            status_data = await PaymentAPI.check_payment_status(
+                transaction.id, fresh=True
+            )
+        except PIXApiError as e:
+            logger.warning(
+                f"Webhook da transação {transaction.id} não confirmado: {str(e)}"
+            )
+            # Erro para que a PushinPay reenvie; a verificação automática
+            # também acaba encontrando a mudança
+            return web.json_response({"error": "unverified"}, status=503)
+
+        verified = status_data.get("status", transaction.status)
+        if verified != status:
+            sampled("webhook").warning(
+                "Webhook da transação {} informou {}, mas a API retornou {}",
+                transaction.id,
+                status,
+                verified,
+            )
+
+        # Uma cobrança expirada localmente só muda se tiver sido paga
+        if transaction.is_expired() and verified != "paid":
+            return web.json_response({"status": "ok"})
+
+        old_status = transaction.status
+        await TransactionManager.update_transaction(transaction.id, status_data)
+        if not transaction.is_pending():
+            ExpiryScheduler.untrack(transaction.id)
+
+        # "created" e "pending" exibem a mesma tela, só edita ao sair da pendência
+        if (
+            transaction.status != old_status
+            and not transaction.is_pending()
+            and cls._client is not None
+        ):
+            await notify_payment_status(cls._client, transaction)
+
+        return web.json_response({"status": "ok"})
@@ -1,7 +1,8 @@
 import os
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
 
-from pydantic import field_validator
+from pydantic import field_validator, model_validator
 from pydantic_settings import BaseSettings
 
 
@@ -17,14 +18,132 @@ class Settings(BaseSettings):
     pix_status_url: str = "https://api.pushinpay.com.br/api/transactions/"
     pix_api_token: str
 
+    # Configurações do cliente HTTP (pool de conexões keep-alive e timeouts)
+    http_pool_size: int = 100  # Conexões simultâneas no total
+    http_pool_size_per_host: int = 20  # Conexões simultâneas por host
+    http_keepalive_timeout: float = 30.0  # Segundos que uma conexão ociosa fica aberta
+    http_connect_timeout: float = 5.0  # Timeout para abrir uma conexão
+    http_timeout: float = 15.0  # Timeout total padrão de cada requisição
+
+    # Novas tentativas, prazos e circuit breaker das chamadas à API
+    api_status_retries: int = 2  # Novas tentativas da consulta de status
+    api_status_deadline: float = 20.0  # Prazo total da consulta de status (segundos)
+    api_generate_deadline: float = 20.0  # Prazo total da geração do PIX (segundos)
+    api_retry_backoff_base: float = 0.5  # Espera base entre tentativas (segundos)
+    api_retry_backoff_max: float = 4.0  # Espera máxima entre tentativas (segundos)
+    breaker_failure_threshold: int = 5  # Falhas seguidas para abrir o circuito
+    breaker_recovery_timeout: float = 30.0  # Segundos em aberto antes de testar
+
+    # Cache das consultas de status (respostas pendentes reaproveitadas)
+    status_cache_ttl: float = 3.0  # Segundos que uma resposta fica em cache
+    status_cache_size: int = 10000  # Transações no cache no máximo
+
+    # Conversas (valor personalizado) e seus prazos
+    custom_amount_timeout: float = 60.0  # Segundos aguardando o valor personalizado
+    timer_wheel_tick: float = 1.0  # Precisão dos prazos (segundos)
+    timer_wheel_slots: int = 512  # Slots da roda de temporizadores
+
+    # Pedidos repetidos de cobrança (mesmo usuário, mensagem e valor)
+    charge_dedupe_ttl: float = 30.0  # Segundos que a cobrança criada é reaproveitada
+    charge_dedupe_size: int = 10000  # Pedidos lembrados no máximo
+
+    # Cache de QR Codes renderizados (imagens PNG em memória)
+    qr_cache_size: int = 256
+
+    # Telas já renderizadas por transação (texto e teclado)
+    screen_cache_size: int = 10000
+    screen_cache_ttl: float = 3600.0  # Segundos até a tela ser descartada
+
+    # Limites de requisições ("quantidade/segundos")
+    rate_limit_user: str = "20/60"  # Todas as ações de um usuário
+    rate_limit_process_payment: str = "3/30"
+    rate_limit_request_custom_amount: str = "3/30"
+    rate_limit_show_qr: str = "3/15"
+    rate_limit_check_payment: str = "2/10"
+    rate_limit_global: str = "20/1"  # Cada ação somando todos os usuários
+    rate_limit_idle_ttl: float = 600.0  # Descarta limites sem uso após esse tempo
+
+    # Fila de atualizações por usuário (uma de cada vez, em ordem)
+    update_max_concurrency: int = 64  # Handlers simultâneos somando todos os usuários
+    update_user_queue_size: int = 10  # Atualizações pendentes por usuário no máximo
+
+    # Fila de envio ao Telegram (mensagens e edições, "quantidade/segundos")
+    outbound_enabled: bool = True
+    telegram_rate_global: str = "30/1"  # Somando todos os chats
+    telegram_rate_chat: str = "3/3"  # Cada chat (rajada de 3, depois 1 por segundo)
+
     # Configurações do webhook para receber notificações de pagamento (opcional)
     webhook_url: str = ""
+    webhook_server_enabled: bool = False  # Inicia o servidor HTTP embutido
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_path: str = "/webhook/pushinpay"
+    webhook_secret: str = ""  # Token de ?token= ou X-Webhook-Token (obrigatório)
+
+    # Armazenamento das transações
+    storage_backend: str = "sqlite"  # sqlite, memory ou redis
+    storage_path: str = "data/transactions.db"
+    storage_hot_set_size: int = 10000  # Transações mantidas em memória
+    storage_flush_interval: float = 1.0  # Intervalo entre gravações em lote (segundos)
+    storage_flush_batch_size: int = 500  # Grava antes do intervalo ao atingir esse lote
+    transaction_memory_ttl: float = 3600.0  # Sai da memória após esse tempo sem uso
+    terminal_memory_ttl: float = 300.0  # Transações finalizadas saem antes
+    memory_sweep_interval: float = 60.0  # Intervalo entre limpezas da memória
+
+    # Estado compartilhado entre processos (conversas e limites de requisições)
+    state_backend: str = "memory"  # memory (um processo) ou redis
+    redis_url: str = "redis://localhost:6379/0"
+    redis_prefix: str = "pixbot:"  # Prefixo das chaves, para dividir um servidor
+    redis_timeout: float = 2.0  # Timeout de conexão e de cada comando (segundos)
+
+    # Verificação automática do status das transações pendentes
+    poller_enabled: bool = True
+    poller_min_interval: float = 5.0  # Intervalo inicial entre consultas (segundos)
+    poller_max_interval: float = 120.0  # Intervalo máximo entre consultas (segundos)
+    poller_backoff_ratio: float = 0.1  # Intervalo = idade da cobrança * razão
+    poller_max_age: float = 3600.0  # Para de verificar após essa idade (segundos)
+    poller_max_concurrency: int = 10  # Consultas simultâneas no máximo
+    poller_max_rps: float = 5.0  # Consultas por segundo no máximo
+
+    # Expiração local das cobranças pendentes
+    expiry_enabled: bool = True
+    pix_validity: float = 3600.0  # Validade de uma cobrança após a criação (segundos)
+    expiry_batch_size: int = 50  # Cobranças finalizadas por lote
+
+    # Conciliação das cobranças em aberto com a PushinPay
+    reconcile_enabled: bool = True
+    reconcile_interval: float = (
+        900.0  # Entre rodadas, após a inicial (0 = só ao iniciar)
+    )
+    reconcile_lookback: float = 86400.0  # Também confere as expiradas nesse período
+    reconcile_concurrency: int = 10  # Consultas simultâneas no máximo
+    reconcile_max_rps: float = 10.0  # Consultas por segundo no máximo
+    reconcile_batch_size: int = 50  # Mensagens editadas por lote
 
     # Valores pré-definidos para pagamentos (em reais)
     payment_values: list[float] = [5, 10, 20, 50, 100]
 
+    # Estoque de cobranças pré-geradas para os valores pré-definidos
+    warm_pool_enabled: bool = False
+    warm_pool_size: int = 2  # Cobranças prontas por valor
+    warm_pool_max_age: float = 600.0  # Descarta antes de vencer na PushinPay (segundos)
+    warm_pool_refill_interval: float = (
+        5.0  # Verificação periódica do estoque (segundos)
+    )
+
+    # Endpoint de métricas no formato Prometheus
+    metrics_enabled: bool = False
+    metrics_host: str = "0.0.0.0"
+    metrics_port: int = 9100
+    metrics_loop_lag_interval: float = 0.5  # Intervalo da medição do event loop
+
     # Configurações de logs
-    log_level: str = "INFO"
+    log_level: str = "INFO"  # Nível do console
+    log_json: bool = False  # Console em JSON, um registro por linha
+    log_file: str = "logs/pixbot.log"
+    log_file_level: str = "DEBUG"
+    # Fração registrada de cada evento de alto volume ("evento=fração,...")
+    log_sample_rates: str = ""
 
     class Config:
         env_file = ".env"
@@ -59,7 +178,90 @@ class Settings(BaseSettings):
                 return [float(value)]
         return value
 
+    @model_validator(mode="after")
+    def require_webhook_secret(self):
+        # Sem o token, qualquer um poderia notificar pagamentos falsos
+        if self.webhook_server_enabled and not self.webhook_secret:
+            raise ValueError(
+                "WEBHOOK_SECRET é obrigatório com WEBHOOK_SERVER_ENABLED=true"
+            )
+        return self
+
     def _create_directories(self):
         """Create necessary directories if they don't exist"""
         os.makedirs("sessions", exist_ok=True)
         os.makedirs("logs", exist_ok=True)
+
+
+# Campos que podem ser alterados sem reiniciar o bot
+RELOADABLE_FIELDS = ("payment_values", "pix_api_token", "log_level", "log_sample_rates")
+
+_settings: Optional[Settings] = None
+_reload_hooks: List[Callable[[Dict[str, Any]], None]] = []
+
+
+def get_settings() -> Settings:
+    """
+    Retorna as configurações compartilhadas, criadas na primeira chamada
+
+    Returns:
+        Settings: A mesma instância para todos os módulos
+    """
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+def on_settings_reload(
+    hook: Callable[[Dict[str, Any]], None],
+) -> Callable[[Dict[str, Any]], None]:
+    """
+    Registra uma função chamada após cada recarga com campos alterados
+
+    Args:
+        hook: Recebe o dicionário {campo: novo valor} dos campos alterados
+
+    Returns:
+        A própria função, para uso como decorador
+    """
+    _reload_hooks.append(hook)
+    return hook
+
+
+def reload_settings() -> Dict[str, Any]:
+    """
+    Relê o .env e as variáveis de ambiente e aplica os campos recarregáveis
+
+    Apenas os campos de RELOADABLE_FIELDS são copiados para a instância
+    compartilhada; os demais exigem reiniciar o bot. Variáveis de ambiente
+    do processo continuam tendo prioridade sobre o .env.
+
+    Returns:
+        Dict[str, Any]: Campos alterados e seus novos valores
+
+    Raises:
+        ValidationError: Se as novas configurações forem inválidas
+    """
+    from pixbot.logger import logger
+
+    current = get_settings()
+    fresh = Settings()
+
+    changed = {}
+    for name in RELOADABLE_FIELDS:
+        value = getattr(fresh, name)
+        if value != getattr(current, name):
+            setattr(current, name, value)
+            changed[name] = value
+
+    for hook in _reload_hooks if changed else ():
+        try:
+            hook(changed)
+        except Exception as e:
+            logger.error(f"Erro ao aplicar configurações recarregadas: {str(e)}")
+
+    logger.info(
+        f"Configurações recarregadas: {', '.join(changed) or 'nenhuma alteração'}"
+    )
+    return changed
@@ -0,0 +1,144 @@
+"""
+Interface comum para os backends de armazenamento de transações
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from pixbot.models.transaction import Transaction
+
+
+class TransactionStore(ABC):
+    """
+    Backend de persistência das transações
+
+    As implementações devem ser seguras para uso a partir de uma thread
+    auxiliar, já que as gravações em lote são feitas fora do event loop.
+    """
+
+    # True quando outros processos do bot leem e gravam o mesmo armazenamento
+    shared = False
+
+    @abstractmethod
+    def get(self, transaction_id: str) -> Optional[Transaction]:
+        """
+        Obtém uma transação pelo ID
+
+        Args:
+            transaction_id: ID da transação
+
+        Returns:
+            Instância de Transaction ou None se não encontrada
+        """
+
+    @abstractmethod
+    def insert(self, transaction: Transaction) -> None:
+        """
+        Grava uma nova transação imediatamente
+
+        Args:
+            transaction: Instância de Transaction
+        """
+
+    @abstractmethod
+    def upsert_many(self, transactions: Iterable[Transaction]) -> int:
+        """
+        Grava um lote de transações novas ou alteradas
+
+        Args:
+            transactions: Transações a gravar
+
+        Returns:
+            Quantidade de transações gravadas
+        """
+
+    def update_status(self, transaction: Transaction) -> Tuple[Optional[str], str]:
+        """
+        Grava uma transação alterada e informa a mudança de status aplicada
+
+        Usado com backends compartilhados, em que outro processo pode ter
+        gravado a mesma mudança antes: apenas quem de fato alterou o status
+        armazenado a contabiliza nas estatísticas.
+
+        Args:
+            transaction: Transação com o novo status
+
+        Returns:
+            Tupla com o status armazenado antes (None se a transação não
+            existia) e o status armazenado agora
+
+        Raises:
+            NotImplementedError: Se o backend não for compartilhado
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} grava as alterações em lote (upsert_many)"
+        )
+
+    @abstractmethod
+    def iter_by_status(self, statuses: Iterable[str]) -> Iterator[Transaction]:
+        """
+        Percorre as transações com algum dos status informados
+
+        Args:
+            statuses: Status desejados
+
+        Returns:
+            Iterador de Transaction, das mais antigas para as mais recentes
+        """
+
+    @abstractmethod
+    def iter_created_between(
+        self, start: datetime, end: datetime, statuses: Optional[Iterable[str]] = None
+    ) -> Iterator[Transaction]:
+        """
+        Percorre as transações criadas em um intervalo, sem carregá-las todas
+
+        Args:
+            start: Início do intervalo (inclusivo)
+            end: Fim do intervalo (exclusivo)
+            statuses: Status desejados (todos, se omitido)
+
+        Returns:
+            Iterador de Transaction, das mais antigas para as mais recentes
+        """
+
+    @abstractmethod
+    def add_stats(self, deltas: Dict[str, float]) -> None:
+        """
+        Soma incrementos aos contadores das estatísticas (veja TransactionStats)
+
+        Args:
+            deltas: Incremento de cada contador
+        """
+
+    @abstractmethod
+    def load_stats(self, keys: Iterable[str]) -> Dict[str, float]:
+        """
+        Lê os contadores das estatísticas
+
+        Args:
+            keys: Contadores desejados
+
+        Returns:
+            Valor de cada contador existente
+        """
+
+    def prune(self, before: datetime) -> int:
+        """
+        Descarta transações finalizadas criadas antes de uma data
+
+        As ainda em aberto são mantidas, já que um webhook, a verificação
+        automática ou a conciliação ainda podem procurá-las. Backends
+        persistentes mantêm o histórico completo e não fazem nada.
+
+        Args:
+            before: Data limite de criação
+
+        Returns:
+            Quantidade de transações descartadas
+        """
+        return 0
+
+    def close(self) -> None:
+        """Libera os recursos do backend"""
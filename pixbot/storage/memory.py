@@ -0,0 +1,74 @@
+"""
+Armazenamento de transações apenas em memória (sem persistência)
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+from pixbot.models.transaction import Transaction
+from pixbot.storage.base import TransactionStore
+
+
+class MemoryTransactionStore(TransactionStore):
+    """Guarda as transações em um dicionário, perdido ao reiniciar o processo"""
+
+    def __init__(self):
+        self._rows: Dict[str, Transaction] = {}
+        self._stats: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, transaction_id: str) -> Optional[Transaction]:
+        return self._rows.get(transaction_id)
+
+    def insert(self, transaction: Transaction) -> None:
+        with self._lock:
+            self._rows[transaction.id] = transaction
+
+    def upsert_many(self, transactions: Iterable[Transaction]) -> int:
+        count = 0
+        with self._lock:
+            for transaction in transactions:
+                self._rows[transaction.id] = transaction
+                count += 1
+        return count
+
+    def iter_by_status(self, statuses: Iterable[str]) -> Iterator[Transaction]:
+        statuses = set(statuses)
+        with self._lock:
+            rows = [t for t in self._rows.values() if t.status in statuses]
+        rows.sort(key=lambda t: t.created_at)
+        return iter(rows)
+
+    def iter_created_between(
+        self, start: datetime, end: datetime, statuses: Optional[Iterable[str]] = None
+    ) -> Iterator[Transaction]:
+        statuses = set(statuses) if statuses is not None else None
+        with self._lock:
+            rows = [
+                t
+                for t in self._rows.values()
+                if start <= t.created_at < end
+                and (statuses is None or t.status in statuses)
+            ]
+        rows.sort(key=lambda t: t.created_at)
+        return iter(rows)
+
+    def add_stats(self, deltas: Dict[str, float]) -> None:
+        with self._lock:
+            for key, delta in deltas.items():
+                self._stats[key] = self._stats.get(key, 0.0) + delta
+
+    def load_stats(self, keys: Iterable[str]) -> Dict[str, float]:
+        return {key: self._stats[key] for key in keys if key in self._stats}
+
+    def prune(self, before: datetime) -> int:
+        with self._lock:
+            old = [
+                t.id
+                for t in self._rows.values()
+                if t.created_at < before and t.is_terminal()
+            ]
+            for transaction_id in old:
+                del self._rows[transaction_id]
+        return len(old)
@@ -0,0 +1,368 @@
+"""
+Backends em Redis para rodar vários processos do bot lado a lado
+
+Requer o pacote opcional redis (pip install "pushinpay-bot[redis]").
+"""
+
+import asyncio
+import heapq
+from datetime import datetime
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from pixbot.logger import logger
+from pixbot.models.stats import STATUSES
+from pixbot.models.transaction import TERMINAL_STATUSES, Transaction
+from pixbot.settings import get_settings
+from pixbot.storage.base import TransactionStore
+from pixbot.storage.state import BucketSpec, StateBackend
+
+settings = get_settings()
+
+# Remove a chave apenas se o valor ainda for o esperado
+DELETE_IF_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Consome uma ficha de todos os baldes, ou de nenhum. ARGV: idle_ttl e, para
+# cada balde, capacidade e taxa. Usa o relógio do Redis para que todos os
+# processos vejam o mesmo tempo; o resultado volta como texto para não ser
+# truncado para inteiro.
+TAKE_TOKEN_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local ttl = math.ceil(tonumber(ARGV[1]))
+local current = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    current[i] = tokens
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+end
+for i, key in ipairs(KEYS) do
+    local tokens = current[i]
+    if wait == 0 then
+        tokens = tokens - 1
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', key, ttl)
+end
+return tostring(wait)
+"""
+
+# Grava a transação e move o ID para o índice do novo status. Um status final
+# já gravado (por outro processo) só é substituído pelo pagamento de uma
+# cobrança expirada (veja Transaction.accepts_status). KEYS: hash da
+# transação; ARGV: prefixo, lista de status finais separada por vírgula e os
+# pares campo/valor. Retorna o status anterior ("" se a transação é nova) e o
+# gravado.
+UPSERT_SCRIPT = """
+local key = KEYS[1]
+local prefix = ARGV[1]
+local terminal = {}
+for status in string.gmatch(ARGV[2], '[^,]+') do
+    terminal[status] = true
+end
+local fields = {}
+for i = 3, #ARGV, 2 do
+    fields[ARGV[i]] = ARGV[i + 1]
+end
+local old_status = redis.call('HGET', key, 'status')
+if old_status and terminal[old_status]
+    and not (old_status == 'expired' and fields['status'] == 'paid') then
+    fields['status'] = old_status
+end
+local args = {}
+for field, value in pairs(fields) do
+    table.insert(args, field)
+    table.insert(args, value)
+end
+redis.call('HSET', key, unpack(args))
+if old_status and old_status ~= fields['status'] then
+    redis.call('ZREM', prefix .. 'status:' .. old_status, fields['id'])
+end
+redis.call('ZADD', prefix .. 'status:' .. fields['status'], fields['created_at'], fields['id'])
+return {old_status or '', fields['status']}
+"""
+
+# Campos opcionais: ausentes do hash quando None
+OPTIONAL_FIELDS = ("description", "message_id", "chat_id", "qr_file_id")
+
+# Quantidade de transações lidas por vez ao percorrer um índice
+FETCH_SIZE = 500
+
+
+def connect(url: Optional[str] = None) -> Any:
+    """
+    Cria um cliente Redis
+
+    Args:
+        url: URL de conexão; usa settings.redis_url se omitida
+
+    Returns:
+        Cliente redis.Redis que devolve textos (decode_responses)
+
+    Raises:
+        RuntimeError: Se o pacote redis não estiver instalado
+    """
+    try:
+        import redis
+    except ImportError as e:
+        raise RuntimeError(
+            'O backend redis requer o pacote redis: pip install "pushinpay-bot[redis]"'
+        ) from e
+
+    return redis.Redis.from_url(
+        url or settings.redis_url,
+        decode_responses=True,
+        socket_timeout=settings.redis_timeout,
+        socket_connect_timeout=settings.redis_timeout,
+        health_check_interval=30,
+    )
+
+
+def _to_mapping(transaction: Transaction) -> Dict[str, str]:
+    """Converte uma Transaction nos campos do hash"""
+    mapping = {
+        "id": transaction.id,
+        "user_id": str(transaction.user_id),
+        "amount": repr(transaction.amount),
+        "qr_code": transaction.qr_code,
+        "created_at": repr(transaction.created_at.timestamp()),
+        "status": transaction.status,
+        "updated_at": repr(datetime.now().timestamp()),
+    }
+    for field in OPTIONAL_FIELDS:
+        value = getattr(transaction, field)
+        if value is not None:
+            mapping[field] = str(value)
+    return mapping
+
+
+def _from_mapping(mapping: Dict[str, str]) -> Transaction:
+    """Converte os campos do hash em uma Transaction"""
+    message_id = mapping.get("message_id")
+    chat_id = mapping.get("chat_id")
+    return Transaction(
+        id=mapping["id"],
+        user_id=int(mapping["user_id"]),
+        amount=float(mapping["amount"]),
+        qr_code=mapping["qr_code"],
+        created_at=datetime.fromtimestamp(float(mapping["created_at"])),
+        status=mapping["status"],
+        description=mapping.get("description"),
+        message_id=int(message_id) if message_id is not None else None,
+        chat_id=int(chat_id) if chat_id is not None else None,
+        qr_file_id=mapping.get("qr_file_id"),
+    )
+
+
+class RedisStateBackend(StateBackend):
+    """
+    Estado compartilhado em um servidor Redis
+
+    O cliente é síncrono: cada comando roda em uma thread auxiliar, para que
+    a latência ou a queda do servidor não congele o event loop.
+
+    Args:
+        client: Cliente redis.Redis com decode_responses (ou um substituto
+            compatível, como o do fakeredis)
+        prefix: Prefixo de todas as chaves
+    """
+
+    shared = True
+
+    def __init__(self, client: Any, prefix: str = "pixbot:"):
+        self.client = client
+        self.prefix = prefix
+        self._delete_if = client.register_script(DELETE_IF_SCRIPT)
+        self._take_token = client.register_script(TAKE_TOKEN_SCRIPT)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.client.get, self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        px = int(ttl * 1000) if ttl is not None else None
+        await asyncio.to_thread(self.client.set, self.prefix + key, value, px=px)
+
+    async def pop(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.client.getdel, self.prefix + key)
+
+    async def delete_if(self, key: str, value: str) -> bool:
+        deleted = await asyncio.to_thread(
+            self._delete_if, keys=[self.prefix + key], args=[value]
+        )
+        return bool(deleted)
+
+    async def take_token(self, buckets: Sequence[BucketSpec], idle_ttl: float) -> float:
+        keys = [self.prefix + key for key, _, _ in buckets]
+        args: List[Any] = [idle_ttl]
+        for _, capacity, rate in buckets:
+            args.extend((capacity, rate))
+        wait = await asyncio.to_thread(self._take_token, keys=keys, args=args)
+        return float(wait)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class RedisTransactionStore(TransactionStore):
+    """
+    Persiste as transações em hashes do Redis, visíveis a todos os processos
+
+    Cada transação fica em "<prefixo>tx:<id>", e um sorted set por status
+    ("<prefixo>tx:status:<status>", ordenado pela criação) serve de índice
+    para iter_by_status. Os contadores das estatísticas ficam no hash
+    "<prefixo>stats".
+
+    Args:
+        client: Cliente redis.Redis com decode_responses
+        prefix: Prefixo de todas as chaves
+    """
+
+    shared = True
+
+    def __init__(self, client: Any, prefix: str = "pixbot:"):
+        self.client = client
+        self.prefix = f"{prefix}tx:"
+        self.stats_key = f"{prefix}stats"
+        self._terminal = ",".join(sorted(TERMINAL_STATUSES))
+        self._upsert = client.register_script(UPSERT_SCRIPT)
+        logger.debug(f"Armazenamento Redis com prefixo {self.prefix}")
+
+    def _key(self, transaction_id: str) -> str:
+        return f"{self.prefix}{transaction_id}"
+
+    def _upsert_args(self, transaction: Transaction) -> List[str]:
+        args = [self.prefix, self._terminal]
+        for field, value in _to_mapping(transaction).items():
+            args.extend((field, value))
+        return args
+
+    def get(self, transaction_id: str) -> Optional[Transaction]:
+        mapping = self.client.hgetall(self._key(transaction_id))
+        return _from_mapping(mapping) if mapping else None
+
+    def insert(self, transaction: Transaction) -> None:
+        self._upsert(
+            keys=[self._key(transaction.id)], args=self._upsert_args(transaction)
+        )
+
+    def update_status(self, transaction: Transaction) -> Tuple[Optional[str], str]:
+        previous, current = self._upsert(
+            keys=[self._key(transaction.id)], args=self._upsert_args(transaction)
+        )
+        return previous or None, current
+
+    def upsert_many(self, transactions: Iterable[Transaction]) -> int:
+        count = 0
+        pipe = self.client.pipeline(transaction=False)
+        for transaction in transactions:
+            self._upsert(
+                keys=[self._key(transaction.id)],
+                args=self._upsert_args(transaction),
+                client=pipe,
+            )
+            count += 1
+        if count:
+            pipe.execute()
+        return count
+
+    def _scan_index(self, key: str, low: float, high: str) -> Iterator[List[str]]:
+        """
+        Percorre um sorted set em ordem de score, até FETCH_SIZE IDs por vez
+
+        Pagina pelo score em vez da posição: como os IDs saem do índice ao
+        mudar de status durante a leitura, uma posição já lida apontaria
+        para outro membro, e os seguintes seriam pulados. Os IDs já lidos com
+        o mesmo score da página seguinte são descartados.
+
+        Args:
+            key: Chave do sorted set
+            low: Score inicial (inclusivo)
+            high: Score final no formato do ZRANGEBYSCORE (ex.: "(123.4", "+inf")
+
+        Returns:
+            Iterador de listas de IDs
+        """
+        seen: Set[str] = set()  # IDs já lidos com score igual a low
+        while True:
+            page = self.client.zrangebyscore(
+                key, low, high, start=0, num=FETCH_SIZE + len(seen), withscores=True
+            )
+            page = [(member, score) for member, score in page if member not in seen]
+            if not page:
+                return
+            yield [member for member, _ in page]
+
+            last = page[-1][1]
+            if last != low:
+                low = last
+                seen = set()
+            seen.update(member for member, score in page if score == last)
+
+    def _iter_index(self, status: str, low: float, high: str) -> Iterator[Transaction]:
+        """Percorre as transações de um índice de status, em ordem de criação"""
+        for ids in self._scan_index(f"{self.prefix}status:{status}", low, high):
+            pipe = self.client.pipeline(transaction=False)
+            for transaction_id in ids:
+                pipe.hgetall(self._key(transaction_id))
+            for mapping in pipe.execute():
+                # Ignora as que mudaram de status durante a leitura
+                if mapping and mapping["status"] == status:
+                    yield _from_mapping(mapping)
+
+    def _merge(self, streams: List[Iterator[Transaction]]) -> Iterator[Transaction]:
+        """Junta os índices de vários status em ordem de criação"""
+        return heapq.merge(*streams, key=lambda transaction: transaction.created_at)
+
+    def iter_by_status(self, statuses: Iterable[str]) -> Iterator[Transaction]:
+        return self._merge(
+            [self._iter_index(status, float("-inf"), "+inf") for status in statuses]
+        )
+
+    def iter_created_between(
+        self, start: datetime, end: datetime, statuses: Optional[Iterable[str]] = None
+    ) -> Iterator[Transaction]:
+        high = f"({end.timestamp()!r}"
+        return self._merge(
+            [
+                self._iter_index(status, start.timestamp(), high)
+                for status in (STATUSES if statuses is None else statuses)
+            ]
+        )
+
+    def add_stats(self, deltas: Dict[str, float]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for key, delta in deltas.items():
+            pipe.hincrbyfloat(self.stats_key, key, delta)
+        pipe.execute()
+
+    def load_stats(self, keys: Iterable[str]) -> Dict[str, float]:
+        keys = list(keys)
+        values = self.client.hmget(self.stats_key, keys)
+        return {
+            key: float(value) for key, value in zip(keys, values, strict=True) if value
+        }
+
+    def close(self) -> None:
+        self.client.close()
@@ -0,0 +1,285 @@
+"""
+Armazenamento de transações em SQLite (modo WAL)
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from pixbot.logger import logger
+from pixbot.models.transaction import TERMINAL_STATUSES, Transaction
+from pixbot.storage.base import TransactionStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    qr_code TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    description TEXT,
+    message_id INTEGER,
+    chat_id INTEGER,
+    qr_file_id TEXT,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_status ON transactions (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_created_at ON transactions (created_at);
+"""
+
+COLUMNS = (
+    "id, user_id, amount, qr_code, created_at, status, description, "
+    "message_id, chat_id, qr_file_id, updated_at"
+)
+
+# Status finais no formato da cláusula IN
+TERMINAL_SQL = ", ".join(f"'{status}'" for status in sorted(TERMINAL_STATUSES))
+
+# Colunas adicionadas depois da criação da tabela: (nome, tipo)
+MIGRATIONS = (("qr_file_id", "TEXT"),)
+
+# Um status final gravado só é substituído pelo pagamento de uma cobrança
+# expirada (veja Transaction.accepts_status)
+UPSERT_SQL = f"""
+INSERT INTO transactions ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    status = CASE
+        WHEN transactions.status IN ({TERMINAL_SQL})
+            AND NOT (transactions.status = 'expired' AND excluded.status = 'paid')
+        THEN transactions.status
+        ELSE excluded.status
+    END,
+    message_id = excluded.message_id,
+    chat_id = excluded.chat_id,
+    qr_file_id = excluded.qr_file_id,
+    updated_at = excluded.updated_at
+"""
+
+# Contadores das estatísticas (veja TransactionStats)
+STATS_SCHEMA = """
+CREATE TABLE stats (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+STATS_UPSERT_SQL = """
+INSERT INTO stats (key, value) VALUES (?, ?)
+ON CONFLICT (key) DO UPDATE SET value = value + excluded.value
+"""
+
+# Calcula os contadores das transações gravadas antes da tabela de estatísticas.
+# O pagamento é datado pela última gravação da transação paga (updated_at).
+STATS_BACKFILL_SQL = """
+INSERT INTO stats (key, value)
+SELECT 'created', COUNT(*) FROM transactions
+UNION ALL
+SELECT 'count:' || status, COUNT(*) FROM transactions GROUP BY status
+UNION ALL
+SELECT 'amount:' || status, SUM(amount) FROM transactions GROUP BY status
+UNION ALL
+SELECT 'paid_hour:' || strftime('%Y-%m-%dT%H', updated_at, 'unixepoch', 'localtime'),
+    SUM(amount)
+FROM transactions WHERE status = 'paid' GROUP BY 1
+UNION ALL
+SELECT 'paid_day:' || strftime('%Y-%m-%d', updated_at, 'unixepoch', 'localtime'),
+    SUM(amount)
+FROM transactions WHERE status = 'paid' GROUP BY 1
+UNION ALL
+SELECT 'pay_seconds', TOTAL(MAX(updated_at - created_at, 0))
+FROM transactions WHERE status = 'paid'
+UNION ALL
+SELECT 'pay_count', COUNT(*) FROM transactions WHERE status = 'paid'
+"""
+
+# Quantidade de linhas lidas do banco por vez ao percorrer resultados grandes
+FETCH_SIZE = 1000
+
+
+def _to_row(transaction: Transaction) -> Tuple:
+    """Converte uma Transaction em uma linha da tabela"""
+    return (
+        transaction.id,
+        transaction.user_id,
+        transaction.amount,
+        transaction.qr_code,
+        transaction.created_at.timestamp(),
+        transaction.status,
+        transaction.description,
+        transaction.message_id,
+        transaction.chat_id,
+        transaction.qr_file_id,
+        datetime.now().timestamp(),
+    )
+
+
+def _from_row(row: Tuple) -> Transaction:
+    """Converte uma linha da tabela em uma Transaction"""
+    return Transaction(
+        id=row[0],
+        user_id=row[1],
+        amount=row[2],
+        qr_code=row[3],
+        created_at=datetime.fromtimestamp(row[4]),
+        status=row[5],
+        description=row[6],
+        message_id=row[7],
+        chat_id=row[8],
+        qr_file_id=row[9],
+    )
+
+
+class SQLiteTransactionStore(TransactionStore):
+    """
+    Persiste as transações em um arquivo SQLite
+
+    Usa conexões separadas para leitura e escrita: em modo WAL as leituras
+    por ID não esperam as gravações em lote. Ambas são chamadas de threads
+    auxiliares, fora do event loop (veja TransactionManager).
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._write_conn = self._connect()
+        self._write_conn.executescript(SCHEMA)
+        self._migrate()
+        self._read_conn = self._connect()
+
+        logger.debug(f"Armazenamento SQLite aberto em {path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre uma conexão configurada para WAL"""
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _migrate(self) -> None:
+        """Adiciona as colunas que faltam em bancos criados por versões anteriores"""
+        existing = {
+            row[1]
+            for row in self._write_conn.execute("PRAGMA table_info(transactions)")
+        }
+        for name, column_type in MIGRATIONS:
+            if name not in existing:
+                self._write_conn.execute(
+                    f"ALTER TABLE transactions ADD COLUMN {name} {column_type}"
+                )
+                logger.info(f"Coluna {name} adicionada à tabela de transações")
+
+        has_stats = self._write_conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats'"
+        ).fetchone()
+        if not has_stats:
+            self._write_conn.execute("BEGIN")
+            try:
+                self._write_conn.execute(STATS_SCHEMA)
+                self._write_conn.execute(STATS_BACKFILL_SQL)
+                self._write_conn.execute("COMMIT")
+            except Exception:
+                self._write_conn.execute("ROLLBACK")
+                raise
+            logger.info("Tabela de estatísticas criada a partir das transações")
+
+    def get(self, transaction_id: str) -> Optional[Transaction]:
+        with self._read_lock:
+            row = self._read_conn.execute(
+                f"SELECT {COLUMNS} FROM transactions WHERE id = ?", (transaction_id,)
+            ).fetchone()
+        return _from_row(row) if row else None
+
+    def insert(self, transaction: Transaction) -> None:
+        with self._write_lock:
+            self._write_conn.execute(UPSERT_SQL, _to_row(transaction))
+
+    def upsert_many(self, transactions: Iterable[Transaction]) -> int:
+        rows = [_to_row(transaction) for transaction in transactions]
+        if not rows:
+            return 0
+
+        with self._write_lock:
+            self._write_conn.execute("BEGIN")
+            try:
+                self._write_conn.executemany(UPSERT_SQL, rows)
+                self._write_conn.execute("COMMIT")
+            except Exception:
+                self._write_conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def iter_by_status(self, statuses: Iterable[str]) -> Iterator[Transaction]:
+        statuses = list(statuses)
+        placeholders = ", ".join("?" for _ in statuses)
+        # Conexão própria para não segurar a conexão de leitura durante a iteração
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                f"SELECT {COLUMNS} FROM transactions "
+                f"WHERE status IN ({placeholders}) ORDER BY created_at",
+                statuses,
+            )
+            while rows := cursor.fetchmany(FETCH_SIZE):
+                for row in rows:
+                    yield _from_row(row)
+        finally:
+            conn.close()
+
+    def iter_created_between(
+        self, start: datetime, end: datetime, statuses: Optional[Iterable[str]] = None
+    ) -> Iterator[Transaction]:
+        query = f"SELECT {COLUMNS} FROM transactions WHERE created_at >= ? AND created_at < ?"
+        params = [start.timestamp(), end.timestamp()]
+        if statuses is not None:
+            statuses = list(statuses)
+            query += f" AND status IN ({', '.join('?' for _ in statuses)})"
+            params.extend(statuses)
+
+        # Conexão própria para não segurar a conexão de leitura durante a iteração
+        conn = self._connect()
+        try:
+            cursor = conn.execute(query + " ORDER BY created_at", params)
+            while rows := cursor.fetchmany(FETCH_SIZE):
+                for row in rows:
+                    yield _from_row(row)
+        finally:
+            conn.close()
+
+    def add_stats(self, deltas: Dict[str, float]) -> None:
+        if not deltas:
+            return
+        with self._write_lock:
+            self._write_conn.execute("BEGIN")
+            try:
+                self._write_conn.executemany(STATS_UPSERT_SQL, deltas.items())
+                self._write_conn.execute("COMMIT")
+            except Exception:
+                self._write_conn.execute("ROLLBACK")
+                raise
+
+    def load_stats(self, keys: Iterable[str]) -> Dict[str, float]:
+        keys = list(keys)
+        placeholders = ", ".join("?" for _ in keys)
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                f"SELECT key, value FROM stats WHERE key IN ({placeholders})", keys
+            ).fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._write_lock:
+            self._write_conn.close()
+        with self._read_lock:
+            self._read_conn.close()
+        logger.debug("Armazenamento SQLite fechado")
@@ -0,0 +1,203 @@
+"""
+Estado de execução compartilhável entre processos (chave-valor com expiração)
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from itertools import islice
+from typing import Dict, Optional, Sequence, Tuple
+
+from pixbot.settings import get_settings
+
+settings = get_settings()
+
+# (chave, capacidade, fichas por segundo) de cada balde de um limite
+BucketSpec = Tuple[str, float, float]
+
+
+class StateBackend(ABC):
+    """
+    Armazenamento chave-valor do estado de execução do bot
+
+    Guarda o estado que precisa ser visto por todos os processos do bot
+    (conversas em andamento, limites de requisições). As operações são
+    atômicas em cada backend, e corrotinas: backends em rede não podem
+    bloquear o event loop enquanto aguardam o servidor.
+    """
+
+    # True quando outros processos enxergam o mesmo estado
+    shared = False
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Obtém o valor de uma chave
+
+        Args:
+            key: Chave
+
+        Returns:
+            O valor ou None se não existir ou tiver expirado
+        """
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """
+        Grava o valor de uma chave
+
+        Args:
+            key: Chave
+            value: Valor
+            ttl: Segundos até a chave expirar (None para não expirar)
+        """
+
+    @abstractmethod
+    async def pop(self, key: str) -> Optional[str]:
+        """
+        Obtém e remove o valor de uma chave em uma única operação
+
+        Args:
+            key: Chave
+
+        Returns:
+            O valor removido ou None se não existia
+        """
+
+    @abstractmethod
+    async def delete_if(self, key: str, value: str) -> bool:
+        """
+        Remove a chave apenas se ela ainda tiver o valor informado
+
+        Args:
+            key: Chave
+            value: Valor esperado
+
+        Returns:
+            True se a chave foi removida
+        """
+
+    @abstractmethod
+    async def take_token(self, buckets: Sequence[BucketSpec], idle_ttl: float) -> float:
+        """
+        Consome uma ficha de cada balde, se todos tiverem ficha disponível
+
+        Args:
+            buckets: Baldes envolvidos na ação
+            idle_ttl: Segundos sem uso após os quais um balde é descartado
+
+        Returns:
+            0 se as fichas foram consumidas, ou os segundos até haver ficha
+        """
+
+    def close(self) -> None:
+        """Libera os recursos do backend"""
+
+
+class MemoryStateBackend(StateBackend):
+    """
+    Estado no próprio processo
+
+    Padrão para um único processo e substituto local do backend em rede.
+    """
+
+    # Chaves expiradas removidas por gravação, no máximo
+    CLEANUP_BATCH = 8
+
+    def __init__(self):
+        # chave -> (expira em monotonic ou None, valor)
+        self._data: Dict[str, Tuple[Optional[float], str]] = {}
+        # chave -> (fichas, atualizado em monotonic)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key: str, now: float) -> Optional[str]:
+        """Valor da chave, descartando-a se já expirou"""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return None
+        return value
+
+    def _cleanup(self, now: float) -> None:
+        """Descarta algumas chaves expiradas (as mais antigas ficam no início)"""
+        for key in list(islice(self._data, self.CLEANUP_BATCH)):
+            self._alive(key, now)
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._alive(key, time.monotonic())
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (None if ttl is None else now + ttl, value)
+            self._cleanup(now)
+
+    async def pop(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._alive(key, time.monotonic())
+            if value is not None:
+                del self._data[key]
+            return value
+
+    async def delete_if(self, key: str, value: str) -> bool:
+        with self._lock:
+            if self._alive(key, time.monotonic()) != value:
+                return False
+            del self._data[key]
+            return True
+
+    async def take_token(self, buckets: Sequence[BucketSpec], idle_ttl: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            current = []
+            wait = 0.0
+            for key, capacity, rate in buckets:
+                tokens, updated = self._buckets.get(key, (capacity, now))
+                if now - updated > idle_ttl:
+                    tokens = capacity
+                tokens = min(capacity, tokens + (now - updated) * rate)
+                current.append(tokens)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / rate)
+
+            spent = 0 if wait > 0 else 1
+            for (key, _, _), tokens in zip(buckets, current, strict=True):
+                # Reinsere no fim: os baldes ociosos ficam no início
+                self._buckets.pop(key, None)
+                self._buckets[key] = (tokens - spent, now)
+
+            for key in list(islice(self._buckets, self.CLEANUP_BATCH)):
+                if now - self._buckets[key][1] <= idle_ttl:
+                    break
+                del self._buckets[key]
+        return wait
+
+
+_backend: Optional[StateBackend] = None
+
+
+def get_state_backend() -> StateBackend:
+    """
+    Retorna o backend de estado, criando-o na primeira chamada
+
+    Returns:
+        Instância de StateBackend conforme settings.state_backend
+    """
+    global _backend
+    if _backend is None:
+        backend = settings.state_backend.lower()
+        if backend == "memory":
+            _backend = MemoryStateBackend()
+        elif backend == "redis":
+            from pixbot.storage.redis import RedisStateBackend, connect
+
+            _backend = RedisStateBackend(connect(), prefix=settings.redis_prefix)
+        else:
+            raise ValueError(f"Backend de estado desconhecido: {backend}")
+    return _backend
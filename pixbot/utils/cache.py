@@ -0,0 +1,93 @@
+"""
+Estruturas de cache e deduplicação de chamadas assíncronas
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class TTLCache(Generic[T]):
+    """
+    Cache LRU com tempo de vida por entrada
+
+    Args:
+        maxsize: Quantidade máxima de entradas
+        ttl: Tempo de vida de cada entrada em segundos
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, T]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[T]:
+        """Retorna o valor se ainda estiver válido, ou None"""
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: T, ttl: Optional[float] = None) -> None:
+        """Guarda um valor, descartando as entradas menos usadas se necessário"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Remove uma entrada, se existir"""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove todas as entradas"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas simultâneas com a mesma chave em uma única execução
+
+    Enquanto uma chamada estiver em andamento, as demais com a mesma chave
+    aguardam e recebem o mesmo resultado (ou a mesma exceção). O cancelamento
+    de quem aguarda não cancela a chamada compartilhada.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Executa func uma única vez para chamadas simultâneas com a mesma chave
+
+        Args:
+            key: Chave de deduplicação
+            func: Função que cria a corrotina a executar
+
+        Returns:
+            Resultado compartilhado da execução
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def inflight(self) -> int:
+        """Retorna a quantidade de chamadas em andamento"""
+        return len(self._inflight)
@@ -0,0 +1,157 @@
+"""
+Roteamento de callbacks por prefixo com callback_data compacto
+"""
+
+import inspect
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from pyrogram import Client
+from pyrogram.types import CallbackQuery
+
+from pixbot.logger import logger
+
+# Tamanho máximo de callback_data aceito pelo Telegram
+MAX_CALLBACK_DATA = 64
+
+SEPARATOR = ":"
+
+Handler = Callable[..., Awaitable[Any]]
+
+
+class CB:
+    """
+    Prefixos compactos usados no callback_data dos botões
+    """
+
+    PAYMENT_OPTIONS = "po"
+    PAYMENT = "p"
+    CUSTOM_AMOUNT = "pc"
+    CANCEL_PAYMENT = "xp"
+    CANCEL_OPERATION = "xo"
+    HELP = "h"
+    ABOUT = "a"
+    BACK_TO_START = "bs"
+    SHOW_QR = "qr"
+    CHECK_PAYMENT = "cp"
+    BACK_TO_PIX = "bp"
+
+
+def encode(prefix: str, *args: Any) -> str:
+    """
+    Monta o callback_data de um botão
+
+    Args:
+        prefix: Prefixo compacto da ação (veja CB)
+        *args: Argumentos da ação, convertidos para texto
+
+    Returns:
+        str: callback_data no formato "prefixo:arg1:arg2"
+
+    Raises:
+        ValueError: Se o resultado ultrapassar o limite do Telegram
+    """
+    data = SEPARATOR.join((prefix, *map(str, args))) if args else prefix
+    if len(data.encode()) > MAX_CALLBACK_DATA:
+        raise ValueError(f"callback_data excede {MAX_CALLBACK_DATA} bytes: {data}")
+    return data
+
+
+class CallbackRouter:
+    """
+    Despacha callbacks para o handler registrado no prefixo, em O(1)
+
+    O callback_data é dividido uma única vez e os argumentos já separados
+    são repassados ao handler, que não precisa mais aplicar expressões regulares.
+    """
+
+    def __init__(self):
+        # prefixo -> (handler, argumentos obrigatórios, argumentos máximos)
+        self._routes: Dict[str, Tuple[Handler, int, int]] = {}
+        # callback_data completo antigo -> callback_data atual
+        self._aliases: Dict[str, str] = {}
+
+    def route(self, prefix: str, *aliases: str) -> Callable[[Handler], Handler]:
+        """
+        Registra um handler para um prefixo
+
+        Os argumentos do handler após (client, callback_query) definem quantos
+        argumentos o callback_data deve trazer.
+
+        Args:
+            prefix: Prefixo compacto da ação
+            *aliases: Prefixos antigos aceitos para botões já enviados
+
+        Returns:
+            Callable: Decorador que devolve o próprio handler
+        """
+
+        def decorator(func: Handler) -> Handler:
+            params = list(inspect.signature(func).parameters.values())[2:]
+            required = sum(1 for p in params if p.default is inspect.Parameter.empty)
+            entry = (func, required, len(params))
+
+            for key in (prefix, *aliases):
+                if key in self._routes:
+                    raise ValueError(f"Prefixo de callback já registrado: {key}")
+                self._routes[key] = entry
+            return func
+
+        return decorator
+
+    def alias(self, data: str, target: str) -> None:
+        """
+        Mapeia um callback_data antigo completo para o formato atual
+
+        Args:
+            data: callback_data antigo (ex.: "payment:custom")
+            target: callback_data equivalente atual
+        """
+        self._aliases[data] = target
+
+    def parse(self, data: str) -> Tuple[str, List[str]]:
+        """
+        Separa o prefixo dos argumentos de um callback_data
+
+        Args:
+            data: callback_data recebido
+
+        Returns:
+            Tuple[str, List[str]]: Prefixo e lista de argumentos
+        """
+        data = self._aliases.get(data, data)
+        prefix, *args = data.split(SEPARATOR)
+        return prefix, args
+
+    async def dispatch(self, client: Client, callback_query: CallbackQuery) -> bool:
+        """
+        Encaminha o callback para o handler do seu prefixo
+
+        Args:
+            client: Cliente do Pyrogram
+            callback_query: Callback recebido
+
+        Returns:
+            bool: False se nenhum handler estiver registrado para o prefixo
+        """
+        prefix, args = self.parse(callback_query.data or "")
+        entry = self._routes.get(prefix)
+        if entry is None:
+            return False
+
+        handler, required, maximum = entry
+        if not required <= len(args) <= maximum:
+            logger.warning(f"Argumentos inválidos no callback: {callback_query.data}")
+            await callback_query.answer("Dados inválidos", show_alert=True)
+            return True
+
+        await handler(client, callback_query, *args)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+
+router = CallbackRouter()
+
+# Botão antigo de valor personalizado usava o mesmo prefixo dos valores fixos
+router.alias("payment:custom", CB.CUSTOM_AMOUNT)
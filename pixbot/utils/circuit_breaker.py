@@ -0,0 +1,142 @@
+"""
+Circuit breaker para chamadas a serviços externos
+"""
+
+import time
+from typing import Any, Callable, Dict, List
+
+from pixbot.logger import logger
+
+
+class CircuitBreaker:
+    """
+    Interrompe as chamadas a um serviço que está falhando
+
+    - closed: chamadas liberadas; falhas consecutivas são contadas
+    - open: após failure_threshold falhas seguidas, as chamadas falham na
+      hora durante recovery_timeout segundos
+    - half_open: passado esse tempo, libera até half_open_max_calls chamadas
+      de teste; um sucesso fecha o circuito e uma falha o reabre
+
+    Args:
+        name: Nome do serviço (usado nos logs)
+        failure_threshold: Falhas consecutivas para abrir o circuito
+        recovery_timeout: Segundos em aberto antes de testar a recuperação
+        half_open_max_calls: Chamadas de teste simultâneas em half_open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._listeners: List[Callable[[str, str], Any]] = []
+
+        # Contadores para observabilidade
+        self.total_failures = 0
+        self.total_rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        """Estado atual, passando de open para half_open quando for a hora"""
+        if (
+            self._state == self.OPEN
+            and time.monotonic() - self._opened_at >= self.recovery_timeout
+        ):
+            self._set_state(self.HALF_OPEN)
+        return self._state
+
+    def add_listener(self, listener: Callable[[str, str], Any]) -> None:
+        """
+        Registra uma função chamada a cada mudança de estado
+
+        Args:
+            listener: Função que recebe (estado_anterior, novo_estado)
+        """
+        self._listeners.append(listener)
+
+    def _set_state(self, state: str) -> None:
+        old_state, self._state = self._state, state
+        if old_state == state:
+            return
+
+        self._probes = 0
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+            logger.warning(
+                f"Circuit breaker {self.name} ABERTO após {self._failures} falhas; "
+                f"nova tentativa em {self.recovery_timeout:.0f}s"
+            )
+        elif state == self.HALF_OPEN:
+            logger.info(f"Circuit breaker {self.name} testando recuperação")
+        else:
+            logger.info(f"Circuit breaker {self.name} fechado, serviço recuperado")
+
+        for listener in self._listeners:
+            try:
+                listener(old_state, state)
+            except Exception as e:
+                logger.error(f"Erro no listener do circuit breaker: {str(e)}")
+
+    def allow(self) -> bool:
+        """
+        Verifica se uma chamada pode ser feita agora
+
+        Returns:
+            True se a chamada está liberada
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return True
+
+        self.total_rejected += 1
+        return False
+
+    def release(self) -> None:
+        """Devolve a vaga de uma chamada de teste interrompida sem resultado"""
+        if self._state == self.HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def record_success(self) -> None:
+        """Registra uma chamada bem-sucedida"""
+        self._failures = 0
+        if self._state != self.CLOSED:
+            self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        """Registra uma chamada que falhou"""
+        self._failures += 1
+        self.total_failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._set_state(self.OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna o estado e os contadores do circuito"""
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "total_failures": self.total_failures,
+            "total_rejected": self.total_rejected,
+            "times_opened": self.times_opened,
+        }
@@ -0,0 +1,203 @@
+"""
+Conversas com o usuário como máquina de estados, com prazos em uma roda de temporizadores
+"""
+
+import json
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pyrogram import Client, filters
+from pyrogram.types import Message
+
+from pixbot.logger import logger
+from pixbot.settings import get_settings
+from pixbot.storage.state import get_state_backend
+from pixbot.utils.timer_wheel import TimerWheel
+
+settings = get_settings()
+
+TextHandler = Callable[[Client, Message, "Conversation"], Awaitable[Any]]
+TimeoutHandler = Callable[[Client, "Conversation"], Awaitable[Any]]
+
+
+class State:
+    """
+    Estados em que uma conversa aguarda uma mensagem do usuário
+    """
+
+    AWAITING_AMOUNT = "amount"
+
+
+@dataclass(slots=True)
+class Conversation:
+    """Conversa em andamento de um usuário"""
+
+    user_id: int
+    chat_id: int  # Chat onde a conversa começou
+    state: str
+    token: str  # Distingue conversas seguidas do mesmo usuário
+
+
+class ConversationEngine:
+    """
+    Encaminha as mensagens de texto ao handler do estado da conversa, em O(1)
+
+    Cada usuário tem no máximo uma conversa, guardada no backend de estado
+    (compartilhado entre processos, se configurado). Nenhuma corrotina fica
+    suspensa esperando a resposta: o texto recebido é entregue ao handler
+    registrado para o estado, e os prazos ficam em uma única roda de
+    temporizadores por processo.
+
+    Args:
+        wheel: Roda de temporizadores dos prazos
+    """
+
+    def __init__(self, wheel: TimerWheel):
+        self.wheel = wheel
+        self._text_handlers: Dict[str, TextHandler] = {}
+        self._timeout_handlers: Dict[str, TimeoutHandler] = {}
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"conversation:{user_id}"
+
+    def on_text(self, state: str) -> Callable[[TextHandler], TextHandler]:
+        """
+        Registra o handler do texto recebido em um estado
+
+        O handler recebe (client, message, conversation); a conversa já foi
+        encerrada quando ele é chamado e pode ser reaberta com begin().
+
+        Args:
+            state: Estado da conversa (veja State)
+
+        Returns:
+            Callable: Decorador que devolve o próprio handler
+        """
+
+        def decorator(func: TextHandler) -> TextHandler:
+            self._text_handlers[state] = func
+            return func
+
+        return decorator
+
+    def on_timeout(self, state: str) -> Callable[[TimeoutHandler], TimeoutHandler]:
+        """
+        Registra o handler chamado quando o prazo de um estado se esgota
+
+        Args:
+            state: Estado da conversa (veja State)
+
+        Returns:
+            Callable: Decorador que devolve o próprio handler
+        """
+
+        def decorator(func: TimeoutHandler) -> TimeoutHandler:
+            self._timeout_handlers[state] = func
+            return func
+
+        return decorator
+
+    async def begin(
+        self, client: Client, user_id: int, chat_id: int, state: str, timeout: float
+    ) -> Conversation:
+        """
+        Abre (ou substitui) a conversa do usuário
+
+        Args:
+            client: Cliente do Pyrogram, usado no aviso de prazo esgotado
+            user_id: ID do usuário no Telegram
+            chat_id: Chat da conversa
+            state: Estado inicial (veja State)
+            timeout: Segundos até o prazo se esgotar
+
+        Returns:
+            A conversa aberta
+        """
+        conversation = Conversation(user_id, chat_id, state, uuid.uuid4().hex)
+        raw = json.dumps(asdict(conversation))
+
+        # A chave dura mais que o prazo para o aviso ainda encontrá-la, e
+        # expira sozinha se o processo que agendou o prazo cair
+        await get_state_backend().set(self._key(user_id), raw, ttl=timeout * 2)
+        self.wheel.schedule(
+            user_id, timeout, lambda: self._expire(client, conversation, raw)
+        )
+        return conversation
+
+    async def end(self, user_id: int) -> Optional[Conversation]:
+        """
+        Encerra a conversa do usuário
+
+        Args:
+            user_id: ID do usuário no Telegram
+
+        Returns:
+            A conversa encerrada, ou None se não havia conversa
+        """
+        self.wheel.cancel(user_id)
+        raw = await get_state_backend().pop(self._key(user_id))
+        return Conversation(**json.loads(raw)) if raw else None
+
+    async def active(self, user_id: int) -> bool:
+        """Indica se o usuário tem uma conversa em andamento"""
+        return await get_state_backend().get(self._key(user_id)) is not None
+
+    async def dispatch_text(self, client: Client, message: Message) -> bool:
+        """
+        Entrega o texto ao handler do estado da conversa do remetente
+
+        Args:
+            client: Cliente do Pyrogram
+            message: Mensagem de texto recebida
+
+        Returns:
+            bool: False se o usuário não tinha conversa em andamento
+        """
+        conversation = await self.end(message.from_user.id)
+        if conversation is None:
+            return False
+
+        handler = self._text_handlers.get(conversation.state)
+        if handler is None:
+            logger.warning(f"Estado de conversa sem handler: {conversation.state}")
+            return False
+
+        await handler(client, message, conversation)
+        return True
+
+    async def _expire(self, client: Client, conversation: Conversation, raw: str):
+        """Chama o handler de prazo esgotado se a conversa ainda estiver aberta"""
+        # Respondida ou substituída (talvez em outro processo): nada a fazer
+        if not await get_state_backend().delete_if(
+            self._key(conversation.user_id), raw
+        ):
+            return
+
+        handler = self._timeout_handlers.get(conversation.state)
+        if handler is not None:
+            await handler(client, conversation)
+
+    def filter(self) -> filters.Filter:
+        """
+        Filtro do Pyrogram que aceita apenas remetentes com conversa aberta
+
+        Returns:
+            Filtro para combinar no registro do handler de texto
+        """
+
+        async def check(_, __, message: Message) -> bool:
+            return message.from_user is not None and await self.active(
+                message.from_user.id
+            )
+
+        return filters.create(check, "InConversation")
+
+    def __len__(self) -> int:
+        return len(self.wheel)
+
+
+conversations = ConversationEngine(
+    TimerWheel(tick=settings.timer_wheel_tick, slots=settings.timer_wheel_slots)
+)
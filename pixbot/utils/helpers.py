@@ -2,34 +2,44 @@
 Funções auxiliares para o bot
 """
 
+import asyncio
+import math
+import time
+from functools import lru_cache
 from io import BytesIO
-from typing import Any, Dict
+from typing import Tuple
 
 import qrcode
-from pyrogram import enums
-from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from pyrogram import Client
+from pyrogram.errors import MessageNotModified
+from pyrogram.types import CallbackQuery, InlineKeyboardMarkup
 
-from pixbot.logger import logger
-from pixbot.settings import Settings
-from pixbot.utils.messages import (  # Importando das mensagens
-    format_payment_message,
-    payment_status_message,
-)
+from pixbot.logger import logger, sampled
+from pixbot.models.transaction import Transaction
+from pixbot.settings import get_settings
+from pixbot.utils.metrics import QR_RENDER_LATENCY
+from pixbot.utils.rate_limiter import rate_limiter
+from pixbot.utils.screens import Screens
 
-settings = Settings()
+settings = get_settings()
 
 
-def create_qr_code(data: str) -> BytesIO:
+@lru_cache(maxsize=settings.qr_cache_size)
+def render_qr_png(data: str) -> bytes:
     """
-    Cria um QR Code a partir de uma string
+    Renderiza o QR Code de uma string como PNG
+
+    O resultado fica em cache (LRU) por conteúdo, então o mesmo código PIX
+    não é renderizado novamente.
 
     Args:
         data: String a ser codificada no QR Code
 
     Returns:
-        BytesIO contendo a imagem do QR Code
+        Bytes da imagem PNG
     """
-    logger.debug(f"Gerando QR Code para os dados: {data[:20]}...")
+    logger.debug("Gerando QR Code para os dados: {}...", data[:20])
+    start = time.perf_counter()
 
     qr = qrcode.QRCode(
         version=1,
@@ -42,40 +52,132 @@ def create_qr_code(data: str) -> BytesIO:
 
     img = qr.make_image(fill_color="black", back_color="white")
 
-    # Converte a imagem para BytesIO
     img_io = BytesIO()
     img.save(img_io, "PNG")
-    img_io.seek(0)
 
+    QR_RENDER_LATENCY.observe(time.perf_counter() - start)
+    return img_io.getvalue()
+
+
+def create_qr_code(data: str) -> BytesIO:
+    """
+    Cria um QR Code a partir de uma string
+
+    Args:
+        data: String a ser codificada no QR Code
+
+    Returns:
+        BytesIO contendo a imagem do QR Code
+    """
+    img_io = BytesIO(render_qr_png(data))
+    img_io.name = "qr_code.png"
+    return img_io
+
+
+async def create_qr_code_async(data: str) -> BytesIO:
+    """
+    Cria um QR Code sem bloquear o event loop
+
+    A renderização roda em uma thread auxiliar quando não está em cache.
+
+    Args:
+        data: String a ser codificada no QR Code
+
+    Returns:
+        BytesIO contendo a imagem do QR Code
+    """
+    png = await asyncio.to_thread(render_qr_png, data)
+    img_io = BytesIO(png)
+    img_io.name = "qr_code.png"
     return img_io
 
 
 def create_payment_keyboard() -> InlineKeyboardMarkup:
     """
-    Cria um teclado com os valores de pagamento pré-definidos
+    Retorna o teclado com os valores de pagamento pré-definidos
+
+    O teclado é montado uma única vez pela camada de telas e compartilhado.
 
     Returns:
         InlineKeyboardMarkup com os botões de pagamento
     """
-    buttons = []
-
-    # Adiciona botões para valores pré-definidos
-    row = []
-    for i, value in enumerate(settings.payment_values, 1):
-        row.append(
-            InlineKeyboardButton(
-                f"R$ {value:.2f}".replace(".", ","), callback_data=f"payment:{value}"
-            )
+    return Screens.payment_options.reply_markup
+
+
+def render_payment_status(
+    transaction: Transaction,
+) -> Tuple[str, InlineKeyboardMarkup]:
+    """
+    Monta a mensagem e o teclado correspondentes ao status de uma transação
+
+    Args:
+        transaction: Instância de Transaction
+
+    Returns:
+        Tupla com o texto da mensagem e o teclado de opções
+    """
+    screen = Screens.payment_status(transaction)
+    return screen.text, screen.reply_markup
+
+
+async def notify_payment_status(client: Client, transaction: Transaction) -> bool:
+    """
+    Atualiza a mensagem do pagamento no Telegram com o status atual
+
+    Args:
+        client: Cliente do Pyrogram
+        transaction: Instância de Transaction com message_id preenchido
+
+    Returns:
+        True se a mensagem foi editada, False caso contrário
+    """
+    if not transaction.message_id:
+        logger.debug(f"Transação {transaction.id} sem mensagem associada")
+        return False
+
+    text, keyboard = render_payment_status(transaction)
+
+    try:
+        await client.edit_message_text(
+            chat_id=transaction.get_chat_id(),
+            message_id=transaction.message_id,
+            text=text,
+            reply_markup=keyboard,
         )
+    except MessageNotModified:
+        return False
+    except Exception as e:
+        logger.error(
+            f"Erro ao atualizar mensagem da transação {transaction.id}: {str(e)}"
+        )
+        return False
 
-        # Cria nova linha a cada 2 botões
-        if i % 2 == 0 or i == len(settings.payment_values):
-            buttons.append(row)
-            row = []
+    return True
 
-    # Adiciona botão para valor personalizado
-    buttons.append(
-        [InlineKeyboardButton("➕ Valor Personalizado", callback_data="payment:custom")]
-    )
 
-    return InlineKeyboardMarkup(buttons)
+async def check_rate_limit(callback_query: CallbackQuery, action: str) -> bool:
+    """
+    Verifica o limite de requisições do usuário para uma ação
+
+    Se o limite foi atingido, avisa o usuário respondendo o callback.
+
+    Args:
+        callback_query: Callback recebido
+        action: Nome da ação (ex.: "check_payment")
+
+    Returns:
+        True se a ação pode prosseguir, False se foi limitada
+    """
+    user_id = callback_query.from_user.id
+    wait = await rate_limiter.check(user_id, action)
+    if wait <= 0:
+        return True
+
+    sampled("rate_limited").debug(
+        "Usuário {} limitado em {} por {:.1f}s", user_id, action, wait
+    )
+    await callback_query.answer(
+        f"Aguarde {math.ceil(wait)} segundos antes de tentar novamente",
+        show_alert=True,
+    )
+    return False
@@ -4,6 +4,9 @@ Mensagens padronizadas e templates para uso no bot
 
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from pixbot.models.stats import StatsReport
+from pixbot.utils.callback_router import CB, encode
+
 # Mensagens principais
 WELCOME_MESSAGE = """
 👋 **Bem-vindo ao Bot de Pagamentos PIX!**
@@ -126,6 +129,19 @@ PAYMENT_DETAILS_MESSAGE = """
 ID da transação: `{transaction_id}`
 """
 
+PAYMENT_CODE_MESSAGE = (
+    "🧾 **Detalhes do pagamento:**\n\n"
+    "💰 **Valor:** R$ {amount:.2f}\n\n"
+    "📲 **Chave Copia e Cola:**\n"
+    "`{qr_code}`\n\n"
+    "👉 Você também pode visualizar o QR Code e escanear com seu aplicativo bancário.\n\n"
+    "ID da transação: `{transaction_id}`"
+)
+
+PAYMENT_AMOUNT_MESSAGE = (
+    "🧾 **Detalhes do pagamento:**\n\n💰 **Valor:** R$ {amount:.2f}\n\n"
+)
+
 
 # Status de pagamento
 def payment_status_message(status: str) -> str:
@@ -149,16 +165,67 @@ def format_payment_message(value: float, qr_code: str, transaction_id: str) -> s
     Formata a mensagem de pagamento PIX
     """
     if qr_code:
-        return (
-            f"🧾 **Detalhes do pagamento:**\n\n"
-            f"💰 **Valor:** R$ {value:.2f}\n\n"
-            f"📲 **Chave Copia e Cola:**\n"
-            f"`{qr_code}`\n\n"
-            f"👉 Você também pode visualizar o QR Code e escanear com seu aplicativo bancário.\n\n"
-            f"ID da transação: `{transaction_id}`"
+        return PAYMENT_CODE_MESSAGE.format(
+            amount=value, qr_code=qr_code, transaction_id=transaction_id
         )
     else:
-        return f"🧾 **Detalhes do pagamento:**\n\n" f"💰 **Valor:** R$ {value:.2f}\n\n"
+        return PAYMENT_AMOUNT_MESSAGE.format(amount=value)
+
+
+# Estatísticas (comando /stats dos administradores)
+STATS_STATUS_LABELS = {
+    "created": "Criada",
+    "pending": "Pendente",
+    "paid": "Paga",
+    "expired": "Expirada",
+    "canceled": "Cancelada",
+    "failed": "Falhou",
+}
+
+
+def format_duration(seconds: float) -> str:
+    """Formata uma duração (ex.: 1h 02min, 3min 05s ou 42s)"""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}min"
+    if seconds >= 60:
+        return f"{seconds // 60}min {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def format_stats_message(report: StatsReport) -> str:
+    """
+    Formata o relatório de estatísticas das transações
+    """
+    lines = [
+        "📊 **Estatísticas de pagamentos**\n",
+        f"🧾 **Cobranças criadas:** {report.created}",
+        f"✅ **Conversão:** {report.conversion * 100:.1f}%",
+    ]
+    if report.avg_time_to_pay is not None:
+        lines.append(
+            f"⏱️ **Tempo médio até o pagamento:** "
+            f"{format_duration(report.avg_time_to_pay)}"
+        )
+
+    lines.append("\n**Por status:**")
+    for status, (count, amount) in report.by_status.items():
+        if count:
+            label = STATS_STATUS_LABELS.get(status, status)
+            lines.append(f"• {label}: {count} (R$ {amount:.2f})")
+
+    paid_hours = [(moment, amount) for moment, amount in report.paid_by_hour if amount]
+    total_hours = sum(amount for _, amount in paid_hours)
+    lines.append(f"\n**Pago nas últimas 24h:** R$ {total_hours:.2f}")
+    for moment, amount in paid_hours:
+        lines.append(f"`{moment:%H}h` R$ {amount:.2f}")
+
+    total_days = sum(amount for _, amount in report.paid_by_day)
+    lines.append(f"\n**Pago nos últimos 7 dias:** R$ {total_days:.2f}")
+    for moment, amount in report.paid_by_day:
+        lines.append(f"`{moment:%d/%m}` R$ {amount:.2f}")
+
+    return "\n".join(lines)
 
 
 # Teclados comuns
@@ -168,12 +235,12 @@ def main_menu_keyboard() -> InlineKeyboardMarkup:
         [
             [
                 InlineKeyboardButton(
-                    "💰 Gerar Pagamento", callback_data="show_payment_options"
+                    "💰 Gerar Pagamento", callback_data=CB.PAYMENT_OPTIONS
                 )
             ],
             [
-                InlineKeyboardButton("❓ Ajuda", callback_data="help"),
-                InlineKeyboardButton("ℹ️ Sobre", callback_data="about"),
+                InlineKeyboardButton("❓ Ajuda", callback_data=CB.HELP),
+                InlineKeyboardButton("ℹ️ Sobre", callback_data=CB.ABOUT),
             ],
         ]
     )
@@ -185,13 +252,13 @@ def payment_details_keyboard(transaction_id: str) -> InlineKeyboardMarkup:
         [
             [
                 InlineKeyboardButton(
-                    "👁️ Ver QR Code", callback_data=f"show_qr:{transaction_id}"
+                    "👁️ Ver QR Code", callback_data=encode(CB.SHOW_QR, transaction_id)
                 )
             ],
             [
                 InlineKeyboardButton(
                     "🔄 Verificar Pagamento",
-                    callback_data=f"check_payment:{transaction_id}",
+                    callback_data=encode(CB.CHECK_PAYMENT, transaction_id),
                 )
             ],
         ]
@@ -204,7 +271,7 @@ def error_keyboard() -> InlineKeyboardMarkup:
         [
             [
                 InlineKeyboardButton(
-                    "🔄 Tentar Novamente", callback_data="show_payment_options"
+                    "🔄 Tentar Novamente", callback_data=CB.PAYMENT_OPTIONS
                 )
             ]
         ]
@@ -214,7 +281,7 @@ def error_keyboard() -> InlineKeyboardMarkup:
 def custom_amount_keyboard() -> InlineKeyboardMarkup:
     """Retorna o teclado para entrada de valor personalizado"""
     return InlineKeyboardMarkup(
-        [[InlineKeyboardButton("❌ Cancelar", callback_data="cancel_payment")]]
+        [[InlineKeyboardButton("❌ Cancelar", callback_data=CB.CANCEL_PAYMENT)]]
     )
 
 
@@ -224,10 +291,10 @@ def retry_custom_amount_keyboard() -> InlineKeyboardMarkup:
         [
             [
                 InlineKeyboardButton(
-                    "🔄 Tentar Novamente", callback_data="payment:custom"
+                    "🔄 Tentar Novamente", callback_data=CB.CUSTOM_AMOUNT
                 )
             ],
-            [InlineKeyboardButton("◀️ Voltar", callback_data="show_payment_options")],
+            [InlineKeyboardButton("◀️ Voltar", callback_data=CB.PAYMENT_OPTIONS)],
         ]
     )
 
@@ -235,13 +302,7 @@ def retry_custom_amount_keyboard() -> InlineKeyboardMarkup:
 def payment_canceled_keyboard() -> InlineKeyboardMarkup:
     """Retorna o teclado para quando o pagamento é cancelado"""
     return InlineKeyboardMarkup(
-        [
-            [
-                InlineKeyboardButton(
-                    "💰 Novo Pagamento", callback_data="show_payment_options"
-                )
-            ]
-        ]
+        [[InlineKeyboardButton("💰 Novo Pagamento", callback_data=CB.PAYMENT_OPTIONS)]]
     )
 
 
@@ -251,13 +312,14 @@ def get_pending_payment_keyboard(transaction_id: str) -> InlineKeyboardMarkup:
         [
             [
                 InlineKeyboardButton(
-                    "📝 Ver Código PIX", callback_data=f"back_to_pix:{transaction_id}"
+                    "📝 Ver Código PIX",
+                    callback_data=encode(CB.BACK_TO_PIX, transaction_id),
                 )
             ],
             [
                 InlineKeyboardButton(
                     "🔄 Verificar Novamente",
-                    callback_data=f"check_payment:{transaction_id}",
+                    callback_data=encode(CB.CHECK_PAYMENT, transaction_id),
                 )
             ],
         ]
@@ -270,7 +332,8 @@ def get_completed_payment_keyboard(transaction_id: str) -> InlineKeyboardMarkup:
         [
             [
                 InlineKeyboardButton(
-                    "📝 Ver Código PIX", callback_data=f"back_to_pix:{transaction_id}"
+                    "📝 Ver Código PIX",
+                    callback_data=encode(CB.BACK_TO_PIX, transaction_id),
                 )
             ]
         ]
@@ -283,7 +346,8 @@ def get_failed_payment_keyboard(transaction_id: str) -> InlineKeyboardMarkup:
         [
             [
                 InlineKeyboardButton(
-                    "📝 Ver Código PIX", callback_data=f"back_to_pix:{transaction_id}"
+                    "📝 Ver Código PIX",
+                    callback_data=encode(CB.BACK_TO_PIX, transaction_id),
                 )
             ]
         ]
@@ -293,7 +357,7 @@ def get_failed_payment_keyboard(transaction_id: str) -> InlineKeyboardMarkup:
 def back_button_keyboard() -> InlineKeyboardMarkup:
     """Retorna um teclado com apenas o botão de voltar"""
     return InlineKeyboardMarkup(
-        [[InlineKeyboardButton("◀️ Voltar", callback_data="back_to_start")]]
+        [[InlineKeyboardButton("◀️ Voltar", callback_data=CB.BACK_TO_START)]]
     )
 
 
@@ -303,7 +367,7 @@ def limit_exceeded_keyboard() -> InlineKeyboardMarkup:
         [
             [
                 InlineKeyboardButton(
-                    "💰 Tentar com valor menor", callback_data="show_payment_options"
+                    "💰 Tentar com valor menor", callback_data=CB.PAYMENT_OPTIONS
                 )
             ]
         ]
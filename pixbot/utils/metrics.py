@@ -0,0 +1,322 @@
+"""
+Métricas no formato do Prometheus (contadores, gauges e histogramas)
+"""
+
+import functools
+import math
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Limites padrão dos histogramas de latência (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Todas as métricas criadas, na ordem de registro
+REGISTRY: List["Metric"] = []
+
+
+def _escape(value: str) -> str:
+    """Escapa o valor de um rótulo conforme o formato de exposição"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Formata os rótulos de uma amostra, ex.: {handler="start",le="0.1"}"""
+    pairs = [
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base das métricas: nome, descrição e nomes dos rótulos"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Contador que só aumenta"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(Metric):
+    """
+    Valor que sobe e desce
+
+    Pode receber uma função que é chamada na leitura das métricas e retorna
+    um número (sem rótulos) ou um dicionário {valores dos rótulos: número}.
+    """
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        func: Optional[Callable[[], object]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._func = func
+
+    def set_function(self, func: Callable[[], object]) -> None:
+        self._func = func
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        values = dict(self._values)
+        if self._func is not None:
+            result = self._func()
+            if isinstance(result, dict):
+                for key, value in result.items():
+                    key = key if isinstance(key, tuple) else (key,)
+                    values[tuple(str(k) for k in key)] = value
+            else:
+                values[()] = result
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+class Histogram(Metric):
+    """Distribuição de valores em faixas cumulativas"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # rótulos -> [contagem por faixa..., soma, total]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        data = self._values.get(key)
+        if data is None:
+            data = self._values[key] = [0.0] * (len(self.buckets) + 2)
+
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                data[index] += 1
+                break
+        data[-2] += value
+        data[-1] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, data in self._values.items():
+            cumulative = 0.0
+            for index, bound in enumerate(self.buckets):
+                cumulative += data[index]
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} "
+                    f"{_format_value(cumulative)}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(data[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(data[-1])}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Gera o texto de exposição de todas as métricas registradas"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# Métricas do bot
+HANDLER_LATENCY = Histogram(
+    "pixbot_handler_seconds",
+    "Tempo de execução dos handlers",
+    ("handler", "outcome"),
+)
+UPSTREAM_LATENCY = Histogram(
+    "pixbot_upstream_seconds",
+    "Tempo das chamadas à API PushinPay, incluindo novas tentativas",
+    ("operation", "outcome"),
+)
+QR_RENDER_LATENCY = Histogram(
+    "pixbot_qr_render_seconds",
+    "Tempo de renderização dos QR Codes (apenas quando fora do cache)",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+TELEGRAM_LATENCY = Histogram(
+    "pixbot_telegram_seconds",
+    "Tempo das chamadas à API do Telegram",
+    ("method", "outcome"),
+)
+EVENT_LOOP_LAG = Histogram(
+    "pixbot_event_loop_lag_seconds",
+    "Atraso do event loop em relação ao agendado",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+EVENT_LOOP_LAG_LAST = Gauge(
+    "pixbot_event_loop_lag_last_seconds", "Último atraso medido do event loop"
+)
+UPDATE_QUEUE_WAIT = Histogram(
+    "pixbot_update_queue_wait_seconds",
+    "Espera das atualizações na fila do usuário até o handler começar",
+)
+UPDATES_DROPPED = Counter(
+    "pixbot_updates_dropped_total",
+    "Atualizações descartadas por excesso de atualizações pendentes do usuário",
+)
+TRANSACTIONS_EXPIRED = Counter(
+    "pixbot_transactions_expired_total",
+    "Cobranças marcadas como expiradas localmente após a validade",
+)
+TRANSACTIONS_RECONCILED = Counter(
+    "pixbot_transactions_reconciled_total",
+    "Cobranças conferidas pela conciliação, por resultado (changed, unchanged, "
+    "error, skipped)",
+    ("outcome",),
+)
+CHARGES_DEDUPLICATED = Counter(
+    "pixbot_charges_deduplicated_total",
+    "Pedidos de cobrança repetidos que reaproveitaram uma cobrança em geração "
+    "(inflight) ou recém-criada (cache)",
+    ("source",),
+)
+OUTBOUND_WAIT = Histogram(
+    "pixbot_outbound_wait_seconds",
+    "Espera dos envios ao Telegram na fila até a chamada começar",
+)
+OUTBOUND_COALESCED = Counter(
+    "pixbot_outbound_coalesced_total",
+    "Edições pendentes da mesma mensagem substituídas por uma mais nova",
+)
+TELEGRAM_FLOOD_WAITS = Counter(
+    "pixbot_telegram_flood_waits_total",
+    "Envios adiados por FloodWait do Telegram",
+)
+
+# Gauges lidos na coleta (as funções são definidas pelo servidor de métricas)
+TRANSACTIONS_MEMORY = Gauge(
+    "pixbot_transactions_memory",
+    "Transações em memória: em uso (live), não gravadas (dirty) e bytes estimados",
+    ("kind",),
+)
+PENDING_CONVERSATIONS = Gauge(
+    "pixbot_pending_conversations",
+    "Usuários com conversa aberta aguardando um valor personalizado",
+)
+RATE_LIMITER_KEYS = Gauge(
+    "pixbot_rate_limiter_keys", "Baldes ativos no limitador de requisições"
+)
+POLLER_TRACKED = Gauge(
+    "pixbot_poller_tracked", "Transações acompanhadas pelo verificador automático"
+)
+EXPIRY_SCHEDULED = Gauge(
+    "pixbot_expiry_scheduled", "Cobranças pendentes com expiração agendada"
+)
+CIRCUIT_BREAKER_STATE = Gauge(
+    "pixbot_circuit_breaker_state",
+    "Estado do circuit breaker da PushinPay (1 no estado atual)",
+    ("state",),
+)
+UPDATE_QUEUE = Gauge(
+    "pixbot_update_queue",
+    "Filas por usuário: atualizações aguardando (queued), usuários com "
+    "atualizações pendentes (users) e handlers em execução (running)",
+    ("kind",),
+)
+OUTBOUND_QUEUE = Gauge(
+    "pixbot_outbound_queue",
+    "Fila de envio ao Telegram: chamadas aguardando (queued), chats com "
+    "chamadas pendentes (chats) e chamadas em andamento (sending)",
+    ("kind",),
+)
+WARM_POOL_CHARGES = Gauge(
+    "pixbot_warm_pool_charges", "Cobranças prontas no estoque por valor", ("value",)
+)
+
+
+def track_handler(name: str):
+    """
+    Decorador que mede o tempo de execução de um handler
+
+    Deve ficar abaixo do decorador de registro do Pyrogram.
+
+    Args:
+        name: Nome do handler nas métricas
+    """
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> T:
+            start = time.perf_counter()
+            outcome = "ok"
+            try:
+                return await func(*args, **kwargs)
+            except BaseException:
+                outcome = "error"
+                raise
+            finally:
+                HANDLER_LATENCY.observe(
+                    time.perf_counter() - start, handler=name, outcome=outcome
+                )
+
+        return wrapper
+
+    return decorator
@@ -2,16 +2,25 @@
 Integração com a API de pagamentos PIX
 """
 
+import asyncio
 import json
+import random
 import re
-from typing import Any, Dict, Optional
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
 
-import requests
+import aiohttp
 
-from pixbot.logger import logger
-from pixbot.settings import Settings
+from pixbot.logger import logger, sampled
+from pixbot.models.transaction import TERMINAL_STATUSES
+from pixbot.settings import get_settings, on_settings_reload
+from pixbot.utils.cache import SingleFlight, TTLCache
+from pixbot.utils.circuit_breaker import CircuitBreaker
+from pixbot.utils.metrics import UPSTREAM_LATENCY
 
-settings = Settings()
+settings = get_settings()
+
+T = TypeVar("T")
 
 
 class PIXApiError(Exception):
@@ -20,6 +29,21 @@ class PIXApiError(Exception):
     pass
 
 
+class PIXApiTransientError(PIXApiError):
+    """Exceção para falhas temporárias (rede, timeout, erro 5xx ou 429)"""
+
+    pass
+
+
+class PIXApiUnavailableError(PIXApiError):
+    """Exceção para quando a API está indisponível e o circuit breaker está aberto"""
+
+    def __init__(
+        self, message="O serviço de pagamentos está temporariamente indisponível"
+    ):
+        super().__init__(message)
+
+
 class PIXValueExceededError(PIXApiError):
     """Exceção para quando o valor excede o limite permitido"""
 
@@ -31,29 +55,236 @@ class PIXValueExceededError(PIXApiError):
 class PaymentAPI:
     """Classe para interagir com a API de pagamentos PIX"""
 
+    # Sessão HTTP compartilhada (pool de conexões keep-alive)
+    _session: Optional[aiohttp.ClientSession] = None
+
+    # Interrompe as chamadas enquanto a PushinPay estiver instável
+    breaker = CircuitBreaker(
+        "pushinpay",
+        failure_threshold=settings.breaker_failure_threshold,
+        recovery_timeout=settings.breaker_recovery_timeout,
+    )
+
+    # Consultas de status em andamento e respostas recentes, por transação
+    _status_flight = SingleFlight()
+    _status_cache: TTLCache[Dict[str, Any]] = TTLCache(
+        maxsize=settings.status_cache_size, ttl=settings.status_cache_ttl
+    )
+
     @staticmethod
     def get_headers() -> Dict[str, str]:
         """Retorna os cabeçalhos para a requisição API"""
         return {
             "Authorization": f"Bearer {settings.pix_api_token}",
             "Content-Type": "application/json",
+            "Accept": "application/json",
         }
 
     @classmethod
-    async def generate_pix(cls, value: float, description: str = "") -> Dict[str, Any]:
+    def get_session(cls) -> aiohttp.ClientSession:
+        """
+        Retorna a sessão HTTP compartilhada, criando-a na primeira chamada
+
+        A sessão mantém um pool de conexões keep-alive com a API, evitando
+        um novo handshake TCP+TLS a cada requisição.
+
+        Returns:
+            Instância de aiohttp.ClientSession
+        """
+        if cls._session is None or cls._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.http_pool_size,
+                limit_per_host=settings.http_pool_size_per_host,
+                keepalive_timeout=settings.http_keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            cls._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=cls._build_timeout(),
+            )
+            logger.debug(
+                f"Sessão HTTP criada (pool: {settings.http_pool_size}, "
+                f"por host: {settings.http_pool_size_per_host})"
+            )
+        return cls._session
+
+    @classmethod
+    async def close(cls) -> None:
+        """Fecha a sessão HTTP compartilhada e libera as conexões do pool"""
+        if cls._session is not None and not cls._session.closed:
+            await cls._session.close()
+            logger.debug("Sessão HTTP encerrada")
+        cls._session = None
+
+    @staticmethod
+    def _build_timeout(total: Optional[float] = None) -> aiohttp.ClientTimeout:
+        """
+        Monta o timeout de uma requisição
+
+        Args:
+            total: Tempo máximo total em segundos (usa o padrão das configurações se omitido)
+
+        Returns:
+            Instância de aiohttp.ClientTimeout
+        """
+        return aiohttp.ClientTimeout(
+            total=total if total is not None else settings.http_timeout,
+            sock_connect=settings.http_connect_timeout,
+        )
+
+    @staticmethod
+    def _is_transient_status(status: int) -> bool:
+        """Indica se o código HTTP representa uma falha temporária"""
+        return status >= 500 or status in (408, 429)
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Espera antes da próxima tentativa (exponencial com jitter completo)"""
+        limit = min(
+            settings.api_retry_backoff_max,
+            settings.api_retry_backoff_base * 2**attempt,
+        )
+        return random.uniform(0, limit)
+
+    @classmethod
+    async def _call(
+        cls,
+        operation: str,
+        request: Callable[[], Awaitable[T]],
+        retries: int,
+        deadline: float,
+    ) -> T:
+        """
+        Executa uma requisição com circuit breaker, novas tentativas e prazo total
+
+        Apenas falhas temporárias (PIXApiTransientError) contam para o circuit
+        breaker e geram novas tentativas; as demais respostas mostram que a
+        API está funcionando e são repassadas ao chamador.
+
+        Args:
+            operation: Nome da operação (usado nos logs)
+            request: Função que cria a corrotina de uma tentativa
+            retries: Novas tentativas permitidas após a primeira
+            deadline: Tempo máximo total em segundos, somando as tentativas
+
+        Returns:
+            Resultado da requisição
+
+        Raises:
+            PIXApiUnavailableError: Quando o circuit breaker está aberto
+            PIXApiTransientError: Quando as tentativas ou o prazo se esgotam
+        """
+        attempt = 0
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            async with asyncio.timeout(deadline):
+                while True:
+                    if not cls.breaker.allow():
+                        outcome = "unavailable"
+                        raise PIXApiUnavailableError()
+
+                    try:
+                        result = await request()
+                    except PIXApiTransientError as e:
+                        cls.breaker.record_failure()
+                        if attempt >= retries:
+                            outcome = "transient"
+                            raise
+
+                        delay = cls._backoff(attempt)
+                        attempt += 1
+                        logger.warning(
+                            f"{operation}: falha temporária ({str(e)}), "
+                            f"tentativa {attempt + 1} em {delay:.2f}s"
+                        )
+                        await asyncio.sleep(delay)
+                        continue
+                    except PIXApiError:
+                        cls.breaker.record_success()
+                        raise
+                    except BaseException:
+                        # Cancelada (prazo, chamador, encerramento) ou erro
+                        # inesperado: sem resultado, a vaga de teste fica livre
+                        cls.breaker.release()
+                        raise
+
+                    cls.breaker.record_success()
+                    outcome = "success"
+                    return result
+        except TimeoutError:
+            cls.breaker.record_failure()
+            outcome = "deadline"
+            raise PIXApiTransientError(
+                f"{operation}: prazo de {deadline:g}s esgotado após {attempt + 1} tentativa(s)"
+            )
+        finally:
+            UPSTREAM_LATENCY.observe(
+                time.perf_counter() - started, operation=operation, outcome=outcome
+            )
+
+    @staticmethod
+    def _parse_limit_error(response_text: str) -> None:
+        """
+        Verifica se a resposta de erro indica valor acima do limite permitido
+
+        Args:
+            response_text: Corpo da resposta de erro da API
+
+        Raises:
+            PIXValueExceededError: Quando o valor excede o limite máximo
+        """
+        if "solicitar aumento" not in response_text:
+            return
+
+        logger.error(f"Resposta da API: {response_text}")
+
+        # Tenta extrair a mensagem de erro
+        try:
+            error_data = json.loads(response_text)
+            error_msg = error_data.get("error", "")
+
+            # Verifica se é um erro de valor excedido, independente da formatação exata
+            if (
+                "valor máximo" in error_msg.lower() or "limite" in error_msg.lower()
+            ) and any(limite in error_msg for limite in ["150", "R$"]):
+                # Tenta extrair o valor limite da mensagem
+                limit_match = re.search(r"R\$\s*(\d+)[,.](\d+)", error_msg)
+                limit = 150.0  # valor padrão
+                if limit_match:
+                    try:
+                        limit = float(f"{limit_match.group(1)}.{limit_match.group(2)}")
+                    except (ValueError, IndexError):
+                        pass
+
+                raise PIXValueExceededError(message=error_msg, limit=limit)
+        except (json.JSONDecodeError, AttributeError):
+            # Se não conseguir extrair a mensagem de erro como JSON, verificamos o texto bruto
+            if "valor máximo" in response_text.lower() and "150" in response_text:
+                raise PIXValueExceededError(
+                    message="Valor excede o limite máximo permitido de R$ 150,00",
+                    limit=150.0,
+                )
+
+    @classmethod
+    async def generate_pix(
+        cls, value: float, description: str = "", timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
         """
         Gera um QR Code PIX para pagamento
 
         Args:
             value: Valor em reais (será convertido para centavos)
             description: Descrição opcional do pagamento
+            timeout: Tempo máximo da requisição em segundos (opcional)
 
         Returns:
             Dicionário com os dados do PIX gerado
 
         Raises:
             PIXValueExceededError: Quando o valor excede o limite máximo
-            Exception: Para outros erros na API
+            PIXApiUnavailableError: Quando a API está indisponível (circuit breaker aberto)
+            PIXApiError: Para outros erros na API
         """
         value_in_cents = int(value * 100)
 
@@ -62,91 +293,170 @@ class PaymentAPI:
         if description:
             payload["description"] = description
 
-        logger.info(f"Gerando PIX no valor de R$ {value:.2f}")
+        sampled("generate_pix").info("Gerando PIX no valor de R$ {:.2f}", value)
+
+        async def request() -> Dict[str, Any]:
+            try:
+                async with cls.get_session().post(
+                    settings.pix_api_url,
+                    headers=cls.get_headers(),
+                    json=payload,
+                    timeout=cls._build_timeout(timeout),
+                ) as response:
+                    response_text = await response.text()
+
+                    if response.status >= 400:
+                        logger.error(
+                            f"Erro ao gerar PIX: HTTP {response.status} ({response.reason})"
+                        )
+                        cls._parse_limit_error(response_text)
 
-        try:
-            response = requests.post(
-                settings.pix_api_url, headers=cls.get_headers(), json=payload
-            )
-            response.raise_for_status()
-
-            pix_data = response.json()
-            logger.info(f"PIX gerado com sucesso. ID: {pix_data.get('id', 'N/A')}")
-
-            return pix_data
-
-        except requests.RequestException as e:
-            logger.error(f"Erro ao gerar PIX: {str(e)}")
-            error_msg = ""
-            if "solicitar aumento" in e.response.text:
-                response_text = e.response.text
-                logger.error(f"Resposta da API: {response_text}")
-
-                # Tenta extrair a mensagem de erro
-                try:
-                    error_data = json.loads(response_text)
-                    error_msg = error_data.get("error", "")
-
-                    # Verifica se é um erro de valor excedido, independente da formatação exata
-                    if (
-                        "valor máximo" in error_msg.lower()
-                        or "limite" in error_msg.lower()
-                    ) and any(limite in error_msg for limite in ["150", "R$"]):
-                        # Tenta extrair o valor limite da mensagem
-                        limit_match = re.search(r"R\$\s*(\d+)[,.](\d+)", error_msg)
-                        limit = 150.0  # valor padrão
-                        if limit_match:
-                            try:
-                                limit = float(
-                                    f"{limit_match.group(1)}.{limit_match.group(2)}"
-                                )
-                            except (ValueError, IndexError):
-                                pass
-
-                        raise PIXValueExceededError(message=error_msg, limit=limit)
-                except (json.JSONDecodeError, AttributeError):
-                    # Se não conseguir extrair a mensagem de erro como JSON, verificamos o texto bruto
-                    if (
-                        "valor máximo" in response_text.lower()
-                        and "150" in response_text
-                    ):
-                        raise PIXValueExceededError(
-                            message="Valor excede o limite máximo permitido de R$ 150,00",
-                            limit=150.0,
+                        # Se chegamos aqui, é porque não identificamos como erro de limite
+                        error_class = (
+                            PIXApiTransientError
+                            if cls._is_transient_status(response.status)
+                            else PIXApiError
+                        )
+                        raise error_class(
+                            f"Falha ao gerar pagamento PIX: HTTP {response.status} ({response.reason})"
                         )
 
-            # Se chegamos aqui, é porque não identificamos como erro de limite
-            raise Exception(f"Falha ao gerar pagamento PIX: {str(e)}")
+                return json.loads(response_text)
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Erro ao gerar PIX: {e!r}")
+                raise PIXApiTransientError(f"Falha ao gerar pagamento PIX: {e!r}")
+            except json.JSONDecodeError as e:
+                logger.error(f"Resposta inválida ao gerar PIX: {e!r}")
+                raise PIXApiError(f"Falha ao gerar pagamento PIX: {e!r}")
+
+        # Gerar cobrança não é idempotente: sem novas tentativas
+        pix_data = await cls._call(
+            "Gerar PIX",
+            request,
+            retries=0,
+            deadline=settings.api_generate_deadline,
+        )
+        sampled("generate_pix").info(
+            "PIX gerado com sucesso. ID: {}", pix_data.get("id", "N/A")
+        )
+
+        return pix_data
 
     @classmethod
-    async def check_payment_status(cls, transaction_id: str) -> Dict[str, Any]:
+    async def check_payment_status(
+        cls,
+        transaction_id: str,
+        timeout: Optional[float] = None,
+        fresh: bool = False,
+    ) -> Dict[str, Any]:
         """
         Verifica o status de um pagamento PIX
 
+        Consultas simultâneas da mesma transação são agrupadas em uma única
+        requisição, e respostas ainda pendentes ficam em cache por
+        settings.status_cache_ttl segundos. O dicionário retornado é
+        compartilhado entre os chamadores e não deve ser alterado.
+
         Args:
             transaction_id: ID da transação PIX
+            timeout: Tempo máximo da requisição em segundos (opcional)
+            fresh: Consulta a API mesmo com uma resposta em cache ou em
+                andamento (ex.: ao receber uma notificação de mudança)
 
         Returns:
             Dicionário com os dados atualizados da transação
         """
-        url = f"{settings.pix_status_url}{transaction_id}"
 
-        logger.info(f"Verificando status do PIX ID: {transaction_id}")
+        async def fetch() -> Dict[str, Any]:
+            status_data = await cls._fetch_payment_status(transaction_id, timeout)
+            # Status final não muda mais: não há o que reaproveitar no cache
+            if status_data.get("status") in TERMINAL_STATUSES:
+                cls._status_cache.pop(transaction_id)
+            else:
+                cls._status_cache.set(transaction_id, status_data)
+            return status_data
 
-        try:
-            response = requests.get(url, headers=cls.get_headers())
-            response.raise_for_status()
+        if fresh:
+            return await fetch()
 
-            status_data = response.json()
-            logger.info(
-                f"Status do PIX ID {transaction_id}: {status_data.get('status', 'N/A')}"
+        cached = cls._status_cache.get(transaction_id)
+        if cached is not None:
+            sampled("payment_status").debug(
+                "Status do PIX ID {} obtido do cache", transaction_id
             )
+            return cached
 
-            return status_data
+        return await cls._status_flight.do(transaction_id, fetch)
+
+    @classmethod
+    async def _fetch_payment_status(
+        cls, transaction_id: str, timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Consulta o status de um pagamento PIX diretamente na API
+
+        Args:
+            transaction_id: ID da transação PIX
+            timeout: Tempo máximo da requisição em segundos (opcional)
+
+        Returns:
+            Dicionário com os dados atualizados da transação
+        """
+        url = f"{settings.pix_status_url}{transaction_id}"
 
-        except requests.RequestException as e:
-            logger.error(f"Erro ao verificar status do PIX: {str(e)}")
-            if hasattr(e, "response") and e.response:
-                logger.error(f"Resposta da API: {e.response.text}")
+        sampled("payment_status").info(
+            "Verificando status do PIX ID: {}", transaction_id
+        )
+
+        async def request() -> Dict[str, Any]:
+            try:
+                async with cls.get_session().get(
+                    url, headers=cls.get_headers(), timeout=cls._build_timeout(timeout)
+                ) as response:
+                    response_text = await response.text()
+
+                    if response.status >= 400:
+                        logger.error(
+                            f"Erro ao verificar status do PIX: HTTP {response.status} ({response.reason})"
+                        )
+                        logger.error(f"Resposta da API: {response_text}")
+                        error_class = (
+                            PIXApiTransientError
+                            if cls._is_transient_status(response.status)
+                            else PIXApiError
+                        )
+                        raise error_class(
+                            f"Falha ao verificar status do pagamento: HTTP {response.status} ({response.reason})"
+                        )
 
-            raise Exception(f"Falha ao verificar status do pagamento: {str(e)}")
+                return json.loads(response_text)
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Erro ao verificar status do PIX: {e!r}")
+                raise PIXApiTransientError(
+                    f"Falha ao verificar status do pagamento: {e!r}"
+                )
+            except json.JSONDecodeError as e:
+                logger.error(f"Resposta inválida ao verificar status do PIX: {e!r}")
+                raise PIXApiError(f"Falha ao verificar status do pagamento: {e!r}")
+
+        # Consultar status é idempotente: pode repetir dentro do prazo total
+        status_data = await cls._call(
+            "Verificar status do PIX",
+            request,
+            retries=settings.api_status_retries,
+            deadline=settings.api_status_deadline,
+        )
+        sampled("payment_status").info(
+            "Status do PIX ID {}: {}", transaction_id, status_data.get("status", "N/A")
+        )
+
+        return status_data
+
+
+@on_settings_reload
+def _reset_status_cache(changed: Dict[str, Any]) -> None:
+    """Descarta os status obtidos com o token anterior"""
+    if "pix_api_token" in changed:
+        PaymentAPI._status_cache.clear()
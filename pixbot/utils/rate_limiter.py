@@ -0,0 +1,196 @@
+"""
+Limitação de requisições por usuário, por ação e global (token bucket)
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from pixbot.settings import get_settings
+from pixbot.storage.state import BucketSpec, StateBackend, get_state_backend
+
+settings = get_settings()
+
+
+def parse_rate(spec: str) -> Tuple[float, float]:
+    """
+    Converte uma especificação "quantidade/segundos" em capacidade e taxa
+
+    Args:
+        spec: Ex.: "3/30" permite 3 requisições a cada 30 segundos
+
+    Returns:
+        Tupla (capacidade, fichas por segundo)
+    """
+    amount, _, period = spec.partition("/")
+    capacity = float(amount)
+    return capacity, capacity / float(period or 1)
+
+
+class TokenBucket:
+    """Balde de fichas que se reabastece continuamente"""
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        """Reabastece as fichas proporcionalmente ao tempo decorrido"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Segundos até haver uma ficha disponível (0 se já houver)"""
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Limita ações por usuário, por usuário e ação, e globalmente por ação
+
+    Uma ação só é liberada se todos os baldes envolvidos tiverem ficha, e
+    só então as fichas são consumidas. Baldes ociosos são descartados aos
+    poucos a cada verificação, então a memória acompanha apenas os
+    usuários ativos.
+
+    Com um backend de estado compartilhado, os baldes ficam nele e valem
+    para todos os processos do bot.
+
+    Args:
+        user_limit: Limite (capacidade, taxa) de cada usuário para todas as ações
+        action_limits: Limite por usuário de cada ação
+        global_limits: Limite global (todos os usuários) de cada ação
+        idle_ttl: Segundos sem uso após os quais um balde é descartado
+        backend: Estado compartilhado onde ficam os baldes (None para
+            mantê-los no próprio processo)
+    """
+
+    # Baldes descartados por verificação, no máximo
+    CLEANUP_BATCH = 8
+
+    def __init__(
+        self,
+        user_limit: Tuple[float, float],
+        action_limits: Dict[str, Tuple[float, float]],
+        global_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+        idle_ttl: float = 600.0,
+        backend: Optional[StateBackend] = None,
+    ):
+        self.user_limit = user_limit
+        self.action_limits = action_limits
+        self.global_limits = global_limits or {}
+        self.idle_ttl = idle_ttl
+        self.backend = backend
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+
+    @classmethod
+    def from_settings(cls) -> "RateLimiter":
+        """Cria o limitador com os limites definidos nas configurações"""
+        action_limits = {
+            "process_payment": parse_rate(settings.rate_limit_process_payment),
+            "request_custom_amount": parse_rate(
+                settings.rate_limit_request_custom_amount
+            ),
+            "show_qr": parse_rate(settings.rate_limit_show_qr),
+            "check_payment": parse_rate(settings.rate_limit_check_payment),
+        }
+        global_limit = parse_rate(settings.rate_limit_global)
+        backend = get_state_backend()
+        return cls(
+            user_limit=parse_rate(settings.rate_limit_user),
+            action_limits=action_limits,
+            global_limits={action: global_limit for action in action_limits},
+            idle_ttl=settings.rate_limit_idle_ttl,
+            backend=backend if backend.shared else None,
+        )
+
+    def _bucket(
+        self, key: Hashable, limit: Tuple[float, float], now: float
+    ) -> TokenBucket:
+        """Obtém (ou cria) o balde de uma chave, marcando-o como usado"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(limit[0], limit[1], now)
+            self._buckets[key] = bucket
+        else:
+            self._buckets.move_to_end(key)
+            bucket.refill(now)
+        return bucket
+
+    def _cleanup(self, now: float) -> None:
+        """Descarta alguns baldes ociosos (os mais antigos ficam no início)"""
+        cutoff = now - self.idle_ttl
+        for _ in range(self.CLEANUP_BATCH):
+            if not self._buckets:
+                return
+            key, bucket = next(iter(self._buckets.items()))
+            if bucket.updated > cutoff:
+                return
+            del self._buckets[key]
+
+    async def check(self, user_id: int, action: str) -> float:
+        """
+        Verifica e consome uma ficha para a ação do usuário
+
+        Os baldes locais são verificados na hora; os do backend compartilhado
+        aguardam o servidor sem bloquear o event loop.
+
+        Args:
+            user_id: ID do usuário no Telegram
+            action: Nome da ação
+
+        Returns:
+            0 se a ação foi liberada, ou os segundos até poder tentar novamente
+        """
+        if self.backend is not None:
+            return await self._check_shared(user_id, action)
+
+        now = time.monotonic()
+        buckets: List[TokenBucket] = [
+            self._bucket(("user", user_id), self.user_limit, now)
+        ]
+
+        if action in self.action_limits:
+            buckets.append(
+                self._bucket(
+                    ("action", user_id, action), self.action_limits[action], now
+                )
+            )
+        if action in self.global_limits:
+            buckets.append(
+                self._bucket(("global", action), self.global_limits[action], now)
+            )
+
+        self._cleanup(now)
+
+        wait = max(bucket.wait_time() for bucket in buckets)
+        if wait > 0:
+            return wait
+
+        for bucket in buckets:
+            bucket.tokens -= 1
+        return 0.0
+
+    async def _check_shared(self, user_id: int, action: str) -> float:
+        """Verificação com os baldes no backend de estado compartilhado"""
+        buckets: List[BucketSpec] = [(f"rl:user:{user_id}", *self.user_limit)]
+        if action in self.action_limits:
+            buckets.append(
+                (f"rl:action:{user_id}:{action}", *self.action_limits[action])
+            )
+        if action in self.global_limits:
+            buckets.append((f"rl:global:{action}", *self.global_limits[action]))
+        return await self.backend.take_token(buckets, self.idle_ttl)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# Limitador compartilhado pelos handlers
+rate_limiter = RateLimiter.from_settings()
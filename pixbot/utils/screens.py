@@ -0,0 +1,246 @@
+"""
+Telas pré-montadas (texto e teclado) reaproveitadas entre atualizações
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from pixbot.models.transaction import Transaction
+from pixbot.settings import get_settings, on_settings_reload
+from pixbot.utils.cache import TTLCache
+from pixbot.utils.callback_router import CB, encode
+from pixbot.utils.messages import (
+    ABOUT_MESSAGE,
+    CUSTOM_AMOUNT_MESSAGE,
+    ERROR_MESSAGE,
+    HELP_MESSAGE,
+    INVALID_FORMAT_MESSAGE,
+    INVALID_VALUE_MESSAGE,
+    LIMIT_EXCEEDED_MESSAGE,
+    PAYMENT_AMOUNT_MESSAGE,
+    PAYMENT_CANCELED_MESSAGE,
+    PAYMENT_CODE_MESSAGE,
+    PAYMENT_DETAILS_MESSAGE,
+    PAYMENT_OPTIONS_MESSAGE,
+    PROCESSING_MESSAGE,
+    TIMEOUT_MESSAGE,
+    WELCOME_MESSAGE,
+    back_button_keyboard,
+    custom_amount_keyboard,
+    error_keyboard,
+    get_completed_payment_keyboard,
+    get_failed_payment_keyboard,
+    get_pending_payment_keyboard,
+    limit_exceeded_keyboard,
+    main_menu_keyboard,
+    payment_canceled_keyboard,
+    payment_details_keyboard,
+    payment_status_message,
+    retry_custom_amount_keyboard,
+)
+
+settings = get_settings()
+
+# Status com mensagem própria; os demais são formatados na hora
+KNOWN_STATUSES = ("created", "pending", "paid", "expired", "canceled", "failed")
+
+
+@dataclass(frozen=True, slots=True)
+class Screen:
+    """
+    Texto e teclado de uma tela
+
+    O teclado é compartilhado entre as mensagens e nunca deve ser alterado.
+    Nas telas com campos variáveis (erro, limite), o texto é o modelo a ser
+    preenchido com format().
+    """
+
+    text: str
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+
+
+def build_payment_options_keyboard(values: Iterable[float]) -> InlineKeyboardMarkup:
+    """
+    Monta o teclado com os valores de pagamento pré-definidos
+
+    Args:
+        values: Valores exibidos, dois botões por linha
+
+    Returns:
+        InlineKeyboardMarkup com os botões de pagamento
+    """
+    buttons = [
+        InlineKeyboardButton(
+            f"R$ {value:.2f}".replace(".", ","),
+            callback_data=encode(CB.PAYMENT, f"{value:.2f}"),
+        )
+        for value in values
+    ]
+    rows = [buttons[i : i + 2] for i in range(0, len(buttons), 2)]
+
+    # Adiciona botão para valor personalizado
+    rows.append(
+        [InlineKeyboardButton("➕ Valor Personalizado", callback_data=CB.CUSTOM_AMOUNT)]
+    )
+
+    return InlineKeyboardMarkup(rows)
+
+
+class Screens:
+    """
+    Camada de renderização das telas do bot
+
+    As telas estáticas são montadas uma única vez em build(). As telas de
+    transação usam modelos já preenchidos com a mensagem de cada status,
+    restando apenas valor e ID, e ficam guardadas por (transação, status).
+    """
+
+    main_menu: Screen
+    help: Screen
+    about: Screen
+    payment_options: Screen
+    custom_amount: Screen
+    processing: Screen
+    timeout: Screen
+    invalid_value: Screen
+    invalid_format: Screen
+    payment_canceled: Screen
+    limit_exceeded: Screen
+    error: Screen
+
+    # Modelo do texto de detalhes por status
+    _status_templates: Dict[str, str] = {}
+
+    _rendered: TTLCache[Screen] = TTLCache(
+        maxsize=settings.screen_cache_size, ttl=settings.screen_cache_ttl
+    )
+
+    @classmethod
+    def build(cls, payment_values: Optional[Iterable[float]] = None) -> None:
+        """
+        Monta (ou remonta) todas as telas estáticas
+
+        Args:
+            payment_values: Valores pré-definidos; usa as configurações se omitido
+        """
+        if payment_values is None:
+            payment_values = settings.payment_values
+
+        cls.main_menu = Screen(WELCOME_MESSAGE, main_menu_keyboard())
+        cls.help = Screen(HELP_MESSAGE, back_button_keyboard())
+        cls.about = Screen(ABOUT_MESSAGE, back_button_keyboard())
+        cls.payment_options = Screen(
+            PAYMENT_OPTIONS_MESSAGE, build_payment_options_keyboard(payment_values)
+        )
+        cls.custom_amount = Screen(CUSTOM_AMOUNT_MESSAGE, custom_amount_keyboard())
+        cls.processing = Screen(PROCESSING_MESSAGE)
+        cls.timeout = Screen(TIMEOUT_MESSAGE, retry_custom_amount_keyboard())
+        cls.invalid_value = Screen(
+            INVALID_VALUE_MESSAGE, retry_custom_amount_keyboard()
+        )
+        cls.invalid_format = Screen(
+            INVALID_FORMAT_MESSAGE, retry_custom_amount_keyboard()
+        )
+        cls.payment_canceled = Screen(
+            PAYMENT_CANCELED_MESSAGE, payment_canceled_keyboard()
+        )
+        cls.limit_exceeded = Screen(LIMIT_EXCEEDED_MESSAGE, limit_exceeded_keyboard())
+        cls.error = Screen(ERROR_MESSAGE, error_keyboard())
+
+        # Substitui a mensagem do status no modelo uma única vez
+        cls._status_templates = {
+            status: PAYMENT_DETAILS_MESSAGE.replace(
+                "{status_msg}", payment_status_message(status)
+            )
+            for status in KNOWN_STATUSES
+        }
+
+        cls._rendered.clear()
+
+    @classmethod
+    def _memoize(cls, key: tuple, render: Callable[[], Screen]) -> Screen:
+        """Devolve a tela guardada ou renderiza e guarda uma nova"""
+        screen = cls._rendered.get(key)
+        if screen is None:
+            screen = render()
+            cls._rendered.set(key, screen)
+        return screen
+
+    @classmethod
+    def payment_details(cls, transaction: Transaction) -> Screen:
+        """
+        Tela com a chave Copia e Cola e os botões de QR Code e verificação
+
+        Args:
+            transaction: Transação exibida
+
+        Returns:
+            Screen: Tela de detalhes do pagamento
+        """
+
+        def render() -> Screen:
+            if transaction.qr_code:
+                text = PAYMENT_CODE_MESSAGE.format(
+                    amount=transaction.amount,
+                    qr_code=transaction.qr_code,
+                    transaction_id=transaction.id,
+                )
+            else:
+                text = PAYMENT_AMOUNT_MESSAGE.format(amount=transaction.amount)
+            return Screen(text, payment_details_keyboard(transaction.id))
+
+        return cls._memoize((transaction.id, "details"), render)
+
+    @classmethod
+    def payment_status(cls, transaction: Transaction) -> Screen:
+        """
+        Tela com o status atual do pagamento
+
+        Args:
+            transaction: Transação exibida
+
+        Returns:
+            Screen: Tela do status, com os botões adequados a ele
+        """
+
+        def render() -> Screen:
+            template = cls._status_templates.get(transaction.status)
+            if template is None:
+                text = PAYMENT_DETAILS_MESSAGE.format(
+                    amount=transaction.amount,
+                    status_msg=payment_status_message(transaction.status),
+                    transaction_id=transaction.id,
+                )
+            else:
+                text = template.format(
+                    amount=transaction.amount, transaction_id=transaction.id
+                )
+
+            # Determina os botões com base no status
+            if transaction.is_paid():
+                keyboard = get_completed_payment_keyboard(transaction.id)
+            elif transaction.is_pending():
+                keyboard = get_pending_payment_keyboard(transaction.id)
+            else:
+                keyboard = get_failed_payment_keyboard(transaction.id)
+
+            return Screen(text, keyboard)
+
+        return cls._memoize((transaction.id, transaction.status), render)
+
+    @classmethod
+    def cached_count(cls) -> int:
+        """Quantidade de telas de transação guardadas"""
+        return len(cls._rendered)
+
+
+Screens.build()
+
+
+@on_settings_reload
+def _rebuild_screens(changed: Dict[str, Any]) -> None:
+    """Remonta as telas quando os valores pré-definidos mudam"""
+    if "payment_values" in changed:
+        Screens.build()
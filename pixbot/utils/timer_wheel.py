@@ -0,0 +1,126 @@
+"""
+Roda de temporizadores (hashed timer wheel) para muitos prazos simultâneos
+"""
+
+import asyncio
+import inspect
+import math
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set
+
+from pixbot.logger import logger
+
+
+class TimerWheel:
+    """
+    Agenda prazos em O(1) sem uma tarefa do asyncio por prazo
+
+    Os prazos ficam em slots de uma roda circular que uma única tarefa
+    percorre a cada tick; um prazo além de uma volta completa espera as
+    voltas restantes no mesmo slot. Agendar e cancelar custam O(1), e a
+    precisão é de um tick. A tarefa só roda enquanto houver prazos.
+
+    Args:
+        tick: Duração de cada slot em segundos
+        slots: Quantidade de slots da roda
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 512):
+        self.tick = tick
+        # slot -> {chave: [voltas restantes, callback]}
+        self._slots: List[Dict[Hashable, list]] = [{} for _ in range(slots)]
+        self._index: Dict[Hashable, int] = {}  # chave -> slot
+        self._cursor = 0
+        self._task: Optional[asyncio.Task] = None
+        self._callbacks: Set[asyncio.Task] = set()
+
+    def schedule(
+        self, key: Hashable, delay: float, callback: Callable[[], Any]
+    ) -> None:
+        """
+        Agenda um callback, substituindo o prazo anterior da mesma chave
+
+        Args:
+            key: Identificador do prazo
+            delay: Segundos até o callback
+            callback: Função sem argumentos (pode ser assíncrona)
+        """
+        self.cancel(key)
+
+        ticks = max(1, math.ceil(delay / self.tick))
+        slot = (self._cursor + ticks) % len(self._slots)
+        self._slots[slot][key] = [(ticks - 1) // len(self._slots), callback]
+        self._index[key] = slot
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def cancel(self, key: Hashable) -> bool:
+        """
+        Cancela o prazo de uma chave
+
+        Args:
+            key: Identificador do prazo
+
+        Returns:
+            True se havia um prazo agendado
+        """
+        slot = self._index.pop(key, None)
+        if slot is None:
+            return False
+        del self._slots[slot][key]
+        return True
+
+    def _advance(self) -> None:
+        """Avança um slot e dispara os prazos vencidos nele"""
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        timers = self._slots[self._cursor]
+        expired = []
+        for key, timer in timers.items():
+            if timer[0]:
+                timer[0] -= 1
+            else:
+                expired.append(key)
+
+        for key in expired:
+            _, callback = timers.pop(key)
+            del self._index[key]
+            try:
+                result = callback()
+                if inspect.isawaitable(result):
+                    task = asyncio.ensure_future(result)
+                    self._callbacks.add(task)
+                    task.add_done_callback(self._finished)
+            except Exception as e:
+                logger.error(f"Erro no temporizador {key}: {str(e)}")
+
+    def _finished(self, task: asyncio.Task) -> None:
+        """Descarta a referência do callback assíncrono e registra sua falha"""
+        self._callbacks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Erro no temporizador: {str(task.exception())}")
+
+    async def _run(self) -> None:
+        """Percorre a roda enquanto houver prazos agendados"""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        try:
+            while self._index:
+                next_tick += self.tick
+                await asyncio.sleep(max(0.0, next_tick - loop.time()))
+                self._advance()
+        finally:
+            self._task = None
+
+    async def stop(self) -> None:
+        """Descarta os prazos pendentes e interrompe a roda"""
+        for timers in self._slots:
+            timers.clear()
+        self._index.clear()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._callbacks:
+            await asyncio.gather(*self._callbacks, return_exceptions=True)
+
+    def __len__(self) -> int:
+        return len(self._index)